@@ -1,6 +1,8 @@
+from django import forms
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, NewInspection, Inspection
+from django.utils import timezone
+from .models import CustomUser, NewInspection, Inspection, InspectionAttachment, MediaBlob, ImageVariant, Job
 
 # Custom User Admin - Complete fields
 class CustomUserAdmin(UserAdmin):
@@ -35,7 +37,9 @@ class CustomUserAdmin(UserAdmin):
 # New Inspection Admin - Complete fields
 class NewInspectionAdmin(admin.ModelAdmin):
     list_display = ('project', 'client_name', 'industry_name', 'assigned_inspector', 'branch_name', 'status', 'created_at')
-    list_filter = ('status', 'branch_name', 'created_at', 'assigned_inspector')
+    # Only users with an assignment are offered, not every account
+    list_filter = ('status', 'branch_name', 'created_at', ('assigned_inspector', admin.RelatedOnlyFieldListFilter))
+    list_select_related = ('assigned_inspector',)
     search_fields = ('project', 'client_name', 'industry_name', 'phone_number', 'branch_name')
     readonly_fields = ('created_at', 'updated_at')
     list_per_page = 20
@@ -53,13 +57,67 @@ class NewInspectionAdmin(admin.ModelAdmin):
         }),
     )
 
+# Attachments stored in the blob store (Section L & M media)
+class InspectionAttachmentInline(admin.TabularInline):
+    model = InspectionAttachment
+    fields = ('kind', 'name', 'position', 'blob', 'created_at')
+    readonly_fields = ('kind', 'name', 'position', 'blob', 'created_at')
+    extra = 0
+    can_delete = False
+
+# Thumbnail/medium/original copies of photos (accounts.images)
+class ImageVariantInline(admin.TabularInline):
+    model = ImageVariant
+    fields = ('name', 'mime_type', 'width', 'height', 'size', 'file')
+    readonly_fields = ('name', 'mime_type', 'width', 'height', 'size', 'file')
+    extra = 0
+    can_delete = False
+
+class MediaBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'mime_type', 'size', 'width', 'height', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'size', 'mime_type', 'file', 'width', 'height', 'created_at')
+    inlines = [ImageVariantInline]
+
+# Form fields for the columns kept in section tables (accounts.sections), declared so the fieldsets below can list them
+SECTION_FORM_FIELDS = {
+    name: field
+    for section_model in Inspection.SECTION_MODELS.values()
+    for name, field in forms.fields_for_model(section_model, exclude=['inspection']).items()
+}
+
+class InspectionFormBase(forms.ModelForm):
+    class Meta:
+        model = Inspection
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in SECTION_FORM_FIELDS:
+            if name in self.fields and name not in self.initial:
+                self.initial[name] = getattr(self.instance, name)
+
+    def save(self, commit=True):
+        # Assigned through the model so Inspection.save() writes the sections and their shadows
+        for name in SECTION_FORM_FIELDS:
+            if name in self.cleaned_data:
+                setattr(self.instance, name, self.cleaned_data[name])
+        return super().save(commit)
+
+InspectionAdminForm = type('InspectionAdminForm', (InspectionFormBase,), dict(SECTION_FORM_FIELDS))
+
 # Inspection Admin - ALL FIELDS INCLUDED
 class InspectionAdmin(admin.ModelAdmin):
+    form = InspectionAdminForm
     list_display = ('client_name', 'industry_name', 'inspector', 'branch_name', 'status', 'created_at', 'get_location_summary')
-    list_filter = ('status', 'branch_name', 'created_at', 'inspector')
+    # Only users with inspections are offered, not every account
+    list_filter = ('status', 'branch_name', 'created_at', ('inspector', admin.RelatedOnlyFieldListFilter))
+    list_select_related = ('inspector',)
+    # icontains on these is served by the trigram index of accounts.search on PostgreSQL
     search_fields = ('client_name', 'industry_name', 'phone_number', 'group_name', 'owner_name')
-    readonly_fields = ('created_at', 'updated_at', 'get_location_summary', 'get_first_location', 'get_last_location')
+    readonly_fields = ('created_at', 'updated_at', 'total_location_points', 'get_location_summary', 'get_first_location', 'get_last_location')
     list_per_page = 20
+    inlines = [InspectionAttachmentInline]
     
     fieldsets = (
         ('Basic Information', {
@@ -67,7 +125,7 @@ class InspectionAdmin(admin.ModelAdmin):
         }),
         ('Location Tracking', {
             'fields': (
-                'location_points', 'location_start_time', 'location_end_time', 
+                'location_start_time', 'location_end_time',
                 'total_location_points', 'get_location_summary', 'get_first_location', 'get_last_location'
             )
         }),
@@ -193,7 +251,23 @@ class InspectionAdmin(admin.ModelAdmin):
         return "No location data"
     get_last_location.short_description = 'Last Location'
 
+# Background jobs (accounts.jobs): failed ones can be queued again from here
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'task', 'status', 'attempts', 'max_attempts', 'run_at', 'locked_by', 'updated_at')
+    list_filter = ('status', 'task')
+    readonly_fields = ('task', 'payload', 'attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'updated_at')
+    actions = ['retry_jobs']
+
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now()
+        )
+        self.message_user(request, f"{count} jobs queued again")
+    retry_jobs.short_description = 'Queue selected jobs again'
+
 # Register models
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(NewInspection, NewInspectionAdmin)
-admin.site.register(Inspection, InspectionAdmin)
\ No newline at end of file
+admin.site.register(Inspection, InspectionAdmin)
+admin.site.register(MediaBlob, MediaBlobAdmin)
+admin.site.register(Job, JobAdmin)
\ No newline at end of file
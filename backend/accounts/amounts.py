@@ -0,0 +1,147 @@
+# amounts.py
+"""
+Numeric shadows of the free-text money fields of an inspection.
+
+Inspectors type amounts the way they are written on paper: "1,20,000",
+"Tk. 5 lac", "2.5 crore", "১২ লাখ", "50,000/-". parse_amount() reads those
+into a Decimal (None when it cannot), and every source field has a
+`<field>_value` DecimalField kept in step on save, so portfolio totals are
+plain SQL aggregates (see portfolio.py). The labour-force head counts get
+integer shadows the same way.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from .sections import field_lookup
+
+# Section E (proposed facilities), F (present outstanding) and H (property & assets)
+AMOUNT_FIELDS = [
+    'existing_limit', 'applied_limit', 'recommended_limit',
+    'limit_amount', 'net_outstanding', 'gross_outstanding',
+    'cash_balance', 'stock_trade_finished', 'stock_trade_financial', 'accounts_receivable',
+    'advance_deposit', 'other_current_assets', 'land_building', 'plant_machinery', 'other_assets',
+    'ibbl_investment', 'other_banks_investment', 'accounts_payable', 'other_current_liabilities',
+    'long_term_liabilities', 'other_non_current_liabilities', 'paid_up_capital', 'retained_earning',
+]
+# Section G labour force, parsed with parse_headcount()
+HEADCOUNT_FIELDS = ['male_worker', 'female_worker']
+MAX_DIGITS = 18
+DECIMAL_PLACES = 2
+
+UNITS = {
+    'thousand': 10 ** 3, 'k': 10 ** 3, 'হাজার': 10 ** 3,
+    'lac': 10 ** 5, 'lacs': 10 ** 5, 'lakh': 10 ** 5, 'lakhs': 10 ** 5, 'lk': 10 ** 5,
+    'লাখ': 10 ** 5, 'লক্ষ': 10 ** 5,
+    'million': 10 ** 6, 'mn': 10 ** 6,
+    'crore': 10 ** 7, 'crores': 10 ** 7, 'cr': 10 ** 7, 'কোটি': 10 ** 7,
+}
+BENGALI_DIGITS = str.maketrans('০১২৩৪৫৬৭৮৯', '0123456789')
+# Currency marks and the "/-" written after whole amounts
+NOISE = re.compile(r'৳|\btk\b\.?|\btaka\b|\bbdt\b|/-|/=')
+TERM = re.compile(
+    r'\s*(\d+(?:\.\d+)?)\s*(' + '|'.join(sorted(map(re.escape, UNITS), key=len, reverse=True)) + r')?\.?(?![\w.])'
+)
+LIMIT = Decimal(10) ** (MAX_DIGITS - DECIMAL_PLACES)
+CENT = Decimal(1).scaleb(-DECIMAL_PLACES)
+
+
+def value_field(name):
+    """Name of the numeric shadow of the text field `name`"""
+    return f'{name}_value'
+
+
+SHADOWED_FIELDS = [*AMOUNT_FIELDS, *HEADCOUNT_FIELDS]
+VALUE_FIELDS = [value_field(name) for name in SHADOWED_FIELDS]
+
+
+def parse_amount(text):
+    """
+    Decimal value of an amount as written by hand, or None. Accepts Indian
+    digit grouping, Bengali digits, currency marks, a leading minus or
+    parentheses for negatives, and lac/crore/thousand/million units, also
+    combined ("1 crore 20 lac").
+    """
+    if text is None:
+        return None
+    text = str(text).translate(BENGALI_DIGITS).lower()
+    text = NOISE.sub(' ', text).replace(',', '').strip()
+    negative = False
+    if text.startswith('(') and text.endswith(')'):
+        negative, text = True, text[1:-1].strip()
+    elif text.startswith('-'):
+        negative, text = True, text[1:].strip()
+    if not text:
+        return None
+
+    total, pos = Decimal(0), 0
+    while pos < len(text):
+        match = TERM.match(text, pos)
+        if match is None or match.end() == pos:
+            return None
+        number, unit = match.groups()
+        try:
+            total += Decimal(number) * UNITS.get(unit, 1)
+        except InvalidOperation:
+            return None
+        pos = match.end()
+        while pos < len(text) and text[pos] in ' +&':
+            pos += 1
+    total = -total if negative else total
+    if abs(total) >= LIMIT:
+        return None
+    return total.quantize(CENT)
+
+
+def parse_headcount(text):
+    """Whole, non-negative number of people ("25", "১২", "1,200"), or None"""
+    value = parse_amount(text)
+    if value is None or value < 0 or value != value.to_integral_value():
+        return None
+    return int(value)
+
+
+def parse_shadow(name, text):
+    return parse_headcount(text) if name in HEADCOUNT_FIELDS else parse_amount(text)
+
+
+def format_amount(value):
+    """Amount as a string with two decimals (how the API returns money), None stays None"""
+    return None if value is None else str(Decimal(value).quantize(CENT))
+
+
+def fill_amounts(instance, update_fields=None):
+    """
+    Set the shadows of the fields being saved (all of them when
+    `update_fields` is None); returns the names of the shadows set.
+    """
+    changed = []
+    for name in SHADOWED_FIELDS:
+        if update_fields is None or name in update_fields:
+            setattr(instance, value_field(name), parse_shadow(name, getattr(instance, name)))
+            changed.append(value_field(name))
+    return changed
+
+
+def backfill(model, fields=SHADOWED_FIELDS, batch_size=1000):
+    """
+    Recompute the shadows of `fields` for every row of `model` (historical
+    models too, given the fields they have); returns the number of rows changed.
+    """
+    changed = 0
+    batch = []
+    shadows = [value_field(name) for name in fields]
+    sources = [field_lookup(model, name) for name in fields]
+    rows = model.objects.order_by('pk').values_list('pk', *sources, *shadows)
+    for row in rows.iterator(chunk_size=batch_size):
+        pk, texts, stored = row[0], row[1:len(fields) + 1], row[len(fields) + 1:]
+        values = [parse_shadow(name, text) for name, text in zip(fields, texts)]
+        if values != list(stored):
+            batch.append(model(pk=pk, **dict(zip(shadows, values))))
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, shadows)
+            changed += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, shadows)
+        changed += len(batch)
+    return changed
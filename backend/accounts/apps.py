@@ -3,4 +3,10 @@ from django.apps import AppConfig
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'accounts'
+    name = 'accounts'
+
+    def ready(self):
+        # Signal handlers: status counters, response cache invalidation, sync tombstones, rollup
+        # days and SQLite's PERCENTILE_CONT (portfolio); background job tasks: email (jobs),
+        # photo variants (images) and rollup refreshes
+        from . import counters, images, jobs, polyline, portfolio, response_cache, rollups, sync  # noqa: F401
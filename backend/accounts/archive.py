@@ -0,0 +1,152 @@
+# archive.py
+"""
+Cold storage for old, closed inspections.
+
+An Approved or Rejected report is rarely read once it is a couple of years
+old, yet its section rows (accounts.sections) hold the bulk of the free
+text and JSON. archive() packs them into one zlib-compressed JSON document
+per inspection in `inspection_archive` and deletes them. The `inspections`
+row itself stays, with `archived` set, so lists, counters, search, rollups
+and the client keys see no difference.
+
+Reading a section field of an archived inspection unpacks the document, one
+query for all the sections, so retrieve, the admin and exports return the
+report as before. Saving a changed section field restores the section rows
+and drops the archive (Inspection.save()).
+
+On PostgreSQL `inspection_archive` is range-partitioned by the inspection's
+created_at, one partition per year plus a default one. ensure_partitions()
+creates the yearly partitions ahead of the rows that go into them, so a
+year of archives can be detached or dropped as a unit and each partition's
+index and vacuum stay small. The `inspections` table itself is not
+partitioned: every other table references it by id alone, which a table
+partitioned by created_at cannot give a unique constraint for.
+"""
+import json
+import zlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Inspection, InspectionArchive
+from .sections import accessor, section_accessors, section_of
+
+ARCHIVED_STATUSES = ('Approved', 'Rejected')
+BATCH_SIZE = 500
+COMPRESSION_LEVEL = 6
+
+# -------------------- Partitions (PostgreSQL) --------------------
+
+def partition_name(year):
+    return f'inspection_archive_y{year}'
+
+
+def ensure_partitions(first_year, last_year):
+    """Create the missing yearly partitions of [first_year, last_year]; returns their names (none off PostgreSQL)"""
+    if connection.vendor != 'postgresql':
+        return []
+    existing = set(connection.introspection.table_names())
+    created = []
+    with connection.cursor() as cursor:
+        for year in range(first_year, last_year + 1):
+            name = partition_name(year)
+            if name in existing:
+                continue
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF inspection_archive "
+                f"FOR VALUES FROM ('{year}-01-01 00:00+00') TO ('{year + 1}-01-01 00:00+00')"
+            )
+            created.append(name)
+    return created
+
+
+# -------------------- Packing --------------------
+
+def pack(instance):
+    """Compressed {section: {field: value}} of the section rows an inspection has"""
+    sections = {}
+    for section, section_model in instance.SECTION_MODELS.items():
+        try:
+            row = getattr(instance, accessor(section))
+        except section_model.DoesNotExist:
+            continue
+        sections[section] = {
+            field.name: getattr(row, field.name)
+            for field in section_model._meta.concrete_fields if field.name != 'inspection'
+        }
+    document = json.dumps(sections, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(document.encode(), COMPRESSION_LEVEL)
+
+
+def unpack(payload):
+    return json.loads(zlib.decompress(bytes(payload)))
+
+
+def archived_values(instance):
+    """{section: {field: value}} from the archive of an inspection, read once per instance"""
+    values = instance.__dict__.get('_archived_values')
+    if values is None:
+        payload = InspectionArchive.objects.filter(inspection=instance.pk).values_list('payload', flat=True).first()
+        values = instance.__dict__['_archived_values'] = unpack(payload) if payload is not None else {}
+    return values
+
+
+def archived_sections(instance):
+    """Unsaved section rows of an archived inspection, for every section (sections.section_of())"""
+    values = archived_values(instance)
+    return {
+        section: section_model(inspection=instance, **values.get(section, {}))
+        for section, section_model in instance.SECTION_MODELS.items()
+    }
+
+
+# -------------------- Archiving --------------------
+
+def candidates(before):
+    return Inspection.objects.filter(status__in=ARCHIVED_STATUSES, created_at__lt=before, archived=False)
+
+
+def archive(before=None, batch_size=BATCH_SIZE):
+    """
+    Pack the sections of the closed inspections created before `before`
+    (default ARCHIVE_AFTER_DAYS ago); returns the number archived.
+    """
+    before = before or timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+    total = 0
+    while True:
+        with transaction.atomic():
+            # Only the inspections rows are locked: FOR UPDATE cannot take the outer-joined sections
+            batch = list(
+                candidates(before).select_related(*section_accessors())
+                .select_for_update(of=('self',)).order_by('pk')[:batch_size]
+            )
+            if not batch:
+                return total
+            years = [i.created_at.astimezone(dt_timezone.utc).year for i in batch]
+            ensure_partitions(min(years), max(years))
+            ids = [i.pk for i in batch]
+            InspectionArchive.objects.bulk_create([
+                InspectionArchive(inspection=i, created_at=i.created_at, payload=pack(i)) for i in batch
+            ])
+            for section_model in Inspection.SECTION_MODELS.values():
+                section_model.objects.filter(inspection__in=ids).delete()
+            # Not a change of the report: updated_at (and so /api/sync/) stays as it was
+            Inspection.objects.filter(pk__in=ids).update(archived=True)
+        total += len(batch)
+
+
+def restore(instance):
+    """Write the archived section rows of an inspection back and drop its archive"""
+    with transaction.atomic():
+        values = archived_values(instance)
+        for section in values:
+            row = section_of(instance, section)
+            if row._state.adding:
+                row.save(force_insert=True)
+        InspectionArchive.objects.filter(inspection=instance.pk).delete()
+        Inspection.objects.filter(pk=instance.pk).update(archived=False)
+    instance.archived = False
+    instance.__dict__.pop('_archived_values', None)
@@ -0,0 +1,64 @@
+# asyncapi.py
+"""
+`async def` API views with DRF's authentication, permissions and throttles.
+
+DRF's own views are synchronous. @async_api_view runs DRF's request checks
+(authentication loads the user, throttles read the cache) in one thread
+hop, then awaits the view on the event loop: under ASGI a view waiting on
+the database holds no worker thread. The view receives the DRF Request and
+may return a DRF Response (rendered as JSON) or any HttpResponse.
+"""
+import functools
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
+
+
+def async_api_view(permission_classes=None, throttle_classes=None):
+    """Decorator for async GET views; the classes default to REST_FRAMEWORK's"""
+    def decorator(func):
+        attrs = {'renderer_classes': [JSONRenderer]}
+        if permission_classes is not None:
+            attrs['permission_classes'] = permission_classes
+        if throttle_classes is not None:
+            attrs['throttle_classes'] = throttle_classes
+        # Only used for its request checks and response handling
+        checks = type(f'{func.__name__}_checks', (APIView,), attrs)
+
+        def finish(view, request, response):
+            response = view.finalize_response(request, response)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+            return response
+
+        def start(request, args, kwargs):
+            view = checks()
+            view.args, view.kwargs = args, kwargs
+            view.headers = view.default_response_headers
+            request = view.initialize_request(request, *args, **kwargs)
+            view.request = request
+            try:
+                if request.method not in ('GET', 'HEAD'):
+                    view.http_method_not_allowed(request)
+                view.initial(request, *args, **kwargs)
+            except Exception as exc:
+                return view, request, finish(view, request, view.handle_exception(exc))
+            return view, request, None
+
+        @functools.wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            view, request, refused = await sync_to_async(start)(request, args, kwargs)
+            if refused is not None:
+                return refused
+            try:
+                response = await func(request, *args, **kwargs)
+            except Exception as exc:
+                response = view.handle_exception(exc)
+            return finish(view, request, response)
+
+        # As APIView.as_view(): SessionAuthentication enforces CSRF itself
+        # (set by hand, Django 4.2's csrf_exempt() does not wrap async views)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
@@ -0,0 +1,350 @@
+# bulk.py
+"""
+Bulk export and import of inspections.
+
+Exports read the table in primary-key order through .iterator(chunk_size)
+(a server-side cursor on PostgreSQL) and write CSV or NDJSON as they go, so
+memory stays flat however many rows match. Media columns hold the blob
+references already stored on the row, never base64 payloads.
+
+Imports are for records that never went through the app (legacy paper
+inspections): they are validated field by field and written with
+bulk_create in batches. bulk_create sends no signals, so the status counters
+are rebuilt, the imported days queued for the analytics rollups and the
+cached responses invalidated once the import commits.
+"""
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import BooleanField, JSONField
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .amounts import VALUE_FIELDS, fill_amounts
+from .archive import unpack
+from .clients import KEY_FIELDS, fill_client_keys
+from .models import CustomUser, Inspection
+from .rollups import day_of, mark_days, schedule_refresh
+from .sections import bulk_create_sections, field_lookup
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+# Bytes collected before a chunk is handed to the response
+CHUNK_BYTES = 64 * 1024
+
+# Every field of an inspection, its section tables included
+_FIELDS = [
+    *Inspection._meta.concrete_fields,
+    *(f for model in Inspection.SECTION_MODELS.values() for f in model._meta.concrete_fields if f.name != 'inspection'),
+]
+
+# Export column -> ORM lookup
+EXPORT_COLUMNS = {'inspector_email': 'inspector__email'}
+for _field in _FIELDS:
+    if _field.name not in ('search_vector', 'archived'):
+        EXPORT_COLUMNS[_field.attname] = field_lookup(Inspection, _field.attname)
+DEFAULT_COLUMNS = [c for c in EXPORT_COLUMNS if c != 'inspector_id']
+
+# Set by the app (the track, counters, parsed amounts, client keys, search document) or only through the API (media)
+NOT_IMPORTED = {
+    'id', 'total_location_points', 'updated_at', 'site_photos', 'site_video', 'uploaded_documents', *VALUE_FIELDS,
+    *KEY_FIELDS, 'search_vector', 'archived',
+}
+IMPORT_FIELDS = {f.name: f for f in _FIELDS if f.name not in NOT_IMPORTED and f.name != 'inspector'}
+# Export columns an import ignores: identities and values derived on save
+SKIPPED_COLUMNS = {'inspector', 'inspector_id', 'inspector_email', 'id', 'updated_at', *VALUE_FIELDS, *KEY_FIELDS}
+BOOLEAN_WORDS = {
+    'true': True, 'yes': True, 'y': True, 't': True, '1': True,
+    'false': False, 'no': False, 'n': False, 'f': False, '0': False,
+}
+# Errors kept for the report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+
+# -------------------- Export --------------------
+
+def parse_export_params(params):
+    """
+    Read columns, status, branch_name, created_from / created_to (YYYY-MM-DD)
+    and quarter (e.g. 2024Q3) from query parameters or command options.
+    Raises ValueError with a message suitable for a 400 response.
+    """
+    options = {}
+    columns = params.get('columns')
+    if columns:
+        columns = [c.strip() for c in columns.split(',') if c.strip()]
+        unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+        if unknown:
+            raise ValueError(f"unknown columns: {', '.join(unknown)}")
+        options['columns'] = columns
+
+    for name in ('created_from', 'created_to'):
+        value = params.get(name)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+            options[name] = parsed
+
+    quarter = params.get('quarter')
+    if quarter:
+        try:
+            year, number = quarter.upper().split('Q')
+            year, number = int(year), int(number)
+            if not 1 <= number <= 4:
+                raise ValueError
+        except ValueError:
+            raise ValueError("quarter must look like 2024Q3")
+        next_quarter = date(year + 1, 1, 1) if number == 4 else date(year, 3 * number + 1, 1)
+        options['created_from'] = date(year, 3 * number - 2, 1)
+        options['created_to'] = next_quarter - timedelta(days=1)
+
+    for name in ('status', 'branch_name'):
+        if params.get(name):
+            options[name] = params.get(name)
+    return options
+
+
+def export_queryset(queryset, created_from=None, created_to=None, status=None, branch_name=None, **_):
+    if created_from:
+        queryset = queryset.filter(created_at__gte=_start_of(created_from))
+    if created_to:
+        queryset = queryset.filter(created_at__lt=_start_of(created_to + timedelta(days=1)))
+    if status:
+        queryset = queryset.filter(status=status)
+    if branch_name:
+        queryset = queryset.filter(branch_name=branch_name)
+    return queryset
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(queryset, columns, chunk_size=2000):
+    """Tuples of the column values, in id order, fetched `chunk_size` rows at a time"""
+    lookups = [EXPORT_COLUMNS[c] for c in columns]
+    # Archived inspections have their section columns in the archive document
+    sections = {i: Inspection.SECTION_FIELDS[c] for i, c in enumerate(columns) if c in Inspection.SECTION_FIELDS}
+    if not sections:
+        return queryset.order_by('id').values_list(*lookups).iterator(chunk_size=chunk_size)
+    rows = queryset.order_by('id').values_list(*lookups, 'archive__payload').iterator(chunk_size=chunk_size)
+    return (_with_archived(row, columns, sections) for row in rows)
+
+
+def _with_archived(row, columns, sections):
+    *row, payload = row
+    if payload is not None:
+        values = unpack(payload)
+        for i, section in sections.items():
+            row[i] = values.get(section, {}).get(columns[i])
+    return tuple(row)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class _Buffer:
+    """File-like target for csv.writer that keeps what was written"""
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+
+def csv_chunks(rows, columns):
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    size = 0
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+        size += len(buffer.parts[-1])
+        if size >= CHUNK_BYTES:
+            yield ''.join(buffer.parts).encode()
+            buffer.parts, size = [], 0
+    yield ''.join(buffer.parts).encode()
+
+
+def ndjson_chunks(rows, columns):
+    parts, size = [], 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_BYTES:
+            yield ''.join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode()
+
+
+def export_chunks(queryset, columns, output='csv', chunk_size=2000):
+    """The encoded export, as an iterator of byte strings"""
+    rows = export_rows(queryset, columns, chunk_size)
+    return csv_chunks(rows, columns) if output == 'csv' else ndjson_chunks(rows, columns)
+
+
+async def _async_chunks(chunks):
+    # Under ASGI Django would read a synchronous iterator to the end before
+    # sending anything; pull it in a thread instead, a few chunks per hop
+    def take():
+        return [chunk for _, chunk in zip(range(16), chunks)]
+    take = sync_to_async(take)
+    while True:
+        batch = await take()
+        if not batch:
+            return
+        for chunk in batch:
+            yield chunk
+
+
+def streaming_export(request, chunks, output, filename):
+    """StreamingHttpResponse serving `chunks` as a download, under WSGI or ASGI"""
+    if 'wsgi.input' not in request.META:
+        chunks = _async_chunks(chunks)
+    response = StreamingHttpResponse(chunks, content_type=FORMATS[output])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{output}"'
+    return response
+
+
+# -------------------- Import --------------------
+
+def read_records(fh, input_format):
+    """Dicts from a CSV (with a header row) or NDJSON text stream, one at a time"""
+    if input_format == 'csv':
+        yield from csv.DictReader(fh)
+        return
+    for line in fh:
+        if line.strip():
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Reported by build_inspection like any other bad record
+                yield line
+
+
+class InspectorLookup:
+    """Resolves `inspector_email` / `inspector_id` values, one query per distinct user"""
+    def __init__(self):
+        self.by_email, self.ids = {}, {}
+
+    def __call__(self, record):
+        email = record.get('inspector_email')
+        if email:
+            email = email.strip().lower()
+            if email not in self.by_email:
+                self.by_email[email] = CustomUser.objects.filter(email__iexact=email).values_list('id', flat=True).first()
+            user_id = self.by_email[email]
+        else:
+            user_id = record.get('inspector_id') or record.get('inspector')
+            try:
+                user_id = int(user_id)
+            except (TypeError, ValueError):
+                raise ValueError("inspector_email or inspector_id is required")
+            if user_id not in self.ids:
+                self.ids[user_id] = CustomUser.objects.filter(pk=user_id).exists()
+            user_id = user_id if self.ids[user_id] else None
+        if user_id is None:
+            raise ValueError("unknown inspector")
+        return user_id
+
+
+def build_inspection(record, inspector_lookup):
+    """An unsaved Inspection from an import record; raises ValueError naming the bad field"""
+    if not isinstance(record, dict):
+        raise ValueError("record must be a JSON object")
+    inspection = Inspection(inspector_id=inspector_lookup(record))
+    for name, value in record.items():
+        if name in SKIPPED_COLUMNS or value in ('', None):
+            # Export files carry these columns; they are not imported
+            continue
+        field = IMPORT_FIELDS.get(name)
+        if field is None:
+            raise ValueError(f"{name}: not an importable column")
+        if isinstance(field, BooleanField) and isinstance(value, str):
+            value = BOOLEAN_WORDS.get(value.strip().lower(), value)
+        elif isinstance(field, JSONField) and isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValueError(f"{name}: invalid JSON")
+        try:
+            value = field.clean(value, inspection)
+        except ValidationError as e:
+            raise ValueError(f"{name}: {' '.join(e.messages)}")
+        if isinstance(value, datetime) and timezone.is_naive(value):
+            value = timezone.make_aware(value)
+        setattr(inspection, field.attname, value)
+    fill_amounts(inspection)
+    fill_client_keys(inspection)
+    return inspection
+
+
+def _write_batch(batch, days):
+    created = Inspection.objects.bulk_create(batch)
+    bulk_create_sections(created)
+    # auto_now_add replaced the records' own dates; put them back, one UPDATE
+    # per distinct date (paper records are dated by the day)
+    by_date = {}
+    for obj in created:
+        if obj._import_created_at is not None:
+            by_date.setdefault(obj._import_created_at, []).append(obj.pk)
+    for created_at, ids in by_date.items():
+        Inspection.objects.filter(pk__in=ids).update(created_at=created_at)
+    days.update(day_of(obj._import_created_at or obj.created_at) for obj in created)
+    return len(created)
+
+
+def import_inspections(records, batch_size=1000, dry_run=False):
+    """
+    Validate and insert records in batches, all in one transaction; invalid
+    records are skipped. Returns (created, error_count, [(record number, message)]).
+    """
+    from . import counters
+    from .response_cache import invalidate
+
+    lookup = InspectorLookup()
+    created = error_count = 0
+    errors, batch, days = [], [], set()
+    with transaction.atomic():
+        for number, record in enumerate(records, start=1):
+            try:
+                inspection = build_inspection(record, lookup)
+            except ValueError as e:
+                error_count += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append((number, str(e)))
+                continue
+            inspection._import_created_at = inspection.created_at
+            batch.append(inspection)
+            if len(batch) >= batch_size:
+                created += _write_batch(batch, days)
+                batch = []
+        if batch:
+            created += _write_batch(batch, days)
+
+        if dry_run:
+            transaction.set_rollback(True)
+        elif created:
+            counters.rebuild()
+            mark_days(days)
+            transaction.on_commit(schedule_refresh)
+            transaction.on_commit(lambda: invalidate('inspections'))
+    return created, error_count, errors
@@ -0,0 +1,186 @@
+# clients.py
+"""
+Normalized client keys for finding earlier inspections of the same client.
+
+The same client comes back under different spellings: "M/S Rahim
+Textiles Ltd." and "Raheem Textile", "+880 1711-234567" and "01711234567",
+an account number with or without its leading zeros. Every inspection keeps
+one canonical key per identifier in an indexed column, set on save like the
+amount shadows (amounts.py):
+
+- tin_key: the digits of the TIN
+- account_key: the account number's letters and digits, leading zeros dropped
+- phone_key: the subscriber number without the 880 / 0 prefix
+- name_key: a phonetic code of the client name, so transliteration variants
+  of a Bengali name share a key
+
+Lookups are then equality matches on B-tree indexes, one OR over the four
+columns, on any backend.
+"""
+import re
+
+from django.db.models import Q
+
+# Ignored in names: legal forms, "M/S" and the honorific "Md."
+NAME_NOISE = {
+    'm', 's', 'ms', 'messrs', 'ltd', 'limited', 'pvt', 'private', 'co', 'company', 'and', 'the', 'of',
+    'md', 'mohammad', 'mohammed', 'muhammad', 'mohd',
+}
+# Spellings of one sound in romanized Bengali, applied in order
+SOUNDS = [
+    ('ph', 'f'), ('kh', 'k'), ('gh', 'g'), ('bh', 'b'), ('dh', 'd'), ('th', 't'), ('sh', 's'),
+    ('ck', 'k'), ('q', 'k'), ('z', 'j'), ('v', 'b'), ('x', 'ks'),
+]
+VOWELS = set('aeiouyhw')
+# As in search.py: Bengali vowel signs are not \w
+WORD = re.compile(r'(?:[^\W_]|[\u0980-\u09FF])+')
+MIN_TIN_DIGITS = 6
+MIN_PHONE_DIGITS = 7
+MAX_KEY_LENGTH = 100
+
+RESULT_FIELDS = [
+    'id', 'client_name', 'tin_number', 'account_number', 'phone_number',
+    'branch_name', 'status', 'inspector_id', 'created_at',
+]
+# Newest matching rows scored; a common name alone could match thousands
+MAX_CANDIDATES = 200
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def tin_key(text):
+    digits = re.sub(r'\D', '', str(text or ''))
+    return digits[:MAX_KEY_LENGTH] if len(digits) >= MIN_TIN_DIGITS else None
+
+
+def account_key(text):
+    key = re.sub(r'[\W_]', '', str(text or '')).upper().lstrip('0')
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def phone_key(text):
+    """Bangladeshi numbers with or without +880 / 00880 / 0; others by their digits"""
+    digits = re.sub(r'\D', '', str(text or ''))
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if digits.startswith('880'):
+        digits = digits[3:]
+    digits = digits.lstrip('0')
+    return digits[:MAX_KEY_LENGTH] if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def _phonetic(word):
+    if not word.isascii() or word.isdigit():
+        return word
+    if len(word) > 3 and word.endswith('s'):
+        word = word[:-1]
+    for spelling, sound in SOUNDS:
+        word = word.replace(spelling, sound)
+    # Keep the first letter (any vowel counts as one), then the consonants
+    code = 'a' if word[0] in VOWELS else word[0]
+    for letter in word[1:]:
+        if letter not in VOWELS and letter != code[-1]:
+            code += letter
+    return code
+
+
+def name_key(text):
+    words = [w for w in WORD.findall(str(text or '').lower()) if w not in NAME_NOISE]
+    return ' '.join(_phonetic(w) for w in words)[:MAX_KEY_LENGTH] or None
+
+
+# Key column -> (source field, normalizer)
+KEY_SOURCES = {
+    'tin_key': ('tin_number', tin_key),
+    'account_key': ('account_number', account_key),
+    'phone_key': ('phone_number', phone_key),
+    'name_key': ('client_name', name_key),
+}
+KEY_FIELDS = list(KEY_SOURCES)
+# How much a match on each key says, for ranking
+KEY_WEIGHTS = {'tin_key': 4, 'account_key': 4, 'phone_key': 3, 'name_key': 2}
+
+
+def fill_client_keys(instance, update_fields=None):
+    """
+    Set the keys of the source fields being saved (all of them when
+    `update_fields` is None); returns the names of the keys set.
+    """
+    changed = []
+    for key, (source, normalize) in KEY_SOURCES.items():
+        if update_fields is None or source in update_fields:
+            setattr(instance, key, normalize(getattr(instance, source)))
+            changed.append(key)
+    return changed
+
+
+def backfill(model, batch_size=1000):
+    """Recompute the keys of every row of `model` (historical models too); returns the number of rows changed"""
+    sources = [source for source, _ in KEY_SOURCES.values()]
+    changed = 0
+    batch = []
+    rows = model.objects.order_by('pk').values_list('pk', *sources, *KEY_FIELDS)
+    for row in rows.iterator(chunk_size=batch_size):
+        pk, texts, stored = row[0], row[1:len(sources) + 1], row[len(sources) + 1:]
+        keys = [normalize(text) for (_, normalize), text in zip(KEY_SOURCES.values(), texts)]
+        if keys != list(stored):
+            batch.append(model(pk=pk, **dict(zip(KEY_FIELDS, keys))))
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, KEY_FIELDS)
+            changed += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, KEY_FIELDS)
+        changed += len(batch)
+    return changed
+
+
+# -------------------- Lookup --------------------
+
+def parse_duplicate_params(params):
+    """
+    Keys from client_name, tin_number, account_number and phone_number (at
+    least one must give a key), plus exclude (an inspection id) and limit.
+    Raises ValueError with a message suitable for a 400 response.
+    """
+    keys = {}
+    for key, (source, normalize) in KEY_SOURCES.items():
+        value = normalize(params.get(source))
+        if value:
+            keys[key] = value
+    if not keys:
+        raise ValueError("give at least one of " + ', '.join(source for source, _ in KEY_SOURCES.values()))
+    options = {'keys': keys}
+
+    for name, low, high in (('exclude', 1, None), ('limit', 1, MAX_LIMIT)):
+        value = params.get(name)
+        if not value:
+            continue
+        try:
+            value = int(value)
+        except ValueError:
+            value = 0
+        if value < low or (high is not None and value > high):
+            raise ValueError(f"{name} must be a whole number from {low}" + (f" to {high}" if high else ''))
+        options[name] = value
+    return options
+
+
+def find_duplicates(queryset, keys, exclude=None, limit=DEFAULT_LIMIT):
+    """
+    Inspections in `queryset` sharing any of `keys`, as rows of RESULT_FIELDS
+    plus `matched` (the keys shared) and `score`, best and newest first.
+    """
+    match = Q(*[Q(**{key: value}) for key, value in keys.items()], _connector=Q.OR)
+    candidates = queryset.filter(match)
+    if exclude is not None:
+        candidates = candidates.exclude(pk=exclude)
+    rows = candidates.order_by('-created_at', '-id').values(*RESULT_FIELDS, *keys)[:MAX_CANDIDATES]
+
+    results = []
+    for row in rows:
+        matched = [key for key, value in keys.items() if row.pop(key) == value]
+        results.append({**row, 'matched': matched, 'score': sum(KEY_WEIGHTS[key] for key in matched)})
+    # Stable sort: equal scores stay newest first
+    results.sort(key=lambda row: row['score'], reverse=True)
+    return results[:limit]
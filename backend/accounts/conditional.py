@@ -0,0 +1,106 @@
+# conditional.py
+import asyncio
+import functools
+import hashlib
+import json
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .response_cache import anamespace_versions, namespace_versions
+
+
+def _etag(*parts):
+    return quote_etag(hashlib.sha1('|'.join(str(p) for p in parts).encode()).hexdigest())
+
+
+def queryset_validators(request, queryset, namespaces=()):
+    """
+    (ETag, Last-Modified) for a response built from `queryset`, from a single
+    max(updated_at)/count aggregate; nothing is serialized. The tag also covers
+    the URL and the caller, since ?fields=, cursors and filters change the body
+    for the same rows.
+
+    The aggregate only sees the rows' own updated_at. A body that also shows
+    related rows without one (inspector names from accounts_customuser) names
+    their response_cache namespaces in `namespaces`: the tag carries their
+    versions, so saving any such row changes every tag that depends on it.
+    """
+    row = queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return _validators(request, row, namespace_versions(namespaces))
+
+
+async def aqueryset_validators(request, queryset, namespaces=()):
+    """queryset_validators() for async views"""
+    row = await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('pk'))
+    return _validators(request, row, await anamespace_versions(namespaces))
+
+
+def _validators(request, row, versions):
+    last_modified = row['last_modified']
+    stamp = last_modified.isoformat() if last_modified else ''
+    return _etag(request.get_full_path(), request.user.pk, stamp, row['count'], *versions), last_modified
+
+
+def conditional_response(request, etag, last_modified, render):
+    """
+    Answer 304 when If-None-Match matches `etag`, otherwise call `render()`.
+
+    Only the ETag decides: a deleted row lowers the count but not
+    max(updated_at), so If-Modified-Since alone could report a stale list as
+    unchanged. Last-Modified is still sent for clients that display it.
+    """
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = render()
+    return _with_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, etag, last_modified, render):
+    """conditional_response() for async views; `render` is a coroutine function"""
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = await render()
+    return _with_validators(response, etag, last_modified)
+
+
+def _with_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        # Per-user data: clients may keep it but must revalidate every time
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def body_etag(view):
+    """
+    Conditional GET for small computed responses (the stats endpoints): the
+    tag is a hash of the body, which costs less than validating the rows it
+    was counted from. Apply below @api_view / @action / @async_api_view.
+    """
+    def tag(request, response):
+        if request.method != 'GET' or response.status_code != 200:
+            return response
+        if isinstance(response, Response):
+            body = json.dumps(response.data, sort_keys=True, default=str)
+        else:
+            body = response.content.decode()
+        etag = _etag(request.get_full_path(), request.user.pk, body)
+        return conditional_response(request, etag, None, lambda: response)
+
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            request = next(a for a in args if hasattr(a, 'method'))
+            return tag(request, await view(*args, **kwargs))
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request = next(a for a in args if hasattr(a, 'method'))
+        return tag(request, view(*args, **kwargs))
+    return wrapper
@@ -0,0 +1,98 @@
+# counters.py
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Inspection, InspectionStatusCounter
+
+COUNTED_FIELDS = {'branch_name', 'inspector', 'inspector_id', 'status'}
+
+
+def counter_key(branch_name, inspector_id, status):
+    # NULL would defeat the unique constraint, so "no branch" is stored as ''
+    return (branch_name or '', inspector_id, status)
+
+
+def adjust(key, delta):
+    """Add `delta` to one counter row; must run inside the transaction that changed the inspection"""
+    branch_name, inspector_id, status = key
+    rows = InspectionStatusCounter.objects.filter(
+        branch_name=branch_name, inspector_id=inspector_id, status=status
+    )
+    if rows.update(count=F('count') + delta) or delta < 0:
+        # A missing row is never created for a decrement: the user it belongs to
+        # may be in the middle of a cascade delete
+        return
+    try:
+        with transaction.atomic():
+            InspectionStatusCounter.objects.create(
+                branch_name=branch_name, inspector_id=inspector_id, status=status, count=delta
+            )
+    except IntegrityError:
+        # Another transaction created the row first
+        rows.update(count=F('count') + delta)
+
+
+def rebuild():
+    """Recompute every counter from the inspections table; returns the number of counter rows"""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Writers block on the counters until we commit, then apply their deltas on top
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {InspectionStatusCounter._meta.db_table} IN SHARE ROW EXCLUSIVE MODE'
+                )
+        InspectionStatusCounter.objects.all().delete()
+        rows = (
+            Inspection.objects.order_by()
+            .values('branch_name', 'inspector', 'status')
+            .annotate(total=Count('id'))
+        )
+        counters = {}
+        for row in rows.iterator():
+            key = counter_key(row['branch_name'], row['inspector'], row['status'])
+            counters[key] = counters.get(key, 0) + row['total']
+        InspectionStatusCounter.objects.bulk_create([
+            InspectionStatusCounter(branch_name=b, inspector_id=i, status=s, count=n)
+            for (b, i, s), n in counters.items()
+        ], batch_size=1000)
+        return len(counters)
+
+
+@receiver(pre_save, sender=Inspection)
+def remember_previous_key(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_counter_key = None
+    instance._counter_unchanged = False
+    if instance._state.adding:
+        return
+    if update_fields is not None and not COUNTED_FIELDS & set(update_fields):
+        instance._counter_unchanged = True
+        return
+    # Read (and lock) the stored row: the in-memory instance may be stale or partially loaded
+    previous = (
+        Inspection.objects.select_for_update()
+        .filter(pk=instance.pk)
+        .values_list('branch_name', 'inspector_id', 'status')
+        .first()
+    )
+    if previous is not None:
+        instance._previous_counter_key = counter_key(*previous)
+
+
+@receiver(post_save, sender=Inspection)
+def update_counters(sender, instance, created, raw=False, **kwargs):
+    if getattr(instance, '_counter_unchanged', False):
+        return
+    previous = getattr(instance, '_previous_counter_key', None)
+    current = counter_key(instance.branch_name, instance.inspector_id, instance.status)
+    if previous == current:
+        return
+    if previous is not None:
+        adjust(previous, -1)
+    adjust(current, 1)
+
+
+@receiver(post_delete, sender=Inspection)
+def decrement_counter(sender, instance, **kwargs):
+    adjust(counter_key(instance.branch_name, instance.inspector_id, instance.status), -1)
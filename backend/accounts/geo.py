@@ -0,0 +1,217 @@
+# geo.py
+"""
+Spatial index over inspection track points without PostGIS.
+
+Every point gets a `cell`: an integer geohash, i.e. the bits of its quantized
+longitude and latitude interleaved (Z-order), 30 bits each. Points sharing a
+geohash prefix share the high bits of `cell`, so the points inside any
+geohash cell are one integer range, and a region is a handful of ranges on
+the B-tree index. Ranges over integers need no special operator class or
+collation, so the same queries use the index on Postgres and SQLite.
+"""
+import math
+
+from django.db import transaction
+from django.db.models import Count, FloatField, Min, OuterRef, Q, Subquery, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+from .tracks import COORD_SCALE, decode, parse_points
+
+EARTH_RADIUS_KM = 6371.0088
+BITS = 30
+# Cells a query region is covered with; more means tighter ranges but a longer OR
+MAX_COVER_CELLS = 16
+
+
+# -------------------- Cells --------------------
+
+def _spread(value):
+    """Insert a zero bit above each of the 30 low bits of `value`"""
+    value &= (1 << BITS) - 1
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+
+def _quantize(value, low, span, level):
+    q = int((value - low) / span * (1 << level))
+    return min(max(q, 0), (1 << level) - 1)
+
+
+def cell_xy(latitude, longitude, level=BITS):
+    return _quantize(longitude, -180.0, 360.0, level), _quantize(latitude, -90.0, 180.0, level)
+
+
+def interleave(x, y):
+    # Longitude bits first, as in geohash
+    return (_spread(x) << 1) | _spread(y)
+
+
+def point_cell(latitude, longitude):
+    """The full-resolution cell (about 4 cm) of a point"""
+    return interleave(*cell_xy(latitude, longitude))
+
+
+def cover_ranges(min_lat, min_lng, max_lat, max_lng):
+    """
+    Half-open [start, end) ranges of cell values covering a bounding box, from
+    the finest level at which at most MAX_COVER_CELLS cells do it; adjacent
+    ranges are merged.
+    """
+    level = BITS
+    while level > 0:
+        x0, y0 = cell_xy(min_lat, min_lng, level)
+        x1, y1 = cell_xy(max_lat, max_lng, level)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= MAX_COVER_CELLS:
+            break
+        level -= 1
+    if level == 0:
+        return [(0, 1 << (2 * BITS))]
+
+    shift = 2 * (BITS - level)
+    starts = sorted(interleave(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1))
+    ranges = []
+    for code in starts:
+        start, end = code << shift, (code + 1) << shift
+        if ranges and ranges[-1][1] == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def cell_filter(min_lat, min_lng, max_lat, max_lng):
+    """Q over `cell` (index ranges) and the coordinates (exact box) for a bounding box"""
+    ranges = Q()
+    for start, end in cover_ranges(min_lat, min_lng, max_lat, max_lng):
+        ranges |= Q(cell__gte=start, cell__lt=end)
+    return ranges & Q(
+        latitude__gte=min_lat, latitude__lte=max_lat,
+        longitude__gte=min_lng, longitude__lte=max_lng,
+    )
+
+
+# -------------------- Distances --------------------
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def distance_km(latitude, longitude):
+    """haversine_km() from a point to each row's latitude/longitude, as a database expression"""
+    lat, lng = math.radians(latitude), math.radians(longitude)
+    a = (
+        Power(Sin((Radians('latitude') - lat) / 2), 2)
+        + Value(math.cos(lat)) * Cos(Radians('latitude')) * Power(Sin((Radians('longitude') - lng) / 2), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(Least(Value(1.0), a, output_field=FloatField())))
+
+
+def radius_bbox(latitude, longitude, radius_km):
+    """Bounding box of a circle, clamped to valid coordinates (no antimeridian wrap)"""
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    d_lng = 180.0 if cos_lat < 1e-9 else min(180.0, d_lat / cos_lat)
+    return (
+        max(-90.0, latitude - d_lat), max(-180.0, longitude - d_lng),
+        min(90.0, latitude + d_lat), min(180.0, longitude + d_lng),
+    )
+
+
+# -------------------- Queries --------------------
+
+def within_radius(queryset, latitude, longitude, radius_km, limit=None):
+    """
+    Inspections with a point within `radius_km`, nearest first, at most
+    `limit`: [(inspection_id, distance_km, lat, lng)] with each one's closest
+    point. Distances are grouped per inspection and ordered in the database;
+    a second query looks up the closest points of the inspections returned.
+    """
+    box = cell_filter(*radius_bbox(latitude, longitude, radius_km))
+    distance = distance_km(latitude, longitude)
+    rows = (
+        queryset.filter(box).alias(distance=distance).filter(distance__lte=radius_km)
+        .values('inspection_id').annotate(distance_km=Min('distance'))
+        .order_by('distance_km', 'inspection_id').values_list('inspection_id', 'distance_km')
+    )
+    found = list(rows[:limit] if limit else rows)
+    if not found:
+        return []
+
+    location_model = queryset.model
+    closest = (
+        location_model.objects.filter(box, inspection_id=OuterRef('pk'))
+        .alias(distance=distance).order_by('distance', 'pk')
+    )
+    inspection_model = location_model._meta.get_field('inspection').related_model
+    points = {
+        pk: (lat, lng) for pk, lat, lng in
+        inspection_model.objects.filter(pk__in=[i for i, _ in found]).annotate(
+            point_latitude=Subquery(closest.values('latitude')[:1]),
+            point_longitude=Subquery(closest.values('longitude')[:1]),
+        ).values_list('pk', 'point_latitude', 'point_longitude')
+    }
+    # An inspection deleted in between has no closest point left
+    return [(i, d, *points[i]) for i, d in found if i in points]
+
+
+def within_bbox(queryset, min_lat, min_lng, max_lat, max_lng, limit=None):
+    """Inspections with a point inside the box, by id, at most `limit`: [(inspection_id, point_count_inside)]"""
+    rows = (
+        queryset.filter(cell_filter(min_lat, min_lng, max_lat, max_lng))
+        .values('inspection_id').annotate(points_inside=Count('id'))
+        .order_by('inspection_id').values_list('inspection_id', 'points_inside')
+    )
+    return list(rows[:limit] if limit else rows)
+
+
+def nearest(queryset, latitude, longitude, k, start_km=1.0):
+    """
+    The `k` inspections with the closest points. Searches circles of doubling
+    radius: once one holds k inspections, nothing outside it can be closer.
+    """
+    radius_km = start_km
+    while True:
+        found = within_radius(queryset, latitude, longitude, radius_km, limit=k)
+        if len(found) >= k or radius_km >= math.pi * EARTH_RADIUS_KM:
+            return found
+        radius_km *= 4 if not found else 2
+
+
+# -------------------- Index maintenance --------------------
+
+def index_points(inspection_id, parsed, replace=False, location_model=None):
+    """Add parsed track points (see tracks.parse_point) to the index; `replace` drops the old ones first"""
+    if location_model is None:
+        from .models import InspectionLocation
+        location_model = InspectionLocation
+    if replace:
+        location_model.objects.filter(inspection_id=inspection_id).delete()
+    rows = []
+    for lat_e7, lng_e7, _, _ in parsed:
+        latitude, longitude = lat_e7 / COORD_SCALE, lng_e7 / COORD_SCALE
+        rows.append(location_model(
+            inspection_id=inspection_id, cell=point_cell(latitude, longitude),
+            latitude=latitude, longitude=longitude,
+        ))
+    location_model.objects.bulk_create(rows, batch_size=1000)
+
+
+def rebuild_index():
+    """Recreate the whole index from the packed tracks; returns the number of points"""
+    from .models import InspectionLocation, LocationTrack
+
+    total = 0
+    with transaction.atomic():
+        InspectionLocation.objects.all().delete()
+        for track in LocationTrack.objects.filter(point_count__gt=0).iterator(chunk_size=200):
+            parsed = parse_points(decode(track.data))
+            index_points(track.inspection_id, parsed)
+            total += len(parsed)
+    return total
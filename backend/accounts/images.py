@@ -0,0 +1,176 @@
+# images.py
+"""
+Bounded-size variants of inspection photos.
+
+A photo is decoded once, turned upright from its EXIF orientation, and
+re-encoded without EXIF (so no GPS coordinates or device data leave the
+server) into the VARIANTS below, largest first, each resized from the
+previous one. Generation runs as a background job (accounts.jobs) so it
+never holds up a request; photos stored before this existed are picked up by
+the generate_image_variants command.
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .jobs import enqueue, task
+from .media import media_url
+from .models import ImageVariant, Inspection, InspectionAttachment, MediaBlob
+
+logger = logging.getLogger(__name__)
+
+# name: (longest side in pixels, Pillow format, quality), largest first
+VARIANTS = [
+    (ImageVariant.NAME_ORIGINAL, 4096, 'JPEG', 85),
+    (ImageVariant.NAME_MEDIUM, 1280, 'WEBP', 80),
+    (ImageVariant.NAME_THUMB, 320, 'WEBP', 70),
+]
+FORMATS = {
+    'JPEG': ('image/jpeg', 'jpg'),
+    'WEBP': ('image/webp', 'webp'),
+}
+
+
+def variant_path(sha256, name, extension):
+    """Storage path of one variant of the blob with this hash"""
+    return f"variants/{sha256[:2]}/{sha256[2:4]}/{sha256}/{name}.{extension}"
+
+
+def variant_url(path, request=None):
+    return media_url(path, request)
+
+
+def _open(fh):
+    image = Image.open(fh)
+    if image.width * image.height > settings.IMAGE_MAX_PIXELS:
+        raise ValueError(f"image of {image.width}x{image.height} is too large")
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def _encode(image, image_format, quality):
+    out = io.BytesIO()
+    if image_format == 'JPEG':
+        if image.mode == 'RGBA':
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(out, image_format, quality=quality, method=4)
+    return out.getvalue()
+
+
+def generate_variants(blob):
+    """
+    Write every variant of an image blob and record its upright size on the
+    blob. Returns the ImageVariant rows; raises ValueError for content Pillow
+    cannot decode.
+    """
+    try:
+        with blob.file.open('rb') as fh:
+            image = _open(fh)
+            image.load()
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"cannot decode image {blob.sha256[:12]}: {e}")
+
+    width, height = image.size
+    variants = []
+    for name, longest, image_format, quality in VARIANTS:
+        if max(image.size) > longest:
+            image = image.copy()
+            image.thumbnail((longest, longest), Image.LANCZOS)
+        content = _encode(image, image_format, quality)
+        mime_type, extension = FORMATS[image_format]
+        path = variant_path(blob.sha256, name, extension)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        default_storage.save(path, ContentFile(content))
+        variant, _ = ImageVariant.objects.update_or_create(source=blob, name=name, defaults={
+            'file': path, 'mime_type': mime_type, 'size': len(content),
+            'width': image.width, 'height': image.height,
+        })
+        variants.append(variant)
+
+    MediaBlob.objects.filter(pk=blob.pk).update(width=width, height=height)
+    # Move updated_at so ETags and /api/sync/ hand out the new thumbnail URLs
+    Inspection.objects.filter(attachments__blob=blob).update(updated_at=timezone.now())
+    return variants
+
+
+def variants_by_sha(shas):
+    """{sha256: {name: ImageVariant}} for the given source blob hashes, in one query"""
+    found = {}
+    if shas:
+        for variant in ImageVariant.objects.filter(source__sha256__in=set(shas)).select_related('source'):
+            found.setdefault(variant.source.sha256, {})[variant.name] = variant
+    return found
+
+
+def variant_refs(variants, request=None):
+    """API fields describing an image's variants, added to its media reference"""
+    original = variants.get(ImageVariant.NAME_ORIGINAL)
+    thumb = variants.get(ImageVariant.NAME_THUMB)
+    return {
+        'width': original.source.width if original else None,
+        'height': original.source.height if original else None,
+        'thumbnail_url': variant_url(thumb.file.name, request) if thumb else None,
+        'variants': {
+            name: {
+                'url': variant_url(v.file.name, request),
+                'width': v.width, 'height': v.height,
+                'mime_type': v.mime_type, 'size': v.size,
+            }
+            for name, v in variants.items()
+        },
+    }
+
+
+def first_thumbnail_path():
+    """Subquery for Inspection rows: storage path of their first photo's thumbnail"""
+    return Subquery(
+        ImageVariant.objects.filter(
+            name=ImageVariant.NAME_THUMB,
+            source__attachments__inspection=OuterRef('pk'),
+            source__attachments__kind=InspectionAttachment.KIND_PHOTO,
+        ).order_by('source__attachments__position').values('file')[:1]
+    )
+
+
+def pending_photo_blobs(inspection=None):
+    """Ids of photo blobs that have no variants yet"""
+    attachments = InspectionAttachment.objects.filter(
+        kind=InspectionAttachment.KIND_PHOTO, blob__variants__isnull=True
+    )
+    if inspection is not None:
+        attachments = attachments.filter(inspection=inspection)
+    return set(attachments.values_list('blob_id', flat=True))
+
+
+# -------------------- Jobs --------------------
+
+@task('image_variants')
+def generate_variants_task(blob_id):
+    blob = MediaBlob.objects.filter(pk=blob_id).first()
+    if blob is None:
+        return
+    try:
+        generate_variants(blob)
+    except ValueError as e:
+        # Not an image Pillow can read; retrying will not change that
+        logger.warning("%s", e)
+
+
+def schedule_variants(blob_ids):
+    """Queue variant generation for these blobs (as part of the current transaction)"""
+    for blob_id in sorted(blob_ids):
+        enqueue('image_variants', {'blob_id': blob_id})
@@ -0,0 +1,226 @@
+# jobs.py
+"""
+Background jobs kept in the background_jobs table.
+
+enqueue() writes a row in the caller's transaction, so a job exists exactly
+when the work that asked for it committed. `manage.py run_worker` claims due
+rows with SELECT ... FOR UPDATE SKIP LOCKED (concurrent workers skip rows
+another worker holds instead of waiting for it), runs them on a bounded
+thread pool, and retries failures with exponential backoff until the job's
+max_attempts are used up.
+
+With JOBS_EAGER there is no worker: each commit that queued a job runs the
+jobs that are due in the committing process (run_due()). A job queued for
+later waits for the first such commit after its run_at, and a failure is
+recorded as failed at once, since no one would pick up its retry.
+"""
+import logging
+import os
+import random
+import signal
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# task name -> function called with the job's payload as keyword arguments
+TASKS = {}
+
+
+def task(name):
+    """Register a function as the task `name`"""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, payload=None, run_at=None, max_attempts=None):
+    """Queue a job; with JOBS_EAGER the due jobs run in this process as soon as the transaction commits"""
+    if name not in TASKS:
+        raise KeyError(f"unknown task {name!r}")
+    job = Job.objects.create(
+        task=name,
+        payload=payload or {},
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_EAGER:
+        transaction.on_commit(run_due)
+    return job
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the `attempts`-th failure: doubling, capped, with jitter"""
+    delay = min(settings.JOB_RETRY_MAX_DELAY, settings.JOB_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    # Jobs that failed together (SMTP down) should not all retry in the same second
+    return delay * random.uniform(0.5, 1.0)
+
+
+# -------------------- Claiming and running --------------------
+
+def release_stale(now=None):
+    """Jobs left running by a worker that died are queued again (or failed, if out of attempts)"""
+    now = now or timezone.now()
+    stale = Job.objects.filter(
+        status=Job.STATUS_RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    )
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.STATUS_FAILED, locked_by='', last_error='Worker stopped while running the job'
+    )
+    queued = stale.update(status=Job.STATUS_QUEUED, locked_by='', run_at=now)
+    return failed + queued
+
+
+def claim(worker_id, limit):
+    """Lock up to `limit` due jobs for this worker, marking them running"""
+    now = timezone.now()
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.STATUS_QUEUED, run_at__lte=now)
+            .order_by('run_at', 'id')[:limit]
+        )
+        if jobs:
+            Job.objects.filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.STATUS_RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1
+            )
+    for job in jobs:
+        job.status, job.locked_by, job.locked_at = Job.STATUS_RUNNING, worker_id, now
+        job.attempts += 1
+    return jobs
+
+
+def execute(job, retry=True):
+    """Run a claimed job and record the outcome; returns True if it succeeded"""
+    func = TASKS.get(job.task)
+    try:
+        if func is None:
+            raise LookupError(f"unknown task {job.task!r}")
+        func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        now = timezone.now()
+        if not retry or job.attempts >= job.max_attempts:
+            logger.error("job %s (%s) failed for good:\n%s", job.pk, job.task, error)
+            changes = {'status': Job.STATUS_FAILED}
+        else:
+            logger.warning("job %s (%s) failed, attempt %s of %s", job.pk, job.task, job.attempts, job.max_attempts)
+            changes = {
+                'status': Job.STATUS_QUEUED,
+                'run_at': now + timedelta(seconds=retry_delay(job.attempts)),
+            }
+        Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+            locked_by='', last_error=error[-4000:], updated_at=now, **changes
+        )
+        return False
+
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=Job.STATUS_DONE, locked_by='', last_error='', updated_at=timezone.now()
+    )
+    return True
+
+
+def run_due():
+    """Run the due jobs in this process (JOBS_EAGER), without retries; later ones stay queued"""
+    worker_id = f"eager:{os.getpid()}"
+    while True:
+        jobs = claim(worker_id, settings.JOB_CONCURRENCY)
+        for job in jobs:
+            execute(job, retry=False)
+        if len(jobs) < settings.JOB_CONCURRENCY:
+            return
+
+
+def prune(days=None):
+    """Delete finished jobs older than JOB_KEEP_DAYS; failed ones are kept for inspection"""
+    cutoff = timezone.now() - timedelta(days=days if days is not None else settings.JOB_KEEP_DAYS)
+    count, _ = Job.objects.filter(status=Job.STATUS_DONE, updated_at__lt=cutoff).delete()
+    return count
+
+
+# -------------------- Worker --------------------
+
+def _execute_in_thread(job):
+    try:
+        return execute(job)
+    except Exception:
+        # Recording the outcome failed (database gone?); the job stays running
+        # until release_stale() hands it out again
+        logger.exception("job %s (%s): could not record the outcome", job.pk, job.task)
+        return False
+    finally:
+        # Each pool thread has its own connection; do not hold it between jobs
+        connection.close()
+
+
+def run_worker(concurrency=None, poll_interval=None, once=False):
+    """
+    Claim and run jobs until SIGINT/SIGTERM (or, with `once`, until none are
+    due), at most `concurrency` at a time. Returns (succeeded, failed) counts.
+    """
+    concurrency = concurrency or settings.JOB_CONCURRENCY
+    poll_interval = poll_interval if poll_interval is not None else settings.JOB_POLL_INTERVAL
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    stopping = threading.Event()
+    if not once and threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            # Finish the running jobs, claim no more
+            signal.signal(signum, lambda *_: stopping.set())
+
+    succeeded = failed = 0
+    running = set()
+    last_housekeeping = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job-worker') as pool:
+        while not stopping.is_set():
+            if time.monotonic() - last_housekeeping > 60:
+                release_stale()
+                prune()
+                last_housekeeping = time.monotonic()
+
+            for future in [f for f in running if f.done()]:
+                running.discard(future)
+                if future.result():
+                    succeeded += 1
+                else:
+                    failed += 1
+
+            jobs = claim(worker_id, concurrency - len(running)) if len(running) < concurrency else []
+            for job in jobs:
+                running.add(pool.submit(_execute_in_thread, job))
+
+            if not jobs:
+                if once and not running:
+                    break
+                stopping.wait(poll_interval if not running else min(poll_interval, 0.1))
+
+        for future in running:
+            if future.result():
+                succeeded += 1
+            else:
+                failed += 1
+    return succeeded, failed
+
+
+# -------------------- Tasks --------------------
+
+@task('send_email')
+def send_email_task(subject, message, recipient_list, from_email=None):
+    send_mail(
+        subject=subject,
+        message=message,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipient_list=recipient_list,
+    )
@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.archive import archive, ensure_partitions
+
+
+class Command(BaseCommand):
+    help = (
+        'Create the yearly archive partitions up to --years-ahead, then pack the sections of approved and '
+        'rejected inspections older than ARCHIVE_AFTER_DAYS into the archive'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help='Archive inspections created more than this many days ago')
+        parser.add_argument('--years-ahead', type=int, default=1,
+                            help='Partitions to create past the current year')
+        parser.add_argument('--partitions-only', action='store_true', help='Only create the partitions')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        before = now - timedelta(days=options['days'])
+        created = ensure_partitions(before.year, now.year + options['years_ahead'])
+        self.stdout.write(f"Created {len(created)} archive partitions")
+        if options['partitions_only']:
+            return
+        count = archive(before, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Archived {count} inspections"))
@@ -0,0 +1,107 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.geo import haversine_km, nearest, point_cell, within_bbox, within_radius
+from accounts.models import CustomUser, Inspection, InspectionLocation
+
+# Roughly Bangladesh
+LAT_RANGE = (20.6, 26.6)
+LNG_RANGE = (88.0, 92.7)
+
+
+class Command(BaseCommand):
+    help = (
+        'Time radius, bounding-box and nearest-k queries against the spatial index on '
+        'synthetic track points. Everything is written in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--points', type=int, default=1_000_000)
+        parser.add_argument('--inspections', type=int, default=5000)
+        parser.add_argument('--queries', type=int, default=50, help='Queries timed per kind')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--skip-scan', action='store_true', help='Do not time the unindexed full scan')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.populate(rng, options['points'], options['inspections'])
+            self.run(rng, options['queries'], options['skip_scan'])
+            transaction.set_rollback(True)
+
+    def populate(self, rng, points, inspections):
+        started = time.perf_counter()
+        user = CustomUser.objects.create(
+            user_name='geo-benchmark', username='geo-benchmark', email='geo-benchmark@example.invalid'
+        )
+        Inspection.objects.bulk_create(
+            [Inspection(inspector=user, branch_name='Benchmark') for _ in range(inspections)], batch_size=1000
+        )
+        ids = list(Inspection.objects.filter(inspector=user).values_list('id', flat=True))
+
+        # Each inspection is a short walk around a random site
+        per_inspection = max(1, points // len(ids))
+        batch = []
+        written = 0
+        for inspection_id in ids:
+            lat, lng = rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+            for _ in range(per_inspection if inspection_id != ids[-1] else points - written):
+                lat += rng.gauss(0, 0.0005)
+                lng += rng.gauss(0, 0.0005)
+                batch.append(InspectionLocation(
+                    inspection_id=inspection_id, cell=point_cell(lat, lng), latitude=lat, longitude=lng
+                ))
+                written += 1
+                if len(batch) >= 50_000:
+                    InspectionLocation.objects.bulk_create(batch, batch_size=5000)
+                    batch = []
+        InspectionLocation.objects.bulk_create(batch, batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {InspectionLocation._meta.db_table}')
+        self.stdout.write(f"Inserted {written} points for {len(ids)} inspections in {time.perf_counter() - started:.1f}s")
+
+    def run(self, rng, queries, skip_scan):
+        locations = InspectionLocation.objects.all()
+
+        def center():
+            return rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)
+
+        def box(size):
+            lat, lng = center()
+            return lat, lng, lat + size, lng + size
+
+        kinds = [
+            ('radius 1 km', lambda: within_radius(locations, *center(), 1)),
+            ('radius 10 km', lambda: within_radius(locations, *center(), 10)),
+            ('radius 50 km', lambda: within_radius(locations, *center(), 50)),
+            ('bbox 0.1 deg', lambda: within_bbox(locations, *box(0.1))),
+            ('nearest 10', lambda: nearest(locations, *center(), 10)),
+        ]
+        for name, query in kinds:
+            timings, sizes = [], []
+            for _ in range(queries):
+                started = time.perf_counter()
+                sizes.append(len(query()))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{name:>14}: median {statistics.median(timings):8.2f} ms  "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms  "
+                f"avg results {statistics.mean(sizes):.1f}"
+            )
+
+        if not skip_scan:
+            # What answering a radius query cost before the index: every point through Python
+            lat, lng = center()
+            started = time.perf_counter()
+            hits = {
+                i for i, plat, plng in locations.values_list('inspection_id', 'latitude', 'longitude').iterator()
+                if haversine_km(lat, lng, plat, plng) <= 10
+            }
+            self.stdout.write(
+                f"{'full scan 10 km':>14}: {(time.perf_counter() - started) * 1000:8.2f} ms  results {len(hits)}"
+            )
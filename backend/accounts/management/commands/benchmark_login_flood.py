@@ -0,0 +1,74 @@
+import logging
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+
+from accounts.models import CustomUser
+
+PASSWORD = 'correct horse battery staple'
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a login flood from one address interleaved with logins of legitimate users, '
+        'with and without the throttles, and compare what the legitimate users get. '
+        'Users are created in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--flood', type=int, default=200, help='Attack requests per run')
+        parser.add_argument('--every', type=int, default=10, help='One legitimate login per this many attack requests')
+        parser.add_argument('--targets', type=int, default=50, help='Existing accounts the attacker guesses at')
+
+    def handle(self, *args, **options):
+        # Every refused attempt would otherwise be logged as a 4xx
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            password_hash = make_password(PASSWORD)
+            targets = [f'victim{i}@bench.invalid' for i in range(options['targets'])]
+            CustomUser.objects.bulk_create([
+                CustomUser(email=email, username=email, user_name=email, password=password_hash)
+                for email in targets + ['legit@bench.invalid']
+            ])
+
+            rates = settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']
+            unthrottled = {**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {scope: None for scope in rates}}
+            with override_settings(REST_FRAMEWORK=unthrottled):
+                self.run('without throttling', targets, options, attacker='203.0.113.1')
+            self.run('with throttling', targets, options, attacker='203.0.113.2')
+            transaction.set_rollback(True)
+
+    def run(self, label, targets, options, attacker):
+        client = Client()
+        legit_times, legit_ok, refused = [], 0, 0
+        started = time.perf_counter()
+        for i in range(options['flood']):
+            response = client.post('/api/token/', {
+                'email': targets[i % len(targets)], 'password': f'guess-{i}', 'role': 'inspector',
+            }, content_type='application/json', REMOTE_ADDR=attacker)
+            refused += response.status_code == 429
+
+            if i % options['every'] == 0:
+                request_started = time.perf_counter()
+                response = client.post('/api/token/', {
+                    'email': 'legit@bench.invalid', 'password': PASSWORD, 'role': 'inspector',
+                }, content_type='application/json', REMOTE_ADDR=f'198.51.100.{i % 250 + 1}')
+                legit_times.append((time.perf_counter() - request_started) * 1000)
+                legit_ok += response.status_code == 200
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.MIGRATE_HEADING(label))
+        self.stdout.write(
+            f"  attack: {options['flood']} requests, {refused} refused with 429 "
+            f"({options['flood'] - refused} password hashes computed)"
+        )
+        self.stdout.write(
+            f"  legitimate: {legit_ok}/{len(legit_times)} logged in, "
+            f"median {statistics.median(legit_times):.0f} ms, "
+            f"{legit_ok / elapsed:.2f} logins per second of server time ({elapsed:.1f}s total)"
+        )
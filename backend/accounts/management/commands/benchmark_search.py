@@ -0,0 +1,86 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.models import CustomUser, Inspection
+from accounts.search import SEARCH_FIELDS, WORD, fragment_match, search
+
+FIRST = ['Rahim', 'Karim', 'Abdul', 'Nusrat', 'Shafiq', 'Jamal', 'Farhana', 'Mizanur', 'Selina', 'Habib', 'Tanvir']
+LAST = ['Uddin', 'Hossain', 'Ahmed', 'Rahman', 'Islam', 'Chowdhury', 'Begum', 'Sarkar', 'Mia', 'Khan']
+TRADES = ['Textiles', 'Traders', 'Agro', 'Poultry', 'Steel', 'Garments', 'Pharma', 'Rice Mill', 'Enterprise']
+GROUPS = ['Akij', 'Bashundhara', 'Meghna', 'PRAN', 'Square', 'City', 'Abul Khair', None]
+
+
+class Command(BaseCommand):
+    help = (
+        'Time /api/inspections/search/ queries against the ILIKE scan the admin search used to run, '
+        'on synthetic inspections. Everything is written in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500_000)
+        parser.add_argument('--queries', type=int, default=30, help='Queries timed per kind')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            self.populate(rng, options['rows'])
+            self.run(rng, options['queries'])
+            transaction.set_rollback(True)
+
+    def populate(self, rng, rows):
+        started = time.perf_counter()
+        user = CustomUser.objects.create(
+            user_name='search-benchmark', username='search-benchmark', email='search-benchmark@example.invalid'
+        )
+        batch = []
+        for _ in range(rows):
+            owner = f'{rng.choice(FIRST)} {rng.choice(LAST)}'
+            batch.append(Inspection(
+                inspector=user, branch_name='Benchmark',
+                client_name=f'{rng.choice(FIRST)} {rng.choice(TRADES)} {rng.randint(1, 9999)}',
+                owner_name=owner, group_name=rng.choice(GROUPS), industry_name=rng.choice(TRADES),
+                phone_number=f'01{rng.randint(3, 9)}{rng.randint(0, 99_999_999):08d}',
+            ))
+            if len(batch) >= 5000:
+                Inspection.objects.bulk_create(batch)
+                batch = []
+        Inspection.objects.bulk_create(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Inspection._meta.db_table}')
+        self.stdout.write(f"Inserted {rows} inspections in {time.perf_counter() - started:.1f}s")
+
+    def run(self, rng, queries):
+        inspections = Inspection.objects.all()
+
+        def ilike(text):
+            # What the admin and SearchFilter ran: every word in one of the fields, newest first
+            words = WORD.findall(text.lower())
+            return list(inspections.filter(fragment_match(words)).order_by('-created_at').values('id')[:20])
+
+        texts = {
+            'full name': lambda: f'{rng.choice(FIRST)} {rng.choice(TRADES)}',
+            'prefix': lambda: rng.choice(FIRST)[:3],
+            'fragment': lambda: rng.choice(LAST)[1:5],
+            'phone part': lambda: f'{rng.randint(0, 99_999_999):08d}'[:5],
+            'no match': lambda: 'Zzyzx',
+        }
+        self.stdout.write(f"backend {connection.vendor}, fields {', '.join(SEARCH_FIELDS)}")
+        for name, text in texts.items():
+            for label, query in (('search', lambda t: search(inspections, WORD.findall(t.lower()))), ('ilike', ilike)):
+                timings, sizes = [], []
+                for _ in range(queries):
+                    value = text()
+                    started = time.perf_counter()
+                    sizes.append(len(query(value)))
+                    timings.append((time.perf_counter() - started) * 1000)
+                timings.sort()
+                self.stdout.write(
+                    f"{name:>10} {label:>6}: median {statistics.median(timings):8.2f} ms  "
+                    f"p95 {timings[int(len(timings) * 0.95) - 1]:8.2f} ms  "
+                    f"avg results {statistics.mean(sizes):.1f}"
+                )
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bulk import DEFAULT_COLUMNS, FORMATS, export_chunks, export_queryset, parse_export_params
+from accounts.models import Inspection
+
+
+class Command(BaseCommand):
+    help = 'Write inspections as CSV or NDJSON, streamed from a server-side cursor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='File to write (default: standard output)')
+        parser.add_argument('--format', choices=list(FORMATS), help='Default: from the file extension, else csv')
+        parser.add_argument('--columns', help='Comma-separated columns (default: all)')
+        parser.add_argument('--quarter', help='e.g. 2024Q3')
+        parser.add_argument('--created-from', help='YYYY-MM-DD')
+        parser.add_argument('--created-to', help='YYYY-MM-DD')
+        parser.add_argument('--status')
+        parser.add_argument('--branch-name')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched per round trip')
+
+    def handle(self, *args, **options):
+        output_format = options['format']
+        if output_format is None:
+            path = options['output'] or ''
+            output_format = 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+        try:
+            params = parse_export_params(options)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        queryset = export_queryset(Inspection.objects.all(), **params)
+        chunks = export_chunks(queryset, params.get('columns', DEFAULT_COLUMNS), output_format, options['chunk_size'])
+        out = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        size = 0
+        try:
+            for chunk in chunks:
+                out.write(chunk)
+                size += len(chunk)
+        finally:
+            if options['output']:
+                out.close()
+        if options['output']:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {size} bytes to {options['output']}"))
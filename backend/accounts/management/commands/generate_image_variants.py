@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from accounts.images import generate_variants, pending_photo_blobs
+from accounts.models import InspectionAttachment, MediaBlob
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail/medium/original variants for photos that have none (or all photos with --all)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Regenerate variants of every photo')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            blob_ids = set(InspectionAttachment.objects.filter(
+                kind=InspectionAttachment.KIND_PHOTO
+            ).values_list('blob_id', flat=True))
+        else:
+            blob_ids = pending_photo_blobs()
+
+        done = failed = 0
+        for blob in MediaBlob.objects.filter(pk__in=blob_ids).iterator():
+            try:
+                generate_variants(blob)
+                done += 1
+            except ValueError as e:
+                failed += 1
+                self.stderr.write(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Generated variants for {done} photos ({failed} could not be decoded)"))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.bulk import FORMATS, import_inspections, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Insert inspections from a CSV or NDJSON file (e.g. digitised paper inspections) with bulk_create. '
+        'Rows name their inspector with inspector_email or inspector_id; invalid rows are skipped and reported.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=list(FORMATS), help='Default: from the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Validate and insert, then roll back')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        try:
+            fh = open(path, newline='', encoding='utf-8-sig')
+        except OSError as e:
+            raise CommandError(str(e))
+        with fh:
+            created, error_count, errors = import_inspections(
+                read_records(fh, input_format), batch_size=options['batch_size'], dry_run=options['dry_run']
+            )
+
+        for number, message in errors:
+            self.stderr.write(f"record {number}: {message}")
+        if error_count > len(errors):
+            self.stderr.write(f"... and {error_count - len(errors)} more")
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {created} inspections ({error_count} records skipped)"))
@@ -0,0 +1,103 @@
+import http.client
+import json
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = [
+    '/api/current-user/',
+    '/api/new-inspections/list/',
+    '/api/inspection/stats/',
+    '/api/branch/inspection-stats/?branch_name=Dhaka',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load a running server with GET requests from concurrent keep-alive clients and report '
+        'requests per second and latency percentiles. Run it against runserver/WSGI and '
+        'gunicorn.conf.py to compare serving modes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Server to load')
+        parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS, help='Paths requested in turn')
+        parser.add_argument('--concurrency', type=int, default=32, help='Clients sending requests at once')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run')
+        parser.add_argument('--token', help='JWT access token to send')
+        parser.add_argument('--email', help='Log in as this user to get a token')
+        parser.add_argument('--password')
+        parser.add_argument('--role', default='inspector')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['url'])
+        token = options['token']
+        if token is None and options['email']:
+            token = self.login(url, options)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+
+        latencies, errors = [], {}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+
+        def client(offset):
+            conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+            mine, failed = [], {}
+            i = offset
+            while time.perf_counter() < deadline:
+                path = options['paths'][i % len(options['paths'])]
+                i += 1
+                started = time.perf_counter()
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    status = response.status
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                    conn.close()
+                    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+                if status == 200:
+                    mine.append(time.perf_counter() - started)
+                else:
+                    failed[status] = failed.get(status, 0) + 1
+            conn.close()
+            with lock:
+                latencies.extend(mine)
+                for status, count in failed.items():
+                    errors[status] = errors.get(status, 0) + count
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not latencies:
+            raise CommandError(f"no successful requests; errors: {errors}")
+        latencies.sort()
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+        self.stdout.write(
+            f"{len(latencies)} requests in {elapsed:.1f}s with {options['concurrency']} clients: "
+            f"{len(latencies) / elapsed:.0f} req/s, "
+            f"median {statistics.median(latencies) * 1000:.1f} ms, p99 {percentile(0.99):.1f} ms, "
+            f"max {latencies[-1] * 1000:.1f} ms"
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"errors: {errors}"))
+
+    def login(self, url, options):
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+        body = json.dumps({'email': options['email'], 'password': options['password'], 'role': options['role']})
+        conn.request('POST', '/api/token/', body=body, headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        data = json.loads(response.read() or b'{}')
+        conn.close()
+        if response.status != 200:
+            raise CommandError(f"login failed ({response.status}): {data}")
+        return data['access']
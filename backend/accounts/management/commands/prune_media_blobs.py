@@ -0,0 +1,31 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import ProtectedError
+
+from accounts.models import MediaBlob
+
+
+class Command(BaseCommand):
+    help = 'Delete blob store files that are no longer referenced by any inspection attachment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        orphans = MediaBlob.objects.filter(attachments__isnull=True)
+        count = 0
+        freed = 0
+        for blob in orphans.iterator(chunk_size=500):
+            if not options['dry_run']:
+                try:
+                    blob.delete()
+                except ProtectedError:
+                    # Re-attached since the query ran
+                    continue
+                if blob.file.name and default_storage.exists(blob.file.name):
+                    default_storage.delete(blob.file.name)
+            count += 1
+            freed += blob.size
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} orphaned blobs ({freed} bytes)"))
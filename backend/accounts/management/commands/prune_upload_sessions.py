@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import UploadSession
+from accounts.uploads import discard_part
+
+
+class Command(BaseCommand):
+    help = 'Delete chunked upload sessions (and their part files) that have been idle for too long'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=48, help='Idle time after which an open session is dropped')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        count = 0
+        for session in stale.iterator():
+            discard_part(session)
+            session.delete()
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Deleted {count} stale upload sessions"))
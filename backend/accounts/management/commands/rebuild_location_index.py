@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.geo import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Recreate the spatial index of inspection track points from the stored tracks'
+
+    def handle(self, *args, **options):
+        points = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {points} track points"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recompute the per-branch/per-inspector status counters from the inspections table'
+
+    def handle(self, *args, **options):
+        rows = rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} status counters"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accounts.rollups import rebuild, refresh
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily analytics rollups of the queued days (--all: of every day)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Rebuild every rollup from the inspections table')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            rows = rebuild()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} daily rollups"))
+        else:
+            days = refresh()
+            self.stdout.write(self.style.SUCCESS(f"Refreshed the rollups of {days} days"))
@@ -0,0 +1,257 @@
+# media.py
+import base64
+import binascii
+import hashlib
+import logging
+import mimetypes
+import re
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from .models import MediaBlob, InspectionAttachment
+from .sections import update_columns
+
+# Inspection JSON fields that may carry inline base64 payloads, and the attachment kind they map to
+MEDIA_FIELDS = {
+    'site_photos': InspectionAttachment.KIND_PHOTO,
+    'site_video': InspectionAttachment.KIND_VIDEO,
+    'uploaded_documents': InspectionAttachment.KIND_DOCUMENT,
+}
+
+# Fields holding one entry (a dict) rather than a list
+SINGLE_FIELDS = {'site_video'}
+
+PAYLOAD_KEY = 'base64_data'
+
+# Storage paths the media_file view serves: a blob, or a variant of one (accounts.images)
+SERVED_PATH = re.compile(
+    r'(?:blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<blob>[0-9a-f]{64})'
+    r'|variants/[0-9a-f]{2}/[0-9a-f]{2}/(?P<source>[0-9a-f]{64})/[a-z]+\.[a-z]+)'
+)
+
+logger = logging.getLogger(__name__)
+
+
+def blob_path(sha256):
+    """Storage path of a blob, sharded by the first bytes of its hash"""
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def media_url(path, request=None):
+    """URL of a stored blob or variant, served by the media_file view to users allowed to see it"""
+    url = reverse('media-file', kwargs={'path': path})
+    if request is not None:
+        url = request.build_absolute_uri(url)
+    return url
+
+
+def blob_url(sha256, request=None):
+    return media_url(blob_path(sha256), request)
+
+
+def served_sha256(path):
+    """Hash of the blob a servable storage path belongs to, or None for any other path"""
+    match = SERVED_PATH.fullmatch(path)
+    return match and (match['blob'] or match['source'])
+
+
+def decode_payload(payload):
+    """
+    Decode a base64 string or a data URL ("data:image/jpeg;base64,...").
+    Returns (content, mime_type); mime_type is '' when the payload does not say.
+    """
+    mime_type = ''
+    if payload.startswith('data:') and ',' in payload:
+        header, payload = payload.split(',', 1)
+        mime_type = header[5:].split(';', 1)[0]
+    try:
+        content = base64.b64decode(payload)
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid base64 media payload')
+    return content, mime_type
+
+
+def check_inline_media(value):
+    """Raise ValueError unless every inline payload of a media field value decodes (serializer validation)"""
+    entries, _ = _entries(value)
+    for position, entry in enumerate(entries):
+        if isinstance(entry, dict) and entry.get(PAYLOAD_KEY):
+            try:
+                decode_payload(entry[PAYLOAD_KEY])
+            except ValueError as e:
+                raise ValueError(f"entry {position}: {e}")
+
+
+def entry_name(entry):
+    return entry.get('name') or entry.get('file_name') or ''
+
+
+def store_blob(content, mime_type='', blob_model=MediaBlob):
+    """Store bytes under their content hash; identical content is only written once"""
+    sha256 = hashlib.sha256(content).hexdigest()
+    blob = blob_model.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+
+    path = blob_path(sha256)
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    blob, _ = blob_model.objects.get_or_create(
+        sha256=sha256,
+        defaults={'size': len(content), 'mime_type': mime_type, 'file': path},
+    )
+    return blob
+
+
+def file_sha256(path, read_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(read_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_blob_from_path(path, size, mime_type='', sha256=None, blob_model=MediaBlob):
+    """Like store_blob() for a file on disk; content is hashed and copied in chunks"""
+    sha256 = sha256 or file_sha256(path)
+    blob = blob_model.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+
+    target = blob_path(sha256)
+    if not default_storage.exists(target):
+        with open(path, 'rb') as fh:
+            default_storage.save(target, File(fh))
+    blob, _ = blob_model.objects.get_or_create(
+        sha256=sha256,
+        defaults={'size': size, 'mime_type': mime_type, 'file': target},
+    )
+    return blob
+
+
+def attach_blob(inspection, blob, kind, name='', field=None):
+    """Attach a stored blob to an inspection and append its reference to the matching media field"""
+    field = field or next(f for f, k in MEDIA_FIELDS.items() if k == kind)
+    entries, single = _entries(getattr(inspection, field))
+    single = single or field in SINGLE_FIELDS
+    attachment = InspectionAttachment.objects.create(
+        inspection=inspection, blob=blob, kind=kind,
+        name=name[:255], position=0 if single else len(entries),
+    )
+    ref = attachment_ref(attachment, blob, {'name': name})
+    setattr(inspection, field, ref if single else entries + [ref])
+    inspection.save(update_fields=[field, 'updated_at'])
+    return attachment
+
+
+def attachment_ref(attachment, blob, entry=None):
+    """Small JSON reference kept on the Inspection in place of the payload"""
+    ref = {k: v for k, v in (entry or {}).items() if k != PAYLOAD_KEY}
+    ref.update({
+        'id': attachment.id,
+        'sha256': blob.sha256,
+        'size': blob.size,
+        'mime_type': blob.mime_type,
+        'name': attachment.name,
+    })
+    return ref
+
+
+def _entries(value):
+    """Media fields hold either a list of entries or (site_video) a single dict"""
+    if isinstance(value, dict):
+        return [value] if value else [], True
+    return list(value or []), False
+
+
+def extract_inline_media(inspection, attachment_model=InspectionAttachment, blob_model=MediaBlob):
+    """
+    Move every inline base64 payload of `inspection` into the blob store and
+    replace it with a reference. Returns the dict of rewritten fields.
+    """
+    changed = {}
+    for field, kind in MEDIA_FIELDS.items():
+        entries, single = _entries(getattr(inspection, field))
+        if not any(isinstance(e, dict) and e.get(PAYLOAD_KEY) for e in entries):
+            continue
+
+        refs = []
+        for position, entry in enumerate(entries):
+            if isinstance(entry, dict) and entry.get(PAYLOAD_KEY):
+                try:
+                    content, mime_type = decode_payload(entry[PAYLOAD_KEY])
+                except ValueError:
+                    # The API refuses these (check_inline_media); from elsewhere keep the entry as it came
+                    logger.warning("inspection %s: undecodable %s entry %s left inline", inspection.pk, field, position)
+                    refs.append(entry)
+                    continue
+                name = entry_name(entry)
+                mime_type = (
+                    mime_type or entry.get('mime_type')
+                    or mimetypes.guess_type(name)[0] or 'application/octet-stream'
+                )
+                blob = store_blob(content, mime_type, blob_model=blob_model)
+                attachment = attachment_model.objects.create(
+                    inspection=inspection, blob=blob, kind=kind,
+                    name=name[:255], position=position,
+                )
+                entry = attachment_ref(attachment, blob, entry)
+            refs.append(entry)
+
+        changed[field] = refs[0] if single else refs
+
+    if changed:
+        for field, value in changed.items():
+            setattr(inspection, field, value)
+        update_columns(inspection, changed)
+    return changed
+
+
+def referenced_attachment_ids(inspection):
+    ids = set()
+    for field in MEDIA_FIELDS:
+        entries, _ = _entries(getattr(inspection, field))
+        ids.update(e['id'] for e in entries if isinstance(e, dict) and 'sha256' in e and 'id' in e)
+    return ids
+
+
+def sync_inline_media(inspection, update_fields=None):
+    """Called from Inspection.save(): extract new payloads and drop attachments no longer referenced"""
+    if update_fields is not None and not set(update_fields) & set(MEDIA_FIELDS):
+        return
+    from .images import pending_photo_blobs, schedule_variants
+
+    extract_inline_media(inspection)
+    InspectionAttachment.objects.filter(inspection=inspection).exclude(
+        id__in=referenced_attachment_ids(inspection)
+    ).delete()
+    schedule_variants(pending_photo_blobs(inspection))
+
+
+def referenced_shas(value):
+    entries, _ = _entries(value)
+    return [e['sha256'] for e in entries if isinstance(e, dict) and 'sha256' in e]
+
+
+def with_urls(value, request=None, variants=None):
+    """
+    Add a download URL to every reference of a media field for API output,
+    plus the thumbnail and other variants of images found in `variants`
+    (see images.variants_by_sha).
+    """
+    from .images import variant_refs
+
+    def add_url(entry):
+        if isinstance(entry, dict) and 'sha256' in entry:
+            entry = {**entry, 'url': blob_url(entry['sha256'], request)}
+            if variants and entry['sha256'] in variants:
+                entry.update(variant_refs(variants[entry['sha256']], request))
+            return entry
+        return entry
+
+    if isinstance(value, dict):
+        return add_url(value)
+    return [add_url(e) for e in value or []]
@@ -0,0 +1,145 @@
+import base64
+import binascii
+import hashlib
+import mimetypes
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+MEDIA_FIELDS = {
+    'site_photos': 'photo',
+    'site_video': 'video',
+    'uploaded_documents': 'document',
+}
+
+PAYLOAD_KEY = 'base64_data'
+
+
+# The blob store helpers as accounts.media had them when this migration was
+# written; a migration must not change with the app code that follows it.
+
+def decode_payload(payload):
+    mime_type = ''
+    if payload.startswith('data:') and ',' in payload:
+        header, payload = payload.split(',', 1)
+        mime_type = header[5:].split(';', 1)[0]
+    try:
+        content = base64.b64decode(payload)
+    except (binascii.Error, ValueError):
+        raise ValueError('Invalid base64 media payload')
+    return content, mime_type
+
+
+def entry_name(entry):
+    return entry.get('name') or entry.get('file_name') or ''
+
+
+def store_blob(content, mime_type, blob_model):
+    sha256 = hashlib.sha256(content).hexdigest()
+    blob = blob_model.objects.filter(sha256=sha256).first()
+    if blob is not None:
+        return blob
+
+    path = f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(content))
+    blob, _ = blob_model.objects.get_or_create(
+        sha256=sha256,
+        defaults={'size': len(content), 'mime_type': mime_type, 'file': path},
+    )
+    return blob
+
+
+def attachment_ref(attachment, blob, entry):
+    ref = {k: v for k, v in entry.items() if k != PAYLOAD_KEY}
+    ref.update({
+        'id': attachment.id,
+        'sha256': blob.sha256,
+        'size': blob.size,
+        'mime_type': blob.mime_type,
+        'name': attachment.name,
+    })
+    return ref
+
+
+def extract_media(apps, schema_editor):
+    """Move base64 payloads stored in the Inspection JSON fields into the blob store"""
+    Inspection = apps.get_model('accounts', 'Inspection')
+    InspectionAttachment = apps.get_model('accounts', 'InspectionAttachment')
+    MediaBlob = apps.get_model('accounts', 'MediaBlob')
+
+    for inspection in Inspection.objects.only('id', *MEDIA_FIELDS).iterator(chunk_size=50):
+        changed = {}
+        for field, kind in MEDIA_FIELDS.items():
+            value = getattr(inspection, field)
+            single = isinstance(value, dict)
+            entries = ([value] if value else []) if single else list(value or [])
+            if not any(isinstance(e, dict) and e.get(PAYLOAD_KEY) for e in entries):
+                continue
+
+            refs = []
+            for position, entry in enumerate(entries):
+                if isinstance(entry, dict) and entry.get(PAYLOAD_KEY):
+                    try:
+                        content, mime_type = decode_payload(entry[PAYLOAD_KEY])
+                    except ValueError:
+                        refs.append(entry)
+                        continue
+                    blob = store_blob(
+                        content,
+                        mime_type or entry.get('mime_type')
+                        or mimetypes.guess_type(entry_name(entry))[0] or 'application/octet-stream',
+                        blob_model=MediaBlob,
+                    )
+                    attachment = InspectionAttachment.objects.create(
+                        inspection=inspection, blob=blob, kind=kind,
+                        name=entry_name(entry)[:255], position=position,
+                    )
+                    entry = attachment_ref(attachment, blob, entry)
+                refs.append(entry)
+            changed[field] = refs[0] if single else refs
+
+        if changed:
+            Inspection.objects.filter(pk=inspection.pk).update(**changed)
+
+
+def inline_media(apps, schema_editor):
+    """Reverse: put the payloads back into the JSON fields"""
+    Inspection = apps.get_model('accounts', 'Inspection')
+    InspectionAttachment = apps.get_model('accounts', 'InspectionAttachment')
+
+    attachments = InspectionAttachment.objects.select_related('blob').order_by('inspection_id')
+    by_inspection = {}
+    for attachment in attachments.iterator(chunk_size=200):
+        by_inspection.setdefault(attachment.inspection_id, {})[attachment.id] = attachment
+
+    for inspection_id, found in by_inspection.items():
+        inspection = Inspection.objects.only('id', *MEDIA_FIELDS).get(pk=inspection_id)
+        changed = {}
+        for field in MEDIA_FIELDS:
+            value = getattr(inspection, field)
+            single = isinstance(value, dict)
+            entries = ([value] if value else []) if single else list(value or [])
+            restored = []
+            for entry in entries:
+                attachment = found.get(entry.get('id')) if isinstance(entry, dict) else None
+                if attachment is not None and 'sha256' in entry:
+                    with attachment.blob.file.open('rb') as fh:
+                        payload = base64.b64encode(fh.read()).decode('ascii')
+                    entry = {k: v for k, v in entry.items() if k not in ('id', 'sha256', 'size', 'mime_type')}
+                    entry[PAYLOAD_KEY] = payload
+                restored.append(entry)
+            changed[field] = restored[0] if single and restored else ({} if single else restored)
+        Inspection.objects.filter(pk=inspection_id).update(**changed)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_media_blobs'),
+    ]
+
+    operations = [
+        migrations.RunPython(extract_media, inline_media),
+    ]
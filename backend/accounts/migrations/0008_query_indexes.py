@@ -0,0 +1,51 @@
+from django.db import migrations, models
+
+from accounts.migrations._operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0007_upload_sessions'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'branch_name'], name='user_role_branch_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['inspector', '-created_at', '-id'], name='insp_inspector_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['inspector', 'status', '-created_at', '-id'], name='insp_inspector_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['branch_name', 'status'], name='insp_branch_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['status'], name='insp_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='newinspection',
+            index=models.Index(fields=['branch_name', '-created_at', '-id'], name='newinsp_branch_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='newinspection',
+            index=models.Index(fields=['assigned_inspector', '-created_at', '-id'], name='newinsp_inspector_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='newinspection',
+            index=models.Index(
+                condition=models.Q(('status', 'pending')),
+                fields=['assigned_inspector', '-created_at', '-id'],
+                name='newinsp_pending_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-18 19:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_counters(apps, schema_editor):
+    Inspection = apps.get_model('accounts', 'Inspection')
+    InspectionStatusCounter = apps.get_model('accounts', 'InspectionStatusCounter')
+
+    counters = {}
+    rows = Inspection.objects.order_by().values('branch_name', 'inspector', 'status').annotate(total=models.Count('id'))
+    for row in rows.iterator():
+        key = (row['branch_name'] or '', row['inspector'], row['status'])
+        counters[key] = counters.get(key, 0) + row['total']
+    InspectionStatusCounter.objects.bulk_create([
+        InspectionStatusCounter(branch_name=b, inspector_id=i, status=s, count=n)
+        for (b, i, s), n in counters.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('branch_name', models.CharField(blank=True, default='', max_length=255)),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('inspector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'inspection_status_counters',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='inspectionstatuscounter',
+            constraint=models.UniqueConstraint(fields=('branch_name', 'inspector', 'status'), name='unique_status_counter'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+from accounts.migrations._operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0009_status_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('new_inspection', 'New Inspection'), ('inspection', 'Inspection')], max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('inspector', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'sync_tombstones',
+                'indexes': [
+                    models.Index(fields=['inspector', 'created_at'], name='tombstone_inspector_idx'),
+                    models.Index(fields=['created_at'], name='tombstone_created_idx'),
+                ],
+            },
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['inspector', 'updated_at'], name='insp_inspector_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='newinspection',
+            index=models.Index(fields=['assigned_inspector', 'updated_at'], name='newinsp_inspector_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2 on 2026-10-18 19:38
+
+import logging
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.migrations._tracks import OPTIONAL_READINGS, decode, parse_point, track_fields
+
+logger = logging.getLogger(__name__)
+
+# What a packed track keeps of a point; anything else is dropped
+STORED_KEYS = {'latitude', 'longitude', 'timestamp', *(key for key, _ in OPTIONAL_READINGS)}
+
+
+def pack_tracks(apps, schema_editor):
+    """
+    Move the JSON location_points of every inspection into a packed LocationTrack.
+    Lossy: points without usable coordinates (never displayable) are skipped
+    and keys other than STORED_KEYS dropped; both are logged per inspection.
+    """
+    Inspection = apps.get_model('accounts', 'Inspection')
+    LocationTrack = apps.get_model('accounts', 'LocationTrack')
+
+    inspections = Inspection.objects.exclude(location_points=[]).exclude(location_points__isnull=True)
+    for inspection in inspections.only('id', 'location_points').iterator(chunk_size=200):
+        parsed, skipped, dropped = [], [], set()
+        points = inspection.location_points if isinstance(inspection.location_points, list) else []
+        for index, point in enumerate(points):
+            try:
+                parsed.append(parse_point(point))
+            except ValueError as e:
+                skipped.append(f'{index} ({e})')
+                continue
+            dropped.update(set(point) - STORED_KEYS)
+        if skipped:
+            logger.warning("inspection %s: skipped unusable track points %s", inspection.id, ', '.join(skipped))
+        if dropped:
+            logger.warning("inspection %s: dropped track point keys %s", inspection.id, ', '.join(sorted(dropped)))
+        LocationTrack.objects.create(inspection_id=inspection.id, **track_fields(parsed))
+        Inspection.objects.filter(pk=inspection.id).update(total_location_points=len(parsed))
+
+
+def unpack_tracks(apps, schema_editor):
+    Inspection = apps.get_model('accounts', 'Inspection')
+    LocationTrack = apps.get_model('accounts', 'LocationTrack')
+
+    for track in LocationTrack.objects.iterator(chunk_size=200):
+        Inspection.objects.filter(pk=track.inspection_id).update(location_points=decode(track.data))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationTrack',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='track', serialize=False, to='accounts.inspection')),
+                ('data', models.BinaryField(default=bytes)),
+                ('point_count', models.IntegerField(default=0)),
+                ('first_latitude', models.FloatField(blank=True, null=True)),
+                ('first_longitude', models.FloatField(blank=True, null=True)),
+                ('first_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('last_latitude', models.FloatField(blank=True, null=True)),
+                ('last_longitude', models.FloatField(blank=True, null=True)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('min_latitude', models.FloatField(blank=True, null=True)),
+                ('max_latitude', models.FloatField(blank=True, null=True)),
+                ('min_longitude', models.FloatField(blank=True, null=True)),
+                ('max_longitude', models.FloatField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'location_tracks',
+            },
+        ),
+        migrations.RunPython(pack_tracks, unpack_tracks),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='location_points',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_location_tracks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='locationtrack',
+            name='polylines',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
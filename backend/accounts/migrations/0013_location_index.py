@@ -0,0 +1,71 @@
+# Generated by Django 4.2 on 2026-10-18 19:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.migrations._tracks import decode
+
+BITS = 30
+
+
+# The cell of accounts.geo as this migration built the index with it
+
+def _spread(value):
+    value &= (1 << BITS) - 1
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    value = (value | (value << 1)) & 0x5555555555555555
+    return value
+
+
+def _quantize(value, low, span):
+    q = int((value - low) / span * (1 << BITS))
+    return min(max(q, 0), (1 << BITS) - 1)
+
+
+def point_cell(latitude, longitude):
+    return (_spread(_quantize(longitude, -180.0, 360.0)) << 1) | _spread(_quantize(latitude, -90.0, 180.0))
+
+
+def index_tracks(apps, schema_editor):
+    LocationTrack = apps.get_model('accounts', 'LocationTrack')
+    InspectionLocation = apps.get_model('accounts', 'InspectionLocation')
+
+    for track in LocationTrack.objects.filter(point_count__gt=0).iterator(chunk_size=200):
+        InspectionLocation.objects.bulk_create([
+            InspectionLocation(
+                inspection_id=track.inspection_id, cell=point_cell(point['latitude'], point['longitude']),
+                latitude=point['latitude'], longitude=point['longitude'],
+            )
+            for point in decode(track.data)
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_track_polylines'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cell', models.BigIntegerField()),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('inspection', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locations', to='accounts.inspection')),
+            ],
+            options={
+                'db_table': 'inspection_locations',
+                'indexes': [
+                    models.Index(fields=['cell', 'inspection', 'latitude', 'longitude'], name='insp_location_cell_idx'),
+                ],
+            },
+        ),
+        # The index is rebuilt from the tracks, so going back only drops the table
+        migrations.RunPython(index_tracks, migrations.RunPython.noop),
+    ]
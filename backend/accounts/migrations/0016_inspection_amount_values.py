@@ -0,0 +1,135 @@
+# Generated by Django 4.2 on 2026-10-18 20:11
+
+from django.db import migrations, models
+
+from accounts.migrations._amounts import AMOUNT_FIELDS, backfill
+
+
+def parse_amounts(apps, schema_editor):
+    backfill(apps.get_model('accounts', 'Inspection'), AMOUNT_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_background_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspection',
+            name='accounts_payable_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='accounts_receivable_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='advance_deposit_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='applied_limit_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='cash_balance_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='existing_limit_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='gross_outstanding_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='ibbl_investment_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='land_building_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='limit_amount_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='long_term_liabilities_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='net_outstanding_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='other_assets_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='other_banks_investment_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='other_current_assets_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='other_current_liabilities_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='other_non_current_liabilities_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='paid_up_capital_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='plant_machinery_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='recommended_limit_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='retained_earning_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='stock_trade_financial_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='stock_trade_finished_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=18, null=True),
+        ),
+        migrations.RunPython(parse_amounts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 4.2 on 2026-10-18 20:14
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+from accounts.migrations._amounts import HEADCOUNT_FIELDS, backfill
+
+# The grouping of accounts.rollups.compute() as this migration filled the table with it
+DIMENSIONS = ['branch_name', 'facility_type', 'investment_category', 'status']
+AMOUNTS = ['existing_limit', 'applied_limit', 'recommended_limit', 'limit_amount', 'net_outstanding', 'gross_outstanding']
+HEADCOUNTS = {'male_workers': 'male_worker', 'female_workers': 'female_worker'}
+
+
+def compute(inspections, rollup_model):
+    aggregates = {'inspections': Count('id')}
+    for name in AMOUNTS:
+        aggregates[name] = Sum(f'{name}_value')
+    for column, source in HEADCOUNTS.items():
+        aggregates[column] = Sum(f'{source}_value')
+
+    rollups = {}
+    rows = (
+        inspections.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day', *DIMENSIONS)
+        .annotate(**aggregates)
+    )
+    for row in rows.iterator():
+        key = (row['day'], *(row[d] or '' for d in DIMENSIONS))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = rollup_model(**dict(zip(['day', *DIMENSIONS], key)))
+        for name in aggregates:
+            setattr(rollup, name, getattr(rollup, name) + (row[name] or 0))
+    return rollups.values()
+
+
+def populate_rollups(apps, schema_editor):
+    Inspection = apps.get_model('accounts', 'Inspection')
+    InspectionDailyRollup = apps.get_model('accounts', 'InspectionDailyRollup')
+
+    # The new head-count columns first: the rollups sum them
+    backfill(Inspection, HEADCOUNT_FIELDS)
+    InspectionDailyRollup.objects.bulk_create(
+        compute(Inspection.objects.all(), InspectionDailyRollup), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_inspection_amount_values'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('branch_name', models.CharField(blank=True, default='', max_length=255)),
+                ('facility_type', models.CharField(blank=True, default='', max_length=100)),
+                ('investment_category', models.CharField(blank=True, default='', max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('inspections', models.IntegerField(default=0)),
+                ('existing_limit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('applied_limit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('recommended_limit', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('limit_amount', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('net_outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('gross_outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=20)),
+                ('male_workers', models.BigIntegerField(default=0)),
+                ('female_workers', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'inspection_daily_rollups',
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupPendingDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+            ],
+            options={
+                'db_table': 'rollup_pending_days',
+            },
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='female_worker_value',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='male_worker_value',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inspectiondailyrollup',
+            index=models.Index(fields=['branch_name', 'day'], name='rollup_branch_day_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='inspectiondailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'branch_name', 'facility_type', 'investment_category', 'status'), name='unique_daily_rollup'),
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
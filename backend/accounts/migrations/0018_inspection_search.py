@@ -0,0 +1,77 @@
+# Generated by Django 4.2 on 2026-10-18 20:19
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from accounts.migrations._operations import RunPostgresSQL, TrigramExtension
+
+SEARCH_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION inspection_search_vector(
+    client_name text, owner_name text, group_name text, industry_name text, phone_number text
+) RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+    SELECT setweight(to_tsvector('simple', coalesce(client_name, '')), 'A')
+        || setweight(to_tsvector('simple', concat_ws(' ', owner_name, group_name, industry_name)), 'B')
+        || setweight(to_tsvector('simple', regexp_replace(coalesce(phone_number, ''), '\\D', '', 'g')), 'C')
+$$;
+
+CREATE OR REPLACE FUNCTION inspections_search_vector_trigger() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := inspection_search_vector(
+        NEW.client_name, NEW.owner_name, NEW.group_name, NEW.industry_name, NEW.phone_number
+    );
+    RETURN NEW;
+END
+$$;
+
+CREATE TRIGGER inspections_search_vector_update
+    BEFORE INSERT OR UPDATE OF client_name, owner_name, group_name, industry_name, phone_number
+    ON inspections FOR EACH ROW EXECUTE FUNCTION inspections_search_vector_trigger();
+"""
+
+DROP_SEARCH_FUNCTION_SQL = """
+DROP TRIGGER IF EXISTS inspections_search_vector_update ON inspections;
+DROP FUNCTION IF EXISTS inspections_search_vector_trigger();
+DROP FUNCTION IF EXISTS inspection_search_vector(text, text, text, text, text);
+"""
+
+BACKFILL_SQL = """
+UPDATE inspections SET search_vector = inspection_search_vector(
+    client_name, owner_name, group_name, industry_name, phone_number
+)
+"""
+
+SEARCH_INDEXES_SQL = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS insp_search_vector_idx ON inspections USING gin (search_vector)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS insp_search_trgm_idx ON inspections USING gin ("
+    "UPPER(client_name::text) gin_trgm_ops, UPPER(owner_name::text) gin_trgm_ops, "
+    "UPPER(group_name::text) gin_trgm_ops, UPPER(industry_name::text) gin_trgm_ops, "
+    "UPPER(phone_number::text) gin_trgm_ops)",
+]
+
+DROP_SEARCH_INDEXES_SQL = [
+    "DROP INDEX CONCURRENTLY IF EXISTS insp_search_vector_idx",
+    "DROP INDEX CONCURRENTLY IF EXISTS insp_search_trgm_idx",
+]
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0017_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspection',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        # Everything below exists on PostgreSQL only
+        TrigramExtension(),
+        RunPostgresSQL(SEARCH_FUNCTION_SQL, DROP_SEARCH_FUNCTION_SQL),
+        # Before the indexes, so each is built once over the filled column
+        RunPostgresSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        RunPostgresSQL(SEARCH_INDEXES_SQL, DROP_SEARCH_INDEXES_SQL),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 4.2 on 2026-10-18 20:22
+
+import re
+
+from django.db import migrations, models
+
+from accounts.migrations._operations import AddIndexConcurrently
+
+# The normalizers of accounts.clients as this migration filled the keys with them
+NAME_NOISE = {
+    'm', 's', 'ms', 'messrs', 'ltd', 'limited', 'pvt', 'private', 'co', 'company', 'and', 'the', 'of',
+    'md', 'mohammad', 'mohammed', 'muhammad', 'mohd',
+}
+SOUNDS = [
+    ('ph', 'f'), ('kh', 'k'), ('gh', 'g'), ('bh', 'b'), ('dh', 'd'), ('th', 't'), ('sh', 's'),
+    ('ck', 'k'), ('q', 'k'), ('z', 'j'), ('v', 'b'), ('x', 'ks'),
+]
+VOWELS = set('aeiouyhw')
+WORD = re.compile(r'(?:[^\W_]|[\u0980-\u09FF])+')
+MIN_TIN_DIGITS = 6
+MIN_PHONE_DIGITS = 7
+MAX_KEY_LENGTH = 100
+
+
+def tin_key(text):
+    digits = re.sub(r'\D', '', str(text or ''))
+    return digits[:MAX_KEY_LENGTH] if len(digits) >= MIN_TIN_DIGITS else None
+
+
+def account_key(text):
+    key = re.sub(r'[\W_]', '', str(text or '')).upper().lstrip('0')
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def phone_key(text):
+    digits = re.sub(r'\D', '', str(text or ''))
+    if digits.startswith('00'):
+        digits = digits[2:]
+    if digits.startswith('880'):
+        digits = digits[3:]
+    digits = digits.lstrip('0')
+    return digits[:MAX_KEY_LENGTH] if len(digits) >= MIN_PHONE_DIGITS else None
+
+
+def _phonetic(word):
+    if not word.isascii() or word.isdigit():
+        return word
+    if len(word) > 3 and word.endswith('s'):
+        word = word[:-1]
+    for spelling, sound in SOUNDS:
+        word = word.replace(spelling, sound)
+    code = 'a' if word[0] in VOWELS else word[0]
+    for letter in word[1:]:
+        if letter not in VOWELS and letter != code[-1]:
+            code += letter
+    return code
+
+
+def name_key(text):
+    words = [w for w in WORD.findall(str(text or '').lower()) if w not in NAME_NOISE]
+    return ' '.join(_phonetic(w) for w in words)[:MAX_KEY_LENGTH] or None
+
+
+KEY_SOURCES = {
+    'tin_key': ('tin_number', tin_key),
+    'account_key': ('account_number', account_key),
+    'phone_key': ('phone_number', phone_key),
+    'name_key': ('client_name', name_key),
+}
+
+
+def fill_client_keys(apps, schema_editor):
+    Inspection = apps.get_model('accounts', 'Inspection')
+    keys = list(KEY_SOURCES)
+    batch = []
+    rows = Inspection.objects.order_by('pk').values_list('pk', *(source for source, _ in KEY_SOURCES.values()))
+    for pk, *texts in rows.iterator(chunk_size=1000):
+        values = [normalize(text) for (_, normalize), text in zip(KEY_SOURCES.values(), texts)]
+        if any(value is not None for value in values):
+            batch.append(Inspection(pk=pk, **dict(zip(keys, values))))
+        if len(batch) >= 1000:
+            Inspection.objects.bulk_update(batch, keys)
+            batch = []
+    if batch:
+        Inspection.objects.bulk_update(batch, keys)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0018_inspection_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inspection',
+            name='account_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='name_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='phone_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='inspection',
+            name='tin_key',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True),
+        ),
+        # Before the indexes, so each is built once over the filled columns
+        migrations.RunPython(fill_client_keys, migrations.RunPython.noop),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['tin_key'], name='insp_tin_key_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['account_key'], name='insp_account_key_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['phone_key'], name='insp_phone_key_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='inspection',
+            index=models.Index(fields=['name_key'], name='insp_name_key_idx'),
+        ),
+    ]
@@ -0,0 +1,534 @@
+# Generated by Django 4.2 on 2026-10-18 20:27
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+SECTION_MODELS = [
+    'InspectionOwnerSection', 'InspectionFacilitySection', 'InspectionBusinessSection', 'InspectionLaborSection',
+    'InspectionAssetSection', 'InspectionGodownSection', 'InspectionChecklistSection', 'InspectionMediaSection',
+]
+
+
+def _columns(section_model):
+    return [field for field in section_model._meta.concrete_fields if field.name != 'inspection']
+
+
+def split_rows(model, section_models, batch_size=1000):
+    """
+    Copy the section columns of every row of `model` (a historical Inspection
+    that still has them) into `section_models`. Rows left at the defaults get
+    no section row, which reads the same.
+    """
+    for section_model in section_models:
+        fields = _columns(section_model)
+        names = [field.name for field in fields]
+        defaults = [field.get_default() for field in fields]
+        batch = []
+        rows = model.objects.order_by('pk').values_list('pk', *names)
+        for pk, *values in rows.iterator(chunk_size=batch_size):
+            if values != defaults:
+                batch.append(section_model(inspection_id=pk, **dict(zip(names, values))))
+            if len(batch) >= batch_size:
+                section_model.objects.bulk_create(batch)
+                batch = []
+        section_model.objects.bulk_create(batch)
+
+
+def merge_rows(model, section_models, batch_size=1000):
+    """split_rows() backwards: copy the section rows into the columns of `model`"""
+    for section_model in section_models:
+        names = [field.name for field in _columns(section_model)]
+        batch = []
+        rows = section_model.objects.order_by('pk').values_list('pk', *names)
+        for pk, *values in rows.iterator(chunk_size=batch_size):
+            batch.append(model(pk=pk, **dict(zip(names, values))))
+            if len(batch) >= batch_size:
+                model.objects.bulk_update(batch, names)
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, names)
+
+
+def _models(apps):
+    return apps.get_model('accounts', 'Inspection'), [apps.get_model('accounts', name) for name in SECTION_MODELS]
+
+
+def split_sections(apps, schema_editor):
+    split_rows(*_models(apps))
+
+
+def merge_sections(apps, schema_editor):
+    merge_rows(*_models(apps))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_client_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionAssetSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='assets_section', serialize=False, to='accounts.inspection')),
+                ('cash_balance', models.CharField(blank=True, max_length=100, null=True)),
+                ('stock_trade_finished', models.CharField(blank=True, max_length=100, null=True)),
+                ('stock_trade_financial', models.CharField(blank=True, max_length=100, null=True)),
+                ('accounts_receivable', models.CharField(blank=True, max_length=100, null=True)),
+                ('advance_deposit', models.CharField(blank=True, max_length=100, null=True)),
+                ('other_current_assets', models.CharField(blank=True, max_length=100, null=True)),
+                ('land_building', models.CharField(blank=True, max_length=100, null=True)),
+                ('plant_machinery', models.CharField(blank=True, max_length=100, null=True)),
+                ('other_assets', models.CharField(blank=True, max_length=100, null=True)),
+                ('ibbl_investment', models.CharField(blank=True, max_length=100, null=True)),
+                ('other_banks_investment', models.CharField(blank=True, max_length=100, null=True)),
+                ('borrowing_sources', models.CharField(blank=True, max_length=100, null=True)),
+                ('accounts_payable', models.CharField(blank=True, max_length=100, null=True)),
+                ('other_current_liabilities', models.CharField(blank=True, max_length=100, null=True)),
+                ('long_term_liabilities', models.CharField(blank=True, max_length=100, null=True)),
+                ('other_non_current_liabilities', models.CharField(blank=True, max_length=100, null=True)),
+                ('paid_up_capital', models.CharField(blank=True, max_length=100, null=True)),
+                ('retained_earning', models.CharField(blank=True, max_length=100, null=True)),
+                ('resources', models.CharField(blank=True, max_length=100, null=True)),
+                ('working_capital_items', models.JSONField(blank=True, default=list, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_assets',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionBusinessSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='business_section', serialize=False, to='accounts.inspection')),
+                ('market_situation', models.CharField(blank=True, max_length=100, null=True)),
+                ('client_position', models.CharField(blank=True, max_length=100, null=True)),
+                ('competitors', models.JSONField(blank=True, default=list, null=True)),
+                ('business_reputation', models.CharField(blank=True, max_length=100, null=True)),
+                ('production_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('product_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('production_capacity', models.CharField(blank=True, max_length=100, null=True)),
+                ('actual_production', models.CharField(blank=True, max_length=100, null=True)),
+                ('profitability_observation', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_business',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionChecklistSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='checklist_section', serialize=False, to='accounts.inspection')),
+                ('checklist_items', models.JSONField(blank=True, default=dict, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_checklist',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionFacilitySection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='facilities_section', serialize=False, to='accounts.inspection')),
+                ('purpose_investment', models.TextField(blank=True, null=True)),
+                ('purpose_bank_guarantee', models.TextField(blank=True, null=True)),
+                ('period_investment', models.CharField(blank=True, max_length=100, null=True)),
+                ('existing_limit', models.CharField(blank=True, max_length=100, null=True)),
+                ('applied_limit', models.CharField(blank=True, max_length=100, null=True)),
+                ('recommended_limit', models.CharField(blank=True, max_length=100, null=True)),
+                ('bank_percentage', models.CharField(blank=True, max_length=50, null=True)),
+                ('client_percentage', models.CharField(blank=True, max_length=50, null=True)),
+                ('outstanding_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('limit_amount', models.CharField(blank=True, max_length=100, null=True)),
+                ('net_outstanding', models.CharField(blank=True, max_length=100, null=True)),
+                ('gross_outstanding', models.CharField(blank=True, max_length=100, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_facilities',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionGodownSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='godown_section', serialize=False, to='accounts.inspection')),
+                ('godown_location', models.TextField(blank=True, null=True)),
+                ('godown_capacity', models.CharField(blank=True, max_length=100, null=True)),
+                ('godown_space', models.CharField(blank=True, max_length=100, null=True)),
+                ('godown_nature', models.CharField(blank=True, max_length=100, null=True)),
+                ('godown_owner', models.CharField(blank=True, max_length=255, null=True)),
+                ('distance_from_branch', models.CharField(blank=True, max_length=100, null=True)),
+                ('items_to_store', models.TextField(blank=True, null=True)),
+                ('warehouse_license', models.BooleanField(default=False)),
+                ('godown_guard', models.BooleanField(default=False)),
+                ('damp_proof', models.BooleanField(default=False)),
+                ('easy_access', models.BooleanField(default=False)),
+                ('letter_disclaimer', models.BooleanField(default=False)),
+                ('insurance_policy', models.BooleanField(default=False)),
+                ('godown_hired', models.BooleanField(default=False)),
+            ],
+            options={
+                'db_table': 'inspection_godown',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionLaborSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='labor_section', serialize=False, to='accounts.inspection')),
+                ('male_officer', models.CharField(blank=True, max_length=50, null=True)),
+                ('female_officer', models.CharField(blank=True, max_length=50, null=True)),
+                ('skilled_officer', models.CharField(blank=True, max_length=50, null=True)),
+                ('unskilled_officer', models.CharField(blank=True, max_length=50, null=True)),
+                ('male_worker', models.CharField(blank=True, max_length=50, null=True)),
+                ('female_worker', models.CharField(blank=True, max_length=50, null=True)),
+                ('skilled_worker', models.CharField(blank=True, max_length=50, null=True)),
+                ('unskilled_worker', models.CharField(blank=True, max_length=50, null=True)),
+                ('key_employees', models.JSONField(blank=True, default=list, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_labor',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionMediaSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='media_section', serialize=False, to='accounts.inspection')),
+                ('site_photos', models.JSONField(blank=True, default=list, null=True)),
+                ('site_video', models.JSONField(blank=True, default=list, null=True)),
+                ('uploaded_documents', models.JSONField(blank=True, default=list, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_media',
+            },
+        ),
+        migrations.CreateModel(
+            name='InspectionOwnerSection',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='owner_section', serialize=False, to='accounts.inspection')),
+                ('owner_age', models.CharField(blank=True, max_length=50, null=True)),
+                ('father_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('mother_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('spouse_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('academic_qualification', models.TextField(blank=True, null=True)),
+                ('children_info', models.TextField(blank=True, null=True)),
+                ('business_successor', models.TextField(blank=True, null=True)),
+                ('residential_address', models.TextField(blank=True, null=True)),
+                ('permanent_address', models.TextField(blank=True, null=True)),
+                ('partners_directors', models.JSONField(blank=True, default=list, null=True)),
+            ],
+            options={
+                'db_table': 'inspection_owner',
+            },
+        ),
+        migrations.RunPython(split_sections, merge_sections),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='academic_qualification',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='accounts_payable',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='accounts_receivable',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='actual_production',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='advance_deposit',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='applied_limit',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='bank_percentage',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='borrowing_sources',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='business_reputation',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='business_successor',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='cash_balance',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='checklist_items',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='children_info',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='client_percentage',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='client_position',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='competitors',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='damp_proof',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='distance_from_branch',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='easy_access',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='existing_limit',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='father_name',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='female_officer',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='female_worker',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_capacity',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_guard',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_hired',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_location',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_nature',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_owner',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='godown_space',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='gross_outstanding',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='ibbl_investment',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='insurance_policy',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='items_to_store',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='key_employees',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='land_building',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='letter_disclaimer',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='limit_amount',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='long_term_liabilities',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='male_officer',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='male_worker',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='market_situation',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='mother_name',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='net_outstanding',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='other_assets',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='other_banks_investment',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='other_current_assets',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='other_current_liabilities',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='other_non_current_liabilities',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='outstanding_type',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='owner_age',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='paid_up_capital',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='partners_directors',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='period_investment',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='permanent_address',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='plant_machinery',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='product_name',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='production_capacity',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='production_type',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='profitability_observation',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='purpose_bank_guarantee',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='purpose_investment',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='recommended_limit',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='residential_address',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='resources',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='retained_earning',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='site_photos',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='site_video',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='skilled_officer',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='skilled_worker',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='spouse_name',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='stock_trade_financial',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='stock_trade_finished',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='unskilled_officer',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='unskilled_worker',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='uploaded_documents',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='warehouse_license',
+        ),
+        migrations.RemoveField(
+            model_name='inspection',
+            name='working_capital_items',
+        ),
+    ]
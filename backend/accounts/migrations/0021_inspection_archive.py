@@ -0,0 +1,53 @@
+# Generated by Django 4.2 on 2026-10-18 20:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+from accounts.migrations._operations import RunPostgresSQL
+
+# Run once on the empty table Django created, which has no partitioning
+PARTITIONED_TABLE_SQL = [
+    "DROP TABLE inspection_archive",
+    """
+    CREATE TABLE inspection_archive (
+        inspection_id bigint NOT NULL REFERENCES inspections (id) DEFERRABLE INITIALLY DEFERRED,
+        created_at timestamp with time zone NOT NULL,
+        archived_at timestamp with time zone NOT NULL,
+        payload bytea NOT NULL,
+        PRIMARY KEY (inspection_id, created_at)
+    ) PARTITION BY RANGE (created_at)
+    """,
+    # Already compressed: keep TOAST from trying again
+    "ALTER TABLE inspection_archive ALTER COLUMN payload SET STORAGE EXTERNAL",
+    # Rows outside every yearly partition; ensure_partitions() keeps it empty
+    "CREATE TABLE inspection_archive_default PARTITION OF inspection_archive DEFAULT",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_inspection_sections'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InspectionArchive',
+            fields=[
+                ('inspection', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archive', serialize=False, to='accounts.inspection')),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('payload', models.BinaryField()),
+            ],
+            options={
+                'db_table': 'inspection_archive',
+            },
+        ),
+        # Recreated range-partitioned by created_at (still empty); reversing CreateModel drops it with its partitions
+        RunPostgresSQL(PARTITIONED_TABLE_SQL, migrations.RunSQL.noop),
+        migrations.AddField(
+            model_name='inspection',
+            name='archived',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# _amounts.py
+"""
+The amount and head-count parsing of accounts.amounts as migrations 0016
+and 0017 backfilled the `<field>_value` columns with it. A copy rather than
+an import, so those migrations keep replaying the same way when the app's
+parser learns new formats (accounts.amounts.backfill() brings existing rows
+up to date with it).
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+AMOUNT_FIELDS = [
+    'existing_limit', 'applied_limit', 'recommended_limit',
+    'limit_amount', 'net_outstanding', 'gross_outstanding',
+    'cash_balance', 'stock_trade_finished', 'stock_trade_financial', 'accounts_receivable',
+    'advance_deposit', 'other_current_assets', 'land_building', 'plant_machinery', 'other_assets',
+    'ibbl_investment', 'other_banks_investment', 'accounts_payable', 'other_current_liabilities',
+    'long_term_liabilities', 'other_non_current_liabilities', 'paid_up_capital', 'retained_earning',
+]
+HEADCOUNT_FIELDS = ['male_worker', 'female_worker']
+MAX_DIGITS = 18
+DECIMAL_PLACES = 2
+
+UNITS = {
+    'thousand': 10 ** 3, 'k': 10 ** 3, 'হাজার': 10 ** 3,
+    'lac': 10 ** 5, 'lacs': 10 ** 5, 'lakh': 10 ** 5, 'lakhs': 10 ** 5, 'lk': 10 ** 5,
+    'লাখ': 10 ** 5, 'লক্ষ': 10 ** 5,
+    'million': 10 ** 6, 'mn': 10 ** 6,
+    'crore': 10 ** 7, 'crores': 10 ** 7, 'cr': 10 ** 7, 'কোটি': 10 ** 7,
+}
+BENGALI_DIGITS = str.maketrans('০১২৩৪৫৬৭৮৯', '0123456789')
+NOISE = re.compile(r'৳|\btk\b\.?|\btaka\b|\bbdt\b|/-|/=')
+TERM = re.compile(
+    r'\s*(\d+(?:\.\d+)?)\s*(' + '|'.join(sorted(map(re.escape, UNITS), key=len, reverse=True)) + r')?\.?(?![\w.])'
+)
+LIMIT = Decimal(10) ** (MAX_DIGITS - DECIMAL_PLACES)
+CENT = Decimal(1).scaleb(-DECIMAL_PLACES)
+
+
+def parse_amount(text):
+    if text is None:
+        return None
+    text = str(text).translate(BENGALI_DIGITS).lower()
+    text = NOISE.sub(' ', text).replace(',', '').strip()
+    negative = False
+    if text.startswith('(') and text.endswith(')'):
+        negative, text = True, text[1:-1].strip()
+    elif text.startswith('-'):
+        negative, text = True, text[1:].strip()
+    if not text:
+        return None
+
+    total, pos = Decimal(0), 0
+    while pos < len(text):
+        match = TERM.match(text, pos)
+        if match is None or match.end() == pos:
+            return None
+        number, unit = match.groups()
+        try:
+            total += Decimal(number) * UNITS.get(unit, 1)
+        except InvalidOperation:
+            return None
+        pos = match.end()
+        while pos < len(text) and text[pos] in ' +&':
+            pos += 1
+    total = -total if negative else total
+    if abs(total) >= LIMIT:
+        return None
+    return total.quantize(CENT)
+
+
+def parse_headcount(text):
+    value = parse_amount(text)
+    if value is None or value < 0 or value != value.to_integral_value():
+        return None
+    return int(value)
+
+
+def backfill(model, fields, batch_size=1000):
+    """Fill the `<field>_value` columns of `fields` for every row of the historical `model`"""
+    shadows = [f'{name}_value' for name in fields]
+    batch = []
+    rows = model.objects.order_by('pk').values_list('pk', *fields)
+    for pk, *texts in rows.iterator(chunk_size=batch_size):
+        values = [
+            parse_headcount(text) if name in HEADCOUNT_FIELDS else parse_amount(text)
+            for name, text in zip(fields, texts)
+        ]
+        if any(value is not None for value in values):
+            batch.append(model(pk=pk, **dict(zip(shadows, values))))
+        if len(batch) >= batch_size:
+            model.objects.bulk_update(batch, shadows)
+            batch = []
+    if batch:
+        model.objects.bulk_update(batch, shadows)
@@ -0,0 +1,55 @@
+# _operations.py
+"""
+Migration operations shared by the accounts migrations. Only migrations
+import this module (the loader skips names starting with "_"), and they
+must replay the same way for as long as they exist: add new operations
+rather than changing these.
+"""
+from django.contrib.postgres import operations as postgres_operations
+from django.db.migrations.operations import AddIndex, RunSQL
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL, so the table stays writable while
+    the index builds (the migration must set atomic = False). Other backends,
+    such as the SQLite database used for tests, get a plain CREATE INDEX.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        return AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class RunPostgresSQL(RunSQL):
+    """
+    RunSQL for objects only PostgreSQL has (triggers, GIN and trigram
+    indexes); skipped on other backends. Pass a list to run each statement
+    on its own, as CREATE INDEX CONCURRENTLY requires.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class TrigramExtension(postgres_operations.TrigramExtension):
+    """
+    pg_trgm on PostgreSQL. Django's operation already skips other backends
+    going forwards, but going backwards it looks the extension up in
+    pg_extension, which only PostgreSQL has.
+    """
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
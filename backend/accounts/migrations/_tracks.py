@@ -0,0 +1,175 @@
+# _tracks.py
+"""
+Version 1 of the packed track format (accounts.tracks) as migrations 0011
+and 0013 read and write it. A copy rather than an import, so those
+migrations keep replaying the same way when the app's codec changes; a
+new track format gets its own copy next to the migration that moves to it.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMAT_VERSION = 1
+COORD_SCALE = 10 ** 7
+HAS_TIMESTAMP = 1
+OPTIONAL_READINGS = (
+    ('accuracy', 2),
+    ('altitude', 4),
+    ('speed', 8),
+    ('heading', 16),
+)
+
+
+def _write_varint(out, value):
+    value = (value << 1) ^ (value >> 63)
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return (result >> 1) ^ -(result & 1), pos
+        shift += 7
+
+
+def parse_timestamp(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    moment = parse_datetime(str(value))
+    if moment is None:
+        raise ValueError(f"invalid timestamp {value!r}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return round(moment.timestamp() * 1000)
+
+
+def to_datetime(ms):
+    return datetime.fromtimestamp(ms // 1000, tz=dt_timezone.utc) + timedelta(milliseconds=ms % 1000)
+
+
+def format_timestamp(ms):
+    return to_datetime(ms).strftime('%Y-%m-%dT%H:%M:%S.') + f'{ms % 1000:03d}Z'
+
+
+def _number(point, key):
+    value = point.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be a number")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    return value
+
+
+def parse_point(point):
+    """(lat_e7, lng_e7, timestamp_ms, {reading: hundredths}) from a point dict"""
+    if not isinstance(point, dict):
+        raise ValueError("point must be an object")
+    latitude = _number(point, 'latitude')
+    longitude = _number(point, 'longitude')
+    if latitude is None or longitude is None:
+        raise ValueError("latitude and longitude are required")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError("latitude/longitude out of range")
+    readings = {}
+    for key, _ in OPTIONAL_READINGS:
+        value = _number(point, key)
+        if value is not None:
+            readings[key] = round(value * 100)
+    return (
+        round(latitude * COORD_SCALE),
+        round(longitude * COORD_SCALE),
+        parse_timestamp(point.get('timestamp')),
+        readings,
+    )
+
+
+def encode(parsed):
+    out = bytearray([FORMAT_VERSION])
+    lat = lng = ts = 0
+    for p_lat, p_lng, p_ts, readings in parsed:
+        flags = HAS_TIMESTAMP if p_ts is not None else 0
+        for key, bit in OPTIONAL_READINGS:
+            if key in readings:
+                flags |= bit
+        _write_varint(out, flags)
+        _write_varint(out, p_lat - lat)
+        _write_varint(out, p_lng - lng)
+        lat, lng = p_lat, p_lng
+        if p_ts is not None:
+            _write_varint(out, p_ts - ts)
+            ts = p_ts
+        for key, bit in OPTIONAL_READINGS:
+            if flags & bit:
+                _write_varint(out, readings[key])
+    return bytes(out)
+
+
+def decode(data):
+    """Point dicts of a packed track"""
+    data = bytes(data or b'')
+    if not data:
+        return []
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"unknown track format {data[0]}")
+    points = []
+    lat = lng = ts = 0
+    pos = 1
+    while pos < len(data):
+        flags, pos = _read_varint(data, pos)
+        d_lat, pos = _read_varint(data, pos)
+        d_lng, pos = _read_varint(data, pos)
+        lat += d_lat
+        lng += d_lng
+        point = {'latitude': lat / COORD_SCALE, 'longitude': lng / COORD_SCALE, 'timestamp': None}
+        if flags & HAS_TIMESTAMP:
+            d_ts, pos = _read_varint(data, pos)
+            ts += d_ts
+            point['timestamp'] = format_timestamp(ts)
+        for key, bit in OPTIONAL_READINGS:
+            if flags & bit:
+                value, pos = _read_varint(data, pos)
+                point[key] = value / 100
+        points.append(point)
+    return points
+
+
+def track_fields(parsed):
+    """LocationTrack column values for a new track of `parsed` points"""
+    fields = {
+        'data': encode(parsed) if parsed else b'', 'point_count': len(parsed),
+        'first_latitude': None, 'first_longitude': None, 'first_timestamp': None,
+        'last_latitude': None, 'last_longitude': None, 'last_timestamp': None,
+        'min_latitude': None, 'max_latitude': None, 'min_longitude': None, 'max_longitude': None,
+    }
+    if not parsed:
+        return fields
+    latitudes = [lat_e7 / COORD_SCALE for lat_e7, _, _, _ in parsed]
+    longitudes = [lng_e7 / COORD_SCALE for _, lng_e7, _, _ in parsed]
+    timestamps = [ts for _, _, ts, _ in parsed if ts is not None]
+    fields.update(
+        first_latitude=latitudes[0], first_longitude=longitudes[0],
+        first_timestamp=to_datetime(parsed[0][2]) if parsed[0][2] is not None else None,
+        last_latitude=latitudes[-1], last_longitude=longitudes[-1],
+        last_timestamp=to_datetime(timestamps[-1]) if timestamps else None,
+        min_latitude=min(latitudes), max_latitude=max(latitudes),
+        min_longitude=min(longitudes), max_longitude=max(longitudes),
+    )
+    return fields
@@ -1,8 +1,12 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.search import SearchVectorField
 from django.utils import timezone
 from django.conf import settings
 
+from .sections import install as install_sections
+
 class CustomUser(AbstractUser):
     ROLE_SUPER = 'admin'
     ROLE_BRANCH = 'branch_admin'
@@ -21,6 +25,12 @@ class CustomUser(AbstractUser):
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # list_inspectors / list_branch_admins
+            models.Index(fields=['role', 'branch_name'], name='user_role_branch_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         self.username = self.user_name
@@ -56,6 +66,19 @@ class NewInspection(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # list_new_inspections, keyset-paginated on (created_at, id)
+            models.Index(fields=['branch_name', '-created_at', '-id'], name='newinsp_branch_created_idx'),
+            models.Index(fields=['assigned_inspector', '-created_at', '-id'], name='newinsp_inspector_created_idx'),
+            # An inspector's open work queue (?status=pending)
+            models.Index(
+                fields=['assigned_inspector', '-created_at', '-id'],
+                name='newinsp_pending_idx',
+                condition=models.Q(status='pending'),
+            ),
+            # /api/sync/ changes since a token
+            models.Index(fields=['assigned_inspector', 'updated_at'], name='newinsp_inspector_updated_idx'),
+        ]
 
 
 class Inspection(models.Model):
@@ -76,10 +99,10 @@ class Inspection(models.Model):
     
     branch_name = models.CharField(max_length=255, blank=True, null=True)
     
-    # Location Tracking Data
-    location_points = models.JSONField(default=list, blank=True, null=True)
+    # Location Tracking Data (the points themselves live in LocationTrack)
     location_start_time = models.DateTimeField(blank=True, null=True)
     location_end_time = models.DateTimeField(blank=True, null=True)
+    # Maintained from the track, never taken from the client
     total_location_points = models.IntegerField(default=0)
     
     # Section A: Company's Client's Information
@@ -106,6 +129,182 @@ class Inspection(models.Model):
     
     # Section B: Owner Information
     owner_name = models.TextField(blank=True, null=True)
+
+    # Section E: Proposed Facilities
+    facility_type = models.CharField(max_length=100, blank=True, null=True)
+
+    # Head counts parsed from male_worker / female_worker (labour section) on save (accounts.amounts)
+    male_worker_value = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    female_worker_value = models.PositiveIntegerField(blank=True, null=True, editable=False)
+
+    # Numbers parsed from the amount fields of sections E, F and H on save
+    # (accounts.amounts), so portfolio totals are SQL aggregates over this table
+    existing_limit_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    applied_limit_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    recommended_limit_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    limit_amount_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    net_outstanding_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    gross_outstanding_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    cash_balance_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    stock_trade_finished_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    stock_trade_financial_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    accounts_receivable_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    advance_deposit_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    other_current_assets_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    land_building_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    plant_machinery_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    other_assets_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    ibbl_investment_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    other_banks_investment_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    accounts_payable_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    other_current_liabilities_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    long_term_liabilities_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    other_non_current_liabilities_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    paid_up_capital_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+    retained_earning_value = models.DecimalField(max_digits=18, decimal_places=2, blank=True, null=True, editable=False)
+
+    # Status and Timestamps - Use auto_now_add for proper timezone handling
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set while the section rows are packed into an InspectionArchive (see archive.py)
+    archived = models.BooleanField(default=False, editable=False)
+
+    # Full-text search document, kept up to date by a trigger on PostgreSQL (see search.py)
+    search_vector = SearchVectorField(blank=True, null=True, editable=False)
+
+    # Normalized client identifiers for finding earlier inspections (see clients.py), set on save
+    tin_key = models.CharField(max_length=100, blank=True, null=True, editable=False)
+    account_key = models.CharField(max_length=100, blank=True, null=True, editable=False)
+    phone_key = models.CharField(max_length=100, blank=True, null=True, editable=False)
+    name_key = models.CharField(max_length=100, blank=True, null=True, editable=False)
+
+    class Meta:
+        db_table = 'inspections'
+        ordering = ['-created_at']
+        indexes = [
+            # InspectionViewSet list / by_status, keyset-paginated on (created_at, id)
+            models.Index(fields=['inspector', '-created_at', '-id'], name='insp_inspector_created_idx'),
+            # by_status?status= and the per-status counts of stats
+            models.Index(fields=['inspector', 'status', '-created_at', '-id'], name='insp_inspector_status_idx'),
+            # branch_admin_stats
+            models.Index(fields=['branch_name', 'status'], name='insp_branch_status_idx'),
+            # inspection_stats (all branches)
+            models.Index(fields=['status'], name='insp_status_idx'),
+            # /api/sync/ changes since a token
+            models.Index(fields=['inspector', 'updated_at'], name='insp_inspector_updated_idx'),
+            # /api/inspections/duplicates/, one per client key
+            models.Index(fields=['tin_key'], name='insp_tin_key_idx'),
+            models.Index(fields=['account_key'], name='insp_account_key_idx'),
+            models.Index(fields=['phone_key'], name='insp_phone_key_idx'),
+            models.Index(fields=['name_key'], name='insp_name_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.client_name} - {self.industry_name}"
+
+    def save(self, *args, **kwargs):
+        from .amounts import fill_amounts
+        from .archive import restore
+        from .clients import fill_client_keys
+        # Inline base64 media is moved into the blob store right after the row is written
+        from .media import sync_inline_media
+        from .sections import save_sections, take_changes
+        from .tracks import parse_points, write_track
+
+        # Section tables get only their changed columns; a full save of a
+        # loaded inspection writes its own row and those
+        update_fields = kwargs.get('update_fields')
+        section_changes = take_changes(self, update_fields)
+        changed_sections = {name for fields in section_changes.values() for name in fields}
+        if update_fields is not None:
+            written = set(update_fields)
+        elif self._state.adding:
+            written = None
+        else:
+            written = {f.name for f in self._meta.concrete_fields} | changed_sections
+
+        # Numeric shadows and client keys follow the fields being written
+        shadows = fill_amounts(self, written)
+        shadows += fill_client_keys(self, written)
+        if update_fields is not None:
+            kwargs['update_fields'] = {
+                *(set(update_fields) - set(self.SECTION_FIELDS)), *shadows,
+                *(['updated_at'] if changed_sections else []),
+            }
+
+        # Points assigned through `location_points` replace the track
+        pending = self.__dict__.pop('_pending_location_points', None)
+        if pending is not None:
+            parsed = parse_points(pending)
+            self.total_location_points = len(parsed)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'total_location_points'}
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if section_changes and self.archived:
+                # Editing an archived report brings its sections back first
+                restore(self)
+            save_sections(self, section_changes)
+            sync_inline_media(self, update_fields=written)
+            if pending is not None:
+                write_track(self, parsed)
+
+    def refresh_from_db(self, using=None, fields=None):
+        from .sections import forget
+
+        # Not for one deferred field being loaded: that must keep pending section changes
+        if fields is None:
+            forget(self)
+        super().refresh_from_db(using=using, fields=fields)
+
+    @property
+    def location_points(self):
+        """The full track as a list of point dicts (decodes the packed track)"""
+        from .tracks import decode
+
+        if '_pending_location_points' in self.__dict__:
+            return self._pending_location_points
+        track = self.get_track()
+        return decode(track.data) if track is not None else []
+
+    @location_points.setter
+    def location_points(self, points):
+        self._pending_location_points = list(points or [])
+
+    def get_track(self):
+        try:
+            return self.track
+        except LocationTrack.DoesNotExist:
+            return None
+
+    def get_location_summary(self):
+        """Get a summary of location tracking data"""
+        if not self.total_location_points:
+            return "No location data"
+        
+        start_time = self.location_start_time.strftime('%Y-%m-%d %H:%M') if self.location_start_time else 'N/A'
+        end_time = self.location_end_time.strftime('%Y-%m-%d %H:%M') if self.location_end_time else 'N/A'
+        
+        return f"{self.total_location_points} points | {start_time} to {end_time}"
+
+    def get_first_location(self):
+        """Get the first location point (from the track summary, nothing is decoded)"""
+        from .tracks import track_summary
+
+        return track_summary(self.get_track())['first']
+
+    def get_last_location(self):
+        """Get the last location point (from the track summary, nothing is decoded)"""
+        from .tracks import track_summary
+
+        return track_summary(self.get_track())['last']
+
+
+class InspectionOwnerSection(models.Model):
+    # Sections B (owner details; owner_name stays on the inspection, search reads it) and C
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='owner_section')
     owner_age = models.CharField(max_length=50, blank=True, null=True)
     father_name = models.CharField(max_length=255, blank=True, null=True)
     mother_name = models.CharField(max_length=255, blank=True, null=True)
@@ -115,30 +314,35 @@ class Inspection(models.Model):
     business_successor = models.TextField(blank=True, null=True)
     residential_address = models.TextField(blank=True, null=True)
     permanent_address = models.TextField(blank=True, null=True)
-    
-    # Section C: Partners/Directors
     partners_directors = models.JSONField(default=list, blank=True, null=True)
-    
-    # Section D: Purpose
+
+    class Meta:
+        db_table = 'inspection_owner'
+
+
+class InspectionFacilitySection(models.Model):
+    # Sections D, E and F (facility_type stays on the inspection, the rollups group by it)
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='facilities_section')
     purpose_investment = models.TextField(blank=True, null=True)
     purpose_bank_guarantee = models.TextField(blank=True, null=True)
     period_investment = models.CharField(max_length=100, blank=True, null=True)
-    
-    # Section E: Proposed Facilities
-    facility_type = models.CharField(max_length=100, blank=True, null=True)
     existing_limit = models.CharField(max_length=100, blank=True, null=True)
     applied_limit = models.CharField(max_length=100, blank=True, null=True)
     recommended_limit = models.CharField(max_length=100, blank=True, null=True)
     bank_percentage = models.CharField(max_length=50, blank=True, null=True)
     client_percentage = models.CharField(max_length=50, blank=True, null=True)
-    
-    # Section F: Present Outstanding
     outstanding_type = models.CharField(max_length=100, blank=True, null=True)
     limit_amount = models.CharField(max_length=100, blank=True, null=True)
     net_outstanding = models.CharField(max_length=100, blank=True, null=True)
     gross_outstanding = models.CharField(max_length=100, blank=True, null=True)
-    
+
+    class Meta:
+        db_table = 'inspection_facilities'
+
+
+class InspectionBusinessSection(models.Model):
     # Section G: Business Analysis
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='business_section')
     market_situation = models.CharField(max_length=100, blank=True, null=True)
     client_position = models.CharField(max_length=100, blank=True, null=True)
     competitors = models.JSONField(default=list, blank=True, null=True)
@@ -148,8 +352,14 @@ class Inspection(models.Model):
     production_capacity = models.CharField(max_length=100, blank=True, null=True)
     actual_production = models.CharField(max_length=100, blank=True, null=True)
     profitability_observation = models.TextField(blank=True, null=True)
-    
-    # Labor Force
+
+    class Meta:
+        db_table = 'inspection_business'
+
+
+class InspectionLaborSection(models.Model):
+    # Labour force and key employees
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='labor_section')
     male_officer = models.CharField(max_length=50, blank=True, null=True)
     female_officer = models.CharField(max_length=50, blank=True, null=True)
     skilled_officer = models.CharField(max_length=50, blank=True, null=True)
@@ -158,11 +368,15 @@ class Inspection(models.Model):
     female_worker = models.CharField(max_length=50, blank=True, null=True)
     skilled_worker = models.CharField(max_length=50, blank=True, null=True)
     unskilled_worker = models.CharField(max_length=50, blank=True, null=True)
-    
-    # Key Employees
     key_employees = models.JSONField(default=list, blank=True, null=True)
-    
-    # Section H: Property & Assets
+
+    class Meta:
+        db_table = 'inspection_labor'
+
+
+class InspectionAssetSection(models.Model):
+    # Sections H (property & assets) and I (working capital)
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='assets_section')
     cash_balance = models.CharField(max_length=100, blank=True, null=True)
     stock_trade_finished = models.CharField(max_length=100, blank=True, null=True)
     stock_trade_financial = models.CharField(max_length=100, blank=True, null=True)
@@ -182,11 +396,15 @@ class Inspection(models.Model):
     paid_up_capital = models.CharField(max_length=100, blank=True, null=True)
     retained_earning = models.CharField(max_length=100, blank=True, null=True)
     resources = models.CharField(max_length=100, blank=True, null=True)
-    
-    # Section I: Working Capital Assessment
     working_capital_items = models.JSONField(default=list, blank=True, null=True)
-    
+
+    class Meta:
+        db_table = 'inspection_assets'
+
+
+class InspectionGodownSection(models.Model):
     # Section J: Godown Particulars
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='godown_section')
     godown_location = models.TextField(blank=True, null=True)
     godown_capacity = models.CharField(max_length=100, blank=True, null=True)
     godown_space = models.CharField(max_length=100, blank=True, null=True)
@@ -201,57 +419,400 @@ class Inspection(models.Model):
     letter_disclaimer = models.BooleanField(default=False)
     insurance_policy = models.BooleanField(default=False)
     godown_hired = models.BooleanField(default=False)
-    
+
+    class Meta:
+        db_table = 'inspection_godown'
+
+
+class InspectionChecklistSection(models.Model):
     # Section K: Checklist
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='checklist_section')
     checklist_items = models.JSONField(default=dict, blank=True, null=True)
-    
-    # Section L: Site Photos & Video
+
+    class Meta:
+        db_table = 'inspection_checklist'
+
+
+class InspectionMediaSection(models.Model):
+    # Sections L (site photos & video) and M (documents): blob references (accounts.media)
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='media_section')
     site_photos = models.JSONField(default=list, blank=True, null=True)
     site_video = models.JSONField(default=list, blank=True, null=True)
-    
-    # Section M: Documents Upload
     uploaded_documents = models.JSONField(default=list, blank=True, null=True)
 
-    # Status and Timestamps - Use auto_now_add for proper timezone handling
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    class Meta:
+        db_table = 'inspection_media'
+
+
+# Inspection attributes stored in the section tables (accounts.sections)
+SECTION_MODELS = {
+    'owner': InspectionOwnerSection,
+    'facilities': InspectionFacilitySection,
+    'business': InspectionBusinessSection,
+    'labor': InspectionLaborSection,
+    'assets': InspectionAssetSection,
+    'godown': InspectionGodownSection,
+    'checklist': InspectionChecklistSection,
+    'media': InspectionMediaSection,
+}
+install_sections(Inspection, SECTION_MODELS)
+
+
+class InspectionArchive(models.Model):
+    """
+    The section rows of an old, closed inspection packed into one compressed
+    document (see archive.py). Range-partitioned by created_at on PostgreSQL.
+    """
+    inspection = models.OneToOneField(Inspection, on_delete=models.CASCADE, primary_key=True, related_name='archive')
+    # The inspection's own, copied as the partition key
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    payload = models.BinaryField()
+
+    class Meta:
+        db_table = 'inspection_archive'
+
+    def __str__(self):
+        return f"Archive of inspection {self.inspection_id}"
+
+
+class LocationTrack(models.Model):
+    """
+    An inspection's GPS track, packed by tracks.py, with the count, ends and
+    bounding box kept in columns so they can be read without decoding.
+    """
+    inspection = models.OneToOneField(
+        Inspection,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='track'
+    )
+    data = models.BinaryField(default=bytes)
+    point_count = models.IntegerField(default=0)
+    first_latitude = models.FloatField(blank=True, null=True)
+    first_longitude = models.FloatField(blank=True, null=True)
+    first_timestamp = models.DateTimeField(blank=True, null=True)
+    last_latitude = models.FloatField(blank=True, null=True)
+    last_longitude = models.FloatField(blank=True, null=True)
+    last_timestamp = models.DateTimeField(blank=True, null=True)
+    min_latitude = models.FloatField(blank=True, null=True)
+    max_latitude = models.FloatField(blank=True, null=True)
+    min_longitude = models.FloatField(blank=True, null=True)
+    max_longitude = models.FloatField(blank=True, null=True)
+    # Simplified polylines by zoom level (see polyline.py); reset when the points change
+    polylines = models.JSONField(default=dict, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'location_tracks'
+
+    def __str__(self):
+        return f"Track of inspection {self.inspection_id} ({self.point_count} points)"
+
+
+class InspectionLocation(models.Model):
+    """
+    One track point in the spatial index (see geo.py). Written alongside the
+    packed track by tracks.py; `manage.py rebuild_location_index` recreates it.
+    """
+    inspection = models.ForeignKey(
+        Inspection,
+        on_delete=models.CASCADE,
+        related_name='locations'
+    )
+    cell = models.BigIntegerField()
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+
+    class Meta:
+        db_table = 'inspection_locations'
+        indexes = [
+            # Cell ranges first; the other columns let queries be answered from the index alone
+            models.Index(fields=['cell', 'inspection', 'latitude', 'longitude'], name='insp_location_cell_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.latitude}, {self.longitude} (inspection {self.inspection_id})"
+
+
+class MediaBlob(models.Model):
+    """Content-addressed file stored once under MEDIA_ROOT, keyed by its SHA-256"""
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField(default=0)
+    mime_type = models.CharField(max_length=100, blank=True, default='')
+    file = models.FileField(max_length=255)
+    # Pixel size of images, upright; set once their variants are generated
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'media_blobs'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes)"
+
+
+class InspectionAttachment(models.Model):
+    KIND_PHOTO = 'photo'
+    KIND_VIDEO = 'video'
+    KIND_DOCUMENT = 'document'
+    KIND_CHOICES = [
+        (KIND_PHOTO, 'Photo'),
+        (KIND_VIDEO, 'Video'),
+        (KIND_DOCUMENT, 'Document'),
+    ]
+
+    inspection = models.ForeignKey(
+        Inspection,
+        on_delete=models.CASCADE,
+        related_name='attachments'
+    )
+    blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.PROTECT,
+        related_name='attachments'
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    name = models.CharField(max_length=255, blank=True, default='')
+    position = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inspection_attachments'
+        ordering = ['kind', 'position', 'id']
+
+    def __str__(self):
+        return f"{self.kind} #{self.position} of inspection {self.inspection_id}"
+
+
+class ImageVariant(models.Model):
+    """Re-encoded, EXIF-stripped copy of an image blob at a bounded size (see accounts.images)"""
+    NAME_THUMB = 'thumb'
+    NAME_MEDIUM = 'medium'
+    NAME_ORIGINAL = 'original'
+    NAME_CHOICES = [
+        (NAME_THUMB, 'Thumbnail'),
+        (NAME_MEDIUM, 'Medium'),
+        (NAME_ORIGINAL, 'Original'),
+    ]
+
+    source = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.CASCADE,
+        related_name='variants'
+    )
+    name = models.CharField(max_length=20, choices=NAME_CHOICES)
+    file = models.FileField(max_length=255)
+    mime_type = models.CharField(max_length=100)
+    size = models.PositiveIntegerField(default=0)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'image_variants'
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'name'], name='image_variant_source_name_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} of {self.source_id} ({self.width}x{self.height})"
+
+
+class UploadSession(models.Model):
+    """Resumable chunked upload; bytes are appended to a part file until the session is completed"""
+    STATUS_OPEN = 'open'
+    STATUS_COMPLETE = 'complete'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='upload_sessions'
+    )
+    kind = models.CharField(max_length=20, choices=InspectionAttachment.KIND_CHOICES)
+    file_name = models.CharField(max_length=255)
+    mime_type = models.CharField(max_length=100, blank=True, default='')
+    total_size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    attachment = models.ForeignKey(
+        InspectionAttachment,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='+'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        db_table = 'inspections'
-        ordering = ['-created_at']
+        db_table = 'upload_sessions'
 
     def __str__(self):
-        return f"{self.client_name} - {self.industry_name}"
+        return f"{self.file_name} ({self.received}/{self.total_size})"
 
-    def get_location_summary(self):
-        """Get a summary of location tracking data"""
-        if not self.location_points:
-            return "No location data"
-        
-        start_time = self.location_start_time.strftime('%Y-%m-%d %H:%M') if self.location_start_time else 'N/A'
-        end_time = self.location_end_time.strftime('%Y-%m-%d %H:%M') if self.location_end_time else 'N/A'
-        
-        return f"{self.total_location_points} points | {start_time} to {end_time}"
 
-    def get_first_location(self):
-        """Get the first location point"""
-        if self.location_points and len(self.location_points) > 0:
-            first_point = self.location_points[0]
-            return {
-                'latitude': first_point.get('latitude'),
-                'longitude': first_point.get('longitude'),
-                'timestamp': first_point.get('timestamp')
-            }
-        return None
+class InspectionStatusCounter(models.Model):
+    """
+    Number of inspections per (branch, inspector, status), kept in step with the
+    inspections table by the signal handlers in counters.py. Bulk writes that skip
+    signals (QuerySet.update, bulk_create) must be followed by
+    `manage.py rebuild_status_counters`.
+    """
+    branch_name = models.CharField(max_length=255, blank=True, default='')
+    inspector = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='status_counters'
+    )
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
 
-    def get_last_location(self):
-        """Get the last location point"""
-        if self.location_points and len(self.location_points) > 0:
-            last_point = self.location_points[-1]
-            return {
-                'latitude': last_point.get('latitude'),
-                'longitude': last_point.get('longitude'),
-                'timestamp': last_point.get('timestamp')
-            }
-        return None
+    class Meta:
+        db_table = 'inspection_status_counters'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['branch_name', 'inspector', 'status'],
+                name='unique_status_counter',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.branch_name} / {self.inspector_id} / {self.status}: {self.count}"
+
+
+class SyncTombstone(models.Model):
+    """
+    A row that left an inspector's sync scope: it was deleted or reassigned to
+    someone else. Recorded by the signal handlers in sync.py so that /api/sync/
+    can report removals; pruned by `manage.py prune_sync_tombstones`.
+    """
+    MODEL_NEW_INSPECTION = 'new_inspection'
+    MODEL_INSPECTION = 'inspection'
+    MODEL_CHOICES = [
+        (MODEL_NEW_INSPECTION, 'New Inspection'),
+        (MODEL_INSPECTION, 'Inspection'),
+    ]
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    # No FK constraint: tombstones are written while a user's rows are being
+    # cascade-deleted, before the user row itself is gone
+    inspector = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'sync_tombstones'
+        indexes = [
+            models.Index(fields=['inspector', 'created_at'], name='tombstone_inspector_idx'),
+            models.Index(fields=['created_at'], name='tombstone_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} (inspector {self.inspector_id})"
+
+
+class Job(models.Model):
+    """
+    A unit of background work (see accounts.jobs): the name of a registered
+    task and its JSON arguments. Workers claim due rows with
+    SELECT ... FOR UPDATE SKIP LOCKED, so they never wait on each other.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'background_jobs'
+        indexes = [
+            # Only the rows a worker may claim, in claim order
+            models.Index(
+                fields=['run_at', 'id'], name='job_queued_idx',
+                condition=models.Q(status='queued'),
+            ),
+            models.Index(fields=['status', 'updated_at'], name='job_status_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
+
+
+class InspectionDailyRollup(models.Model):
+    """
+    Totals of the inspections created on one day (in TIME_ZONE) for one
+    branch / facility type / investment category / status, which is what
+    /api/analytics/ reads. Days touched by a write are queued in
+    RollupPendingDay and recomputed by accounts.rollups.refresh().
+    """
+    day = models.DateField()
+    # '' stands for "not filled in", as in the status counters
+    branch_name = models.CharField(max_length=255, blank=True, default='')
+    facility_type = models.CharField(max_length=100, blank=True, default='')
+    investment_category = models.CharField(max_length=100, blank=True, default='')
+    status = models.CharField(max_length=20)
+    inspections = models.IntegerField(default=0)
+    existing_limit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    applied_limit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    recommended_limit = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    limit_amount = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    net_outstanding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    gross_outstanding = models.DecimalField(max_digits=20, decimal_places=2, default=0)
+    male_workers = models.BigIntegerField(default=0)
+    female_workers = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'inspection_daily_rollups'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'branch_name', 'facility_type', 'investment_category', 'status'],
+                name='unique_daily_rollup',
+            ),
+        ]
+        indexes = [
+            # A branch admin's date range
+            models.Index(fields=['branch_name', 'day'], name='rollup_branch_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.branch_name} / {self.status}: {self.inspections}"
+
+
+class RollupPendingDay(models.Model):
+    """A day whose InspectionDailyRollup rows are out of date"""
+    day = models.DateField(unique=True)
+
+    class Meta:
+        db_table = 'rollup_pending_days'
+
+    def __str__(self):
+        return str(self.day)
@@ -0,0 +1,123 @@
+# pagination.py
+import base64
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id), newest first.
+
+    The cursor is an opaque token holding the key of the last row returned, and
+    the next page is read with a range condition on that key. There is no
+    OFFSET and no COUNT(*), so every page costs the same however deep it is.
+    The previous link holds the first row of the page instead, marked to read
+    backwards from it (oldest first, then reversed).
+    """
+    page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE') or 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        key, backwards = self.decode_cursor(request)
+
+        if backwards:
+            created_at, pk = key
+            queryset = queryset.order_by('created_at', 'id').filter(created_at__gte=created_at).filter(
+                Q(created_at__gt=created_at) | Q(id__gt=pk)
+            )
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+            if key is not None:
+                created_at, pk = key
+                # created_at <= c narrows the index range; the OR only breaks ties
+                queryset = queryset.filter(created_at__lte=created_at).filter(
+                    Q(created_at__lt=created_at) | Q(id__lt=pk)
+                )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+            # The page the cursor came from follows this one
+            has_newer, has_older = has_more, bool(rows)
+        else:
+            has_newer, has_older = key is not None and bool(rows), has_more
+        self.next_key = (rows[-1].created_at, rows[-1].pk) if has_older else None
+        self.previous_key = (rows[0].created_at, rows[0].pk) if has_newer else None
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.next_key))
+
+    def get_previous_link(self):
+        if self.previous_key is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.previous_key, backwards=True))
+
+    def encode_cursor(self, key, backwards=False):
+        created_at, pk = key
+        data = {'c': created_at.isoformat(), 'i': pk}
+        if backwards:
+            data['b'] = 1
+        raw = json.dumps(data, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request):
+        """(key, backwards) from the cursor parameter; (None, False) for the first page"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            data = json.loads(raw)
+            created_at = parse_datetime(data['c'])
+            pk = int(data['i'])
+            backwards = data.get('b') == 1
+        except (TypeError, ValueError, KeyError, AttributeError, json.JSONDecodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if created_at is None or timezone.is_naive(created_at):
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), backwards
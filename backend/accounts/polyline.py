@@ -0,0 +1,197 @@
+# polyline.py
+"""
+Track simplification for map display: Douglas-Peucker on the decoded track,
+then Google's encoded polyline format (precision 5, about 1 m).
+
+Whenever a track's points change, a `track_polylines` job computes the
+polylines of the PRECOMPUTED_ZOOMS into LocationTrack.polylines, so map
+views read them without decoding the track. Other zooms are computed on
+first read and cached the same way; explicit tolerances never are.
+"""
+import heapq
+import math
+
+from .jobs import enqueue, task
+from .tracks import decode
+
+METERS_PER_DEGREE_LAT = 110540.0
+METERS_PER_DEGREE_LNG = 111320.0
+# Ground resolution of one pixel at zoom 0 on the equator (Web Mercator, 256 px tiles)
+EQUATOR_METERS_PER_PIXEL = 156543.03392
+MIN_ZOOM = 0
+MAX_ZOOM = 21
+DEFAULT_ZOOM = 16
+# The zooms the map opens an inspection at: its track, its branch, its city
+PRECOMPUTED_ZOOMS = (12, 14, DEFAULT_ZOOM)
+# However long the inspection, a polyline never carries more points than this
+MAX_POINTS = 500
+
+
+def zoom_tolerance(zoom, latitude):
+    """Meters covered by one screen pixel at `zoom` around `latitude`"""
+    return EQUATOR_METERS_PER_PIXEL * math.cos(math.radians(latitude)) / (2 ** zoom)
+
+
+def _segment_distance(p, a, b):
+    """Distance in meters from p to the segment a-b; points are (x, y) in meters"""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    if dx == 0 and dy == 0:
+        return math.hypot(p[0] - a[0], p[1] - a[1])
+    t = max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / (dx * dx + dy * dy)))
+    return math.hypot(p[0] - a[0] - t * dx, p[1] - a[1] - t * dy)
+
+
+def simplify(coords, tolerance, max_points=MAX_POINTS):
+    """
+    Douglas-Peucker: keep the points of `coords` ((lat, lng) pairs) that deviate
+    more than `tolerance` meters from the simplified line, at most `max_points`.
+
+    Segments are split farthest-deviation-first from a heap, so stopping at
+    `max_points` keeps the most significant points, and the work is bounded by
+    len(coords) * max_points whatever the tolerance. Returns (coords, tolerance
+    actually achieved, which is larger than asked when the cap was hit).
+    """
+    if len(coords) < 3:
+        return list(coords), tolerance
+
+    # Local equirectangular projection; plenty accurate over one visit
+    scale = METERS_PER_DEGREE_LNG * math.cos(math.radians(coords[0][0]))
+    xy = [(lng * scale, lat * METERS_PER_DEGREE_LAT) for lat, lng in coords]
+
+    def farthest(start, end):
+        best, best_distance = None, -1.0
+        for i in range(start + 1, end):
+            d = _segment_distance(xy[i], xy[start], xy[end])
+            if d > best_distance:
+                best, best_distance = i, d
+        return best, best_distance
+
+    keep = {0, len(coords) - 1}
+    heap = []
+
+    def push(start, end):
+        if end - start > 1:
+            index, distance = farthest(start, end)
+            heapq.heappush(heap, (-distance, index, start, end))
+
+    push(0, len(coords) - 1)
+    while heap and len(keep) < max_points:
+        distance, index, start, end = heap[0]
+        if -distance <= tolerance:
+            break
+        heapq.heappop(heap)
+        keep.add(index)
+        push(start, index)
+        push(index, end)
+
+    achieved = max(tolerance, -heap[0][0]) if heap else tolerance
+    return [coords[i] for i in sorted(keep)], achieved
+
+
+def _encode_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def encode_polyline(coords, precision=5):
+    """Google encoded polyline of (lat, lng) pairs"""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lng = 0
+    for lat, lng in coords:
+        lat, lng = round(lat * factor), round(lng * factor)
+        _encode_value(lat - prev_lat, out)
+        _encode_value(lng - prev_lng, out)
+        prev_lat, prev_lng = lat, lng
+    return ''.join(out)
+
+
+def decode_polyline(encoded, precision=5):
+    factor = 10 ** precision
+    coords = []
+    index = lat = lng = 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            result = shift = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lng += deltas[1]
+        coords.append((lat / factor, lng / factor))
+    return coords
+
+
+def _track_coords(track):
+    return [(p['latitude'], p['longitude']) for p in decode(track.data)]
+
+
+def _polyline(coords, tolerance):
+    simplified, tolerance = simplify(coords, tolerance)
+    return {
+        'polyline': encode_polyline(simplified),
+        'point_count': len(simplified),
+        'original_point_count': len(coords),
+        'tolerance': round(tolerance, 3),
+    }
+
+
+def _mid_latitude(track):
+    return (track.min_latitude + track.max_latitude) / 2
+
+
+def _store(track, polylines):
+    """Cache `polylines` on the track: only this column, and not if the points changed meanwhile"""
+    track.polylines = {**(track.polylines or {}), **polylines}
+    type(track).objects.filter(pk=track.pk, updated_at=track.updated_at).update(polylines=track.polylines)
+
+
+def track_polyline(track, zoom=None, tolerance=None):
+    """
+    Simplified, encoded polyline of a LocationTrack for `zoom` (cached on the
+    track until its points change) or for an explicit `tolerance` in meters.
+    """
+    if track is None or not track.point_count:
+        return {'polyline': '', 'point_count': 0, 'original_point_count': 0, 'tolerance': tolerance or 0}
+
+    if tolerance is not None:
+        return _polyline(_track_coords(track), tolerance)
+
+    key = str(zoom)
+    cached = (track.polylines or {}).get(key)
+    if cached is None:
+        cached = _polyline(_track_coords(track), zoom_tolerance(zoom, _mid_latitude(track)))
+        _store(track, {key: cached})
+    return cached
+
+
+# -------------------- Jobs --------------------
+
+@task('track_polylines')
+def precompute_polylines_task(inspection_id):
+    from .models import LocationTrack
+
+    track = LocationTrack.objects.filter(inspection=inspection_id).first()
+    if track is None or not track.point_count:
+        return
+    missing = [zoom for zoom in PRECOMPUTED_ZOOMS if str(zoom) not in (track.polylines or {})]
+    if not missing:
+        return
+    # One decode for all the zooms
+    coords = _track_coords(track)
+    latitude = _mid_latitude(track)
+    _store(track, {str(zoom): _polyline(coords, zoom_tolerance(zoom, latitude)) for zoom in missing})
+
+
+def schedule_polylines(inspection_id):
+    """Queue the PRECOMPUTED_ZOOMS polylines of this inspection's track (as part of the current transaction)"""
+    enqueue('track_polylines', {'inspection_id': inspection_id})
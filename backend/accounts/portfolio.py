@@ -0,0 +1,161 @@
+# portfolio.py
+"""
+Portfolio figures over the parsed amount columns (see amounts.py): count,
+sum, average and percentiles per branch, sector code or investment
+category, each computed by the database in one grouped query.
+
+PostgreSQL has PERCENTILE_CONT as an ordered-set aggregate; SQLite gets an
+equivalent aggregate function registered on each new connection, as Django
+does for STDDEV_POP.
+"""
+import math
+from datetime import timedelta
+
+from django.db.backends.signals import connection_created
+from django.db.models import Aggregate, Avg, Count, FloatField, Sum
+from django.dispatch import receiver
+
+from .amounts import AMOUNT_FIELDS, format_amount, value_field
+from .stats import day_start, parse_stats_params
+
+# group_by parameter -> Inspection column
+GROUP_COLUMNS = {
+    'branch': 'branch_name',
+    'sector_code': 'sector_code',
+    'investment_category': 'investment_category',
+}
+# Sections E and F: the facility and outstanding amounts
+DEFAULT_FIELDS = AMOUNT_FIELDS[:6]
+DEFAULT_PERCENTILES = (50, 90)
+MAX_PERCENTILES = 5
+
+
+class PercentileCont(Aggregate):
+    """Percentile with linear interpolation between the closest values (fraction 0..1)"""
+    function = 'PERCENTILE_CONT'
+    name = 'PercentileCont'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction, **extra):
+        if not 0 <= fraction <= 1:
+            raise ValueError("fraction must be between 0 and 1")
+        self.fraction = float(fraction)
+        super().__init__(expression, **extra)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, template=f'%(function)s(%(expressions)s, {self.fraction!r})', **extra_context
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection,
+            template=f'%(function)s({self.fraction!r}) WITHIN GROUP (ORDER BY %(expressions)s)',
+            **extra_context
+        )
+
+
+class _SQLitePercentile:
+    def __init__(self):
+        self.values = []
+        self.fraction = 0.5
+
+    def step(self, value, fraction):
+        self.fraction = fraction
+        if value is not None:
+            self.values.append(value)
+
+    def finalize(self):
+        if not self.values:
+            return None
+        values = sorted(self.values)
+        position = (len(values) - 1) * self.fraction
+        low, high = math.floor(position), math.ceil(position)
+        return values[low] + (values[high] - values[low]) * (position - low)
+
+
+@receiver(connection_created)
+def register_sqlite_functions(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        connection.connection.create_aggregate('PERCENTILE_CONT', 2, _SQLitePercentile)
+
+
+def parse_portfolio_params(params):
+    """
+    Read group_by, fields, percentiles (e.g. 50,90,99), status and
+    date_from / date_to from query parameters. Raises ValueError with a
+    message suitable for a 400 response.
+    """
+    options = {}
+    group_by = params.get('group_by')
+    if group_by:
+        if group_by not in GROUP_COLUMNS:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUP_COLUMNS)}")
+        options['group_by'] = group_by
+
+    fields = params.get('fields')
+    if fields:
+        fields = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in fields if f not in AMOUNT_FIELDS]
+        if unknown:
+            raise ValueError(f"unknown fields: {', '.join(unknown)}; amount fields are {', '.join(AMOUNT_FIELDS)}")
+        options['fields'] = fields
+
+    percentiles = params.get('percentiles')
+    if percentiles:
+        try:
+            percentiles = [int(p) for p in percentiles.split(',') if p.strip()]
+        except ValueError:
+            percentiles = None
+        if not percentiles or len(percentiles) > MAX_PERCENTILES or not all(1 <= p <= 99 for p in percentiles):
+            raise ValueError(f"percentiles must be up to {MAX_PERCENTILES} whole numbers from 1 to 99")
+        options['percentiles'] = percentiles
+
+    dates = parse_stats_params({k: params.get(k) for k in ('date_from', 'date_to')})
+    options.update(dates)
+    if params.get('status'):
+        options['status'] = params.get('status')
+    return options
+
+
+def portfolio_summary(queryset, group_by=None, fields=DEFAULT_FIELDS, percentiles=DEFAULT_PERCENTILES,
+                      status=None, date_from=None, date_to=None):
+    """
+    {'total': figures, 'groups': [figures per group]} for the inspections in
+    `queryset`, where figures are the inspection count and, per amount field,
+    how many have a value and their sum, average and percentiles.
+    """
+    if status:
+        queryset = queryset.filter(status=status)
+    if date_from is not None:
+        queryset = queryset.filter(created_at__gte=day_start(date_from))
+    if date_to is not None:
+        queryset = queryset.filter(created_at__lt=day_start(date_to + timedelta(days=1)))
+    queryset = queryset.order_by()
+
+    aggregates = {'inspections': Count('id')}
+    for name in fields:
+        column = value_field(name)
+        aggregates[f'{name}_count'] = Count(column)
+        aggregates[f'{name}_sum'] = Sum(column)
+        aggregates[f'{name}_avg'] = Avg(column)
+        for p in percentiles:
+            aggregates[f'{name}_p{p}'] = PercentileCont(column, p / 100)
+
+    def figures(row):
+        result = {'inspections': row['inspections']}
+        for name in fields:
+            result[name] = {
+                'count': row[f'{name}_count'],
+                'sum': format_amount(row[f'{name}_sum']) if row[f'{name}_count'] else format_amount(0),
+                'avg': format_amount(row[f'{name}_avg']),
+                **{f'p{p}': format_amount(row[f'{name}_p{p}']) for p in percentiles},
+            }
+        return result
+
+    data = {'total': figures(queryset.aggregate(**aggregates))}
+    if group_by:
+        column = GROUP_COLUMNS[group_by]
+        rows = queryset.values(column).annotate(**aggregates).order_by(column)
+        data['groups'] = [{column: row[column], **figures(row)} for row in rows]
+    return data
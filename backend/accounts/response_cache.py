@@ -0,0 +1,187 @@
+# response_cache.py
+import asyncio
+import functools
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+from .models import CustomUser, Inspection, NewInspection
+
+KEY_PREFIX = 'respcache'
+HITS_KEY = f'{KEY_PREFIX}:hits'
+MISSES_KEY = f'{KEY_PREFIX}:misses'
+
+# Namespace invalidated when each model changes
+MODEL_NAMESPACES = {
+    Inspection: 'inspections',
+    NewInspection: 'new_inspections',
+    CustomUser: 'users',
+}
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:ns:{namespace}'
+
+
+def namespace_versions(namespaces):
+    """
+    Current version token of each namespace. Tokens are random rather than
+    counters so that an evicted version key can never bring old entries back.
+    """
+    keys = [_version_key(ns) for ns in namespaces]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def anamespace_versions(namespaces):
+    keys = [_version_key(ns) for ns in namespaces]
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, uuid.uuid4().hex, None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def invalidate(namespace):
+    """Make every cached response that depends on `namespace` unreachable"""
+    cache.set(_version_key(namespace), uuid.uuid4().hex, None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+async def _acount(key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+def cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / lookups, 4) if lookups else None,
+        'backend': settings.CACHES['default']['BACKEND'],
+    }
+
+
+def user_scope(request):
+    user = request.user
+    return f'{user.role}:{user.branch_name}:{user.pk}' if user.is_authenticated else 'anonymous'
+
+
+def branch_scope(request):
+    user = request.user
+    return f'branch:{user.branch_name}' if user.is_authenticated else 'anonymous'
+
+
+def global_scope(request):
+    return 'all'
+
+
+def cached_response(namespaces, scope=global_scope, timeout=None):
+    """
+    Cache a read-only view's response until one of `namespaces` is invalidated.
+
+    The key combines the view, `scope(request)` (whose data the caller may see),
+    the query string and the namespace versions. Apply it below @api_view /
+    @action / @async_api_view so that `request.user` is already authenticated.
+    Async views use the cache's async API.
+    """
+    def expiry():
+        return settings.RESPONSE_CACHE_TIMEOUT if timeout is None else timeout
+
+    def make_key(view, request, versions):
+        query = '&'.join(sorted(f'{k}={v}' for k, v in request.GET.items()))
+        return f'{KEY_PREFIX}:{view.__module__}.{view.__qualname__}:{scope(request)}:{query}:{":".join(versions)}'
+
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(*args, **kwargs):
+                request = next(a for a in args if hasattr(a, 'method'))
+                if request.method != 'GET':
+                    return await view(*args, **kwargs)
+
+                key = make_key(view, request, await anamespace_versions(namespaces))
+                entry = await cache.aget(key)
+                if entry is not None:
+                    await _acount(HITS_KEY)
+                    return _from_entry(entry)
+
+                await _acount(MISSES_KEY)
+                response = await view(*args, **kwargs)
+                if response.status_code == 200:
+                    await cache.aset(key, _to_entry(response), expiry())
+                response['X-Cache'] = 'MISS'
+                return response
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            request = next(a for a in args if hasattr(a, 'method'))
+            if request.method != 'GET':
+                return view(*args, **kwargs)
+
+            key = make_key(view, request, namespace_versions(namespaces))
+            entry = cache.get(key)
+            if entry is not None:
+                _count(HITS_KEY)
+                return _from_entry(entry)
+
+            _count(MISSES_KEY)
+            response = view(*args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, _to_entry(response), expiry())
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def _to_entry(response):
+    if isinstance(response, Response):
+        return ('drf', response.data, None, response.status_code)
+    return ('raw', response.content, response['Content-Type'], response.status_code)
+
+
+def _from_entry(entry):
+    kind, payload, content_type, status = entry
+    if kind == 'drf':
+        response = Response(payload, status=status)
+    else:
+        response = HttpResponse(payload, content_type=content_type, status=status)
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_on_change(sender, **kwargs):
+    namespace = MODEL_NAMESPACES.get(sender)
+    if namespace is not None:
+        invalidate(namespace)
+        # Again after commit: a reader between the write and the commit still
+        # sees the old rows and may have cached them under the new version
+        transaction.on_commit(lambda: invalidate(namespace))
@@ -0,0 +1,221 @@
+# rollups.py
+"""
+Daily rollups of the inspections table for /api/analytics/.
+
+A write to an inspection queues the day it was created on (RollupPendingDay)
+and, once committed, schedules a refresh_rollups job a little later, so a
+burst of edits costs one refresh. refresh() recomputes only the queued days,
+each run of consecutive days with one grouped query; rebuild() recomputes
+everything. The analytics endpoint then reads a few rows per day instead of
+aggregating the wide inspections table.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import Trunc, TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .amounts import format_amount, value_field
+from .jobs import enqueue, task
+from .models import Inspection, InspectionDailyRollup, Job, RollupPendingDay
+from .stats import STATUS_KEYS, day_start, parse_stats_params
+
+DIMENSIONS = ['branch_name', 'facility_type', 'investment_category', 'status']
+AMOUNTS = ['existing_limit', 'applied_limit', 'recommended_limit', 'limit_amount', 'net_outstanding', 'gross_outstanding']
+# Rollup column -> Inspection head-count column
+HEADCOUNTS = {'male_workers': 'male_worker', 'female_workers': 'female_worker'}
+# Inspection columns a rollup reads (the parsed shadows, not the section texts)
+SOURCE_FIELDS = {*DIMENSIONS, *map(value_field, [*AMOUNTS, *HEADCOUNTS.values()]), 'created_at'}
+
+# group_by parameter -> rollup column
+GROUP_FIELDS = {
+    'branch': 'branch_name',
+    'facility_type': 'facility_type',
+    'investment_category': 'investment_category',
+    'status': 'status',
+}
+INTERVALS = ('day', 'week', 'month', 'total')
+DEFAULT_DAYS = 30
+
+
+def day_of(moment):
+    return timezone.localtime(moment).date()
+
+
+# -------------------- Refreshing --------------------
+
+def mark_days(days):
+    """Queue days for the next refresh"""
+    RollupPendingDay.objects.bulk_create(
+        [RollupPendingDay(day=day) for day in set(days)], ignore_conflicts=True
+    )
+
+
+def schedule_refresh():
+    """Queue a refresh job unless one is already waiting"""
+    if not Job.objects.filter(task='refresh_rollups', status=Job.STATUS_QUEUED).exists():
+        enqueue('refresh_rollups', run_at=timezone.now() + timedelta(seconds=settings.ROLLUP_REFRESH_DELAY))
+
+
+def _runs(days):
+    """Consecutive days grouped into (first, last) ranges"""
+    runs = []
+    for day in sorted(days):
+        if runs and runs[-1][1] == day - timedelta(days=1):
+            runs[-1][1] = day
+        else:
+            runs.append([day, day])
+    return runs
+
+
+def compute(inspections, rollup_model=InspectionDailyRollup):
+    """Unsaved rollup rows for the inspections in the queryset (works on historical models too)"""
+    aggregates = {'inspections': Count('id')}
+    for name in AMOUNTS:
+        aggregates[name] = Sum(value_field(name))
+    for column, source in HEADCOUNTS.items():
+        aggregates[column] = Sum(value_field(source))
+
+    rollups = {}
+    rows = (
+        inspections.order_by()
+        .annotate(day=TruncDate('created_at'))
+        .values('day', *DIMENSIONS)
+        .annotate(**aggregates)
+    )
+    for row in rows.iterator():
+        # NULL and '' are the same "not filled in" group
+        key = (row['day'], *(row[d] or '' for d in DIMENSIONS))
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollup = rollups[key] = rollup_model(**dict(zip(['day', *DIMENSIONS], key)))
+        for name in aggregates:
+            setattr(rollup, name, getattr(rollup, name) + (row[name] or 0))
+    return rollups.values()
+
+
+def refresh():
+    """Recompute the rollups of the queued days; returns the number of days refreshed"""
+    from .response_cache import invalidate
+
+    with transaction.atomic():
+        days = list(RollupPendingDay.objects.values_list('day', flat=True))
+        if not days:
+            return 0
+        # A write committed from here on queues its day again
+        RollupPendingDay.objects.filter(day__in=days).delete()
+        for first, last in _runs(days):
+            InspectionDailyRollup.objects.filter(day__range=(first, last)).delete()
+            inspections = Inspection.objects.filter(
+                created_at__gte=day_start(first), created_at__lt=day_start(last + timedelta(days=1))
+            )
+            InspectionDailyRollup.objects.bulk_create(compute(inspections), batch_size=1000)
+        transaction.on_commit(lambda: invalidate('analytics'))
+    return len(days)
+
+
+def rebuild():
+    """Recompute every rollup from the inspections table; returns the number of rollup rows"""
+    from .response_cache import invalidate
+
+    with transaction.atomic():
+        RollupPendingDay.objects.all().delete()
+        InspectionDailyRollup.objects.all().delete()
+        rollups = InspectionDailyRollup.objects.bulk_create(compute(Inspection.objects.all()), batch_size=1000)
+        transaction.on_commit(lambda: invalidate('analytics'))
+    return len(rollups)
+
+
+@task('refresh_rollups')
+def refresh_rollups_task():
+    refresh()
+
+
+@receiver(post_save, sender=Inspection)
+def queue_saved_day(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.created_at is None:
+        return
+    if update_fields is not None and not SOURCE_FIELDS & set(update_fields):
+        return
+    mark_days([day_of(instance.created_at)])
+    transaction.on_commit(schedule_refresh)
+
+
+@receiver(post_delete, sender=Inspection)
+def queue_deleted_day(sender, instance, **kwargs):
+    if instance.created_at is not None:
+        mark_days([day_of(instance.created_at)])
+        transaction.on_commit(schedule_refresh)
+
+
+# -------------------- Reading --------------------
+
+def parse_analytics_params(params):
+    """
+    Read date_from / date_to (YYYY-MM-DD, default the last 30 days), group_by
+    (comma-separated: branch, facility_type, investment_category, status) and
+    interval (day, week, month or total). Raises ValueError with a message
+    suitable for a 400 response.
+    """
+    options = parse_stats_params({k: params.get(k) for k in ('date_from', 'date_to')})
+    options.setdefault('date_to', timezone.localdate())
+    options.setdefault('date_from', options['date_to'] - timedelta(days=DEFAULT_DAYS - 1))
+    if options['date_from'] > options['date_to']:
+        raise ValueError("date_from must not be after date_to")
+
+    group_by = [g.strip() for g in params.get('group_by', '').split(',') if g.strip()]
+    unknown = [g for g in group_by if g not in GROUP_FIELDS]
+    if unknown:
+        raise ValueError(f"group_by must be a comma-separated list of: {', '.join(GROUP_FIELDS)}")
+    options['group_by'] = group_by
+
+    interval = params.get('interval', 'day')
+    if interval not in INTERVALS:
+        raise ValueError(f"interval must be one of: {', '.join(INTERVALS)}")
+    options['interval'] = interval
+    return options
+
+
+def analytics(rollups, date_from, date_to, group_by=(), interval='day'):
+    """
+    Totals per period (`interval`) and per `group_by` column over the rollup
+    rows of [date_from, date_to], plus the totals of the whole range.
+    """
+    rollups = rollups.filter(day__range=(date_from, date_to)).order_by()
+    fields = [GROUP_FIELDS[g] for g in group_by]
+    if interval != 'total':
+        period = F('day') if interval == 'day' else Trunc('day', interval, output_field=DateField())
+        rollups = rollups.annotate(period=period)
+        fields.insert(0, 'period')
+
+    # Output name -> aggregate; aliased with a prefix as they would clash with the columns summed
+    aggregates = {'inspections': Sum('inspections')}
+    for value, key in STATUS_KEYS.items():
+        aggregates[key] = Sum('inspections', filter=Q(status=value))
+    for name in [*AMOUNTS, *HEADCOUNTS]:
+        aggregates[name] = Sum(name)
+    aliased = {f'sum_{name}': aggregate for name, aggregate in aggregates.items()}
+
+    def figures(row):
+        result = {}
+        for name in aggregates:
+            value = row[f'sum_{name}'] or 0
+            result[name] = format_amount(value) if name in AMOUNTS else value
+        return result
+
+    rows = []
+    for row in rollups.values(*fields).annotate(**aliased).order_by(*fields):
+        group = {f: (row[f] or None) if f != 'period' else row[f] for f in fields}
+        rows.append({**group, **figures(row)})
+    return {
+        'date_from': date_from,
+        'date_to': date_to,
+        'interval': interval,
+        'group_by': list(group_by),
+        'rows': rows,
+        'total': figures(rollups.aggregate(**aliased)),
+    }
@@ -0,0 +1,95 @@
+# search.py
+"""
+Full-text search over inspections for /api/inspections/search/.
+
+On PostgreSQL every row carries `search_vector`, a tsvector written by a
+trigger (created by migration 0018), so bulk_create and queryset.update() keep it current too. It holds
+client_name (weight A), owner_name, group_name and industry_name (B) and the
+digits of phone_number (C), under the 'simple' configuration: the text is
+mostly names, often in Bengali, and must not be stemmed. A GIN index answers
+the match and ts_rank orders it; the last word of the query matches as a
+prefix, for autocomplete while typing.
+
+Fragments from inside a word ("ahim" for "Rahim") and partial phone numbers
+are matched with ILIKE, which a trigram GIN index over UPPER() of the same
+columns serves; that is the expression Django's icontains produces, so the
+admin's search_fields use the index as well.
+
+Other backends (the SQLite test database) have no tsvector and fall back to
+the ILIKE match alone, newest first.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+
+# Name fields and their weights, then the phone number
+WEIGHTED_FIELDS = {'client_name': 'A', 'owner_name': 'B', 'group_name': 'B', 'industry_name': 'B'}
+SEARCH_FIELDS = [*WEIGHTED_FIELDS, 'phone_number']
+RESULT_FIELDS = [
+    'id', 'client_name', 'owner_name', 'group_name', 'industry_name', 'phone_number',
+    'branch_name', 'status', 'inspector_id', 'created_at',
+]
+# Letters and digits, with the Bengali block spelled out: its vowel signs are
+# combining marks, which \w leaves out; everything else separates words
+WORD = re.compile(r'(?:[^\W_]|[\u0980-\u09FF])+')
+# Shorter fragments have no trigram to look up and would scan the table
+MIN_FRAGMENT = 3
+MAX_WORDS = 8
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# -------------------- Queries --------------------
+
+def parse_search_params(params):
+    """
+    Read q (the words typed so far) and limit from query parameters. Raises
+    ValueError with a message suitable for a 400 response.
+    """
+    words = WORD.findall((params.get('q') or '').lower())
+    if not words:
+        raise ValueError("q must contain at least one letter or digit")
+    try:
+        limit = int(params.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"limit must be a whole number from 1 to {MAX_LIMIT}")
+    return {'words': words[:MAX_WORDS], 'limit': limit}
+
+
+def tsquery(words):
+    """Raw tsquery matching every word, the last one as a prefix"""
+    # WORD leaves only letters and digits, nothing tsquery would parse as an operator
+    return ' & '.join(words[:-1] + [f'{words[-1]}:*'])
+
+
+def fragment_match(words):
+    """Every word (of MIN_FRAGMENT characters or more) inside one of the search fields"""
+    match = Q()
+    for word in words:
+        if len(word) >= MIN_FRAGMENT:
+            match &= Q(*[Q(**{f'{name}__icontains': word}) for name in SEARCH_FIELDS], _connector=Q.OR)
+    return match
+
+
+def search(queryset, words, limit=DEFAULT_LIMIT):
+    """
+    Rows of RESULT_FIELDS plus `rank` for the best `limit` matches in
+    `queryset`: full-text matches by rank, then fragment-only matches.
+    """
+    fragments = fragment_match(words)
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(tsquery(words), config='simple', search_type='raw')
+        match = Q(search_vector=query)
+        if fragments:
+            match |= fragments
+        queryset = queryset.filter(match).annotate(rank=SearchRank(F('search_vector'), query))
+        ordering = ['-rank', '-created_at', '-id']
+    else:
+        if not fragments:
+            return []
+        queryset = queryset.filter(fragments).annotate(rank=Value(0.0, output_field=FloatField()))
+        ordering = ['-created_at', '-id']
+    return list(queryset.order_by(*ordering).values(*RESULT_FIELDS, 'rank')[:limit])
@@ -0,0 +1,159 @@
+# sections.py
+"""
+One-to-one section tables of Inspection.
+
+The long-form parts of a report (owner details, facilities, business
+analysis, labour force, assets, godown, checklist, media) live in tables of
+their own keyed by the inspection id, so lists, counters, status updates and
+the other narrow queries read and write a short `inspections` row.
+
+Every section column is still an attribute of Inspection through a
+SectionAttribute, so Inspection(**fields), serializers and templates are
+unchanged. Reading one loads its section row on first use, or takes it from
+select_related(*section_accessors()); assigning a different value marks the
+field changed, and Inspection.save() writes only the changed columns of the
+changed sections. A section row is created the first time one of its fields
+is given a value. Assign new values rather than mutating lists or dicts in
+place, which no one would notice.
+
+Querysets need the section path in lookups (field_lookup()).
+
+An archived inspection (accounts.archive) has no section rows; its sections
+are unpacked from the archive on first use instead, and saving a change
+restores them.
+"""
+
+
+class SectionAttribute(property):
+    """Attribute of Inspection stored in the `section` table"""
+
+    def __init__(self, section, name):
+        self.section, self.name = section, name
+        super().__init__(self._get, self._set)
+
+    def _get(self, instance):
+        return getattr(section_of(instance, self.section), self.name)
+
+    def _set(self, instance, value):
+        row = section_of(instance, self.section)
+        if getattr(row, self.name) != value:
+            setattr(row, self.name, value)
+            changes = instance.__dict__.setdefault('_section_changes', {})
+            changes.setdefault(self.section, set()).add(self.name)
+
+
+def install(model, section_models):
+    """Expose the fields of `section_models` ({section: model}) as attributes of `model`"""
+    model.SECTION_MODELS = section_models
+    model.SECTION_FIELDS = {}
+    for section, section_model in section_models.items():
+        for field in section_model._meta.concrete_fields:
+            if field.name != 'inspection':
+                model.SECTION_FIELDS[field.name] = section
+                setattr(model, field.name, SectionAttribute(section, field.name))
+
+
+def accessor(section):
+    """Reverse one-to-one accessor of a section, e.g. inspection.owner_section"""
+    return f'{section}_section'
+
+
+def section_accessors(model=None, fields=None):
+    """Accessors for select_related(): of the sections holding `fields`, or of all of them"""
+    from .models import Inspection
+
+    model = model or Inspection
+    if fields is None:
+        return [accessor(section) for section in model.SECTION_MODELS]
+    return sorted({accessor(model.SECTION_FIELDS[name]) for name in fields if name in model.SECTION_FIELDS})
+
+
+def field_lookup(model, name):
+    """ORM path of field `name` from `model` (historical models have every field on the row)"""
+    section = getattr(model, 'SECTION_FIELDS', {}).get(name)
+    return f'{accessor(section)}__{name}' if section else name
+
+
+def section_of(instance, section):
+    """The section row of an inspection, a new unsaved one if it has none yet"""
+    loaded = instance.__dict__.setdefault('_sections', {})
+    if section not in loaded and getattr(instance, 'archived', False):
+        from .archive import archived_sections
+
+        for name, row in archived_sections(instance).items():
+            loaded.setdefault(name, row)
+    if section not in loaded:
+        section_model = instance.SECTION_MODELS[section]
+        row = None
+        if not instance._state.adding:
+            try:
+                row = getattr(instance, accessor(section))
+            except section_model.DoesNotExist:
+                pass
+        loaded[section] = row if row is not None else section_model(inspection=instance)
+    return loaded[section]
+
+
+def take_changes(instance, update_fields=None):
+    """
+    {section: changed fields} to write now: every change, or those named in
+    `update_fields` (the others stay pending, as Django leaves them unsaved).
+    """
+    pending = instance.__dict__.get('_section_changes', {})
+    taken = {}
+    for section, fields in list(pending.items()):
+        write = set(fields) if update_fields is None else fields & set(update_fields)
+        if write:
+            taken[section] = write
+            fields -= write
+            if not fields:
+                del pending[section]
+    return taken
+
+
+def forget(instance):
+    """Drop loaded section rows and pending changes (refresh_from_db)"""
+    for key in ('_sections', '_section_changes', '_archived_values'):
+        instance.__dict__.pop(key, None)
+
+
+def save_sections(instance, changes):
+    """Write `changes` from take_changes(): INSERT new section rows, UPDATE the changed columns of others"""
+    for section, fields in changes.items():
+        row = section_of(instance, section)
+        if row._state.adding:
+            row.inspection = instance
+            row.save(force_insert=True)
+        else:
+            row.save(update_fields=fields)
+
+
+def bulk_create_sections(instances, batch_size=1000):
+    """Section rows of freshly bulk_create()d inspections, one INSERT per section and batch"""
+    rows = {}
+    for instance in instances:
+        for section in take_changes(instance):
+            row = section_of(instance, section)
+            row.inspection = instance
+            rows.setdefault(section, []).append(row)
+    for section, section_rows in rows.items():
+        instances[0].SECTION_MODELS[section].objects.bulk_create(section_rows, batch_size=batch_size)
+
+
+def update_columns(instance, values):
+    """queryset.update() of already assigned `values` of one inspection, on whichever tables hold them"""
+    by_table = {}
+    for name, value in values.items():
+        by_table.setdefault(getattr(instance, 'SECTION_FIELDS', {}).get(name), {})[name] = value
+    for section, columns in by_table.items():
+        if section is None:
+            type(instance).objects.filter(pk=instance.pk).update(**columns)
+            continue
+        take_changes(instance, columns)
+        row = section_of(instance, section)
+        if row._state.adding:
+            row.inspection = instance
+            row.save(force_insert=True)
+        else:
+            type(row).objects.filter(pk=instance.pk).update(**columns)
+
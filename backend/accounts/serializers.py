@@ -1,7 +1,13 @@
 # serializers.py
 from rest_framework import serializers
-from .models import CustomUser, Inspection, NewInspection
+from django.conf import settings
+from .models import CustomUser, Inspection, NewInspection, UploadSession
 from django.contrib.auth.password_validation import validate_password
+from .images import variant_url, variants_by_sha
+from .clients import KEY_FIELDS
+from .media import MEDIA_FIELDS, check_inline_media, referenced_shas, with_urls
+from .sections import section_accessors
+from .tracks import parse_points
 
 # New Inspection Serializer
 class NewInspectionSerializer(serializers.ModelSerializer):
@@ -30,17 +36,151 @@ class NewInspectionSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("The assigned user must be an inspector.")
         return value
 
-class InspectionSerializer(serializers.ModelSerializer):
+class MediaRefsMixin:
+    """Media fields only hold blob references; add their download (and photo thumbnail) URLs on output"""
+
+    def validate(self, attrs):
+        # Inline base64 payloads are decoded on save; refuse those that cannot be here, not with a 500 there
+        attrs = super().validate(attrs)
+        errors = {}
+        for field in MEDIA_FIELDS:
+            if field in attrs:
+                try:
+                    check_inline_media(attrs[field])
+                except ValueError as e:
+                    errors[field] = [str(e)]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        request = self.context.get('request')
+        # Looked up for the whole page by MediaRefsListSerializer, else for this row
+        variants = getattr(self, 'page_variants', None)
+        if variants is None:
+            variants = variants_by_sha(referenced_shas(data.get('site_photos')))
+        for field in MEDIA_FIELDS:
+            if field in data:
+                data[field] = with_urls(data[field], request, variants)
+        return data
+
+class MediaRefsListSerializer(serializers.ListSerializer):
+    """Photo variants of every row on the page in one query, not one per row"""
+
+    def to_representation(self, data):
+        rows = list(data.all() if hasattr(data, 'all') else data)
+        if 'site_photos' in self.child.fields:
+            shas = [sha for row in rows for sha in referenced_shas(row.site_photos)]
+            self.child.page_variants = variants_by_sha(shas)
+        try:
+            return super().to_representation(rows)
+        finally:
+            self.child.page_variants = None
+
+class SectionFieldsMixin:
+    """The section-table columns of an inspection (accounts.sections), serialized as its own fields"""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for serializer_class in SECTION_SERIALIZERS:
+            for name, field in serializer_class().get_fields().items():
+                fields.setdefault(name, field)
+        return fields
+
+# Field builders for SectionFieldsMixin, one per section table
+SECTION_SERIALIZERS = [
+    type(f'{model.__name__}Serializer', (serializers.ModelSerializer,), {
+        'Meta': type('Meta', (), {'model': model, 'exclude': ('inspection',)}),
+    })
+    for model in Inspection.SECTION_MODELS.values()
+]
+
+class SparseFieldsetMixin:
+    """
+    Lets a caller pick the serialized fields:
+    `fields` keeps exactly those, `expand` adds to the serializer's `default_fields`
+    (None means every declared field is a default).
+    """
+    default_fields = None
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            keep = set(fields)
+        elif self.default_fields is not None:
+            keep = set(self.default_fields) | set(expand or ())
+        else:
+            return
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+class LocationPointsField(serializers.ListField):
+    """
+    A GPS track as a list of {latitude, longitude, timestamp, ...} points, stored
+    packed (accounts.tracks). Lossy by design: a point keeps its coordinates to
+    1e-7 degrees, its timestamp to the millisecond and the readings in
+    tracks.OPTIONAL_READINGS to hundredths; any other key is not stored.
+    """
+    child = serializers.DictField()
+
+    def to_internal_value(self, data):
+        points = super().to_internal_value(data)
+        try:
+            parse_points(points)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return points
+
+class InspectionSerializer(SparseFieldsetMixin, MediaRefsMixin, SectionFieldsMixin, serializers.ModelSerializer):
+    location_points = LocationPointsField(required=False)
     inspector_name = serializers.CharField(source='inspector.username', read_only=True)
-    inspector_id = serializers.IntegerField(source='inspector.id', read_only=True)
+    # The column itself: 'inspector.id' would load the user row
+    inspector_id = serializers.IntegerField(read_only=True)
     location_summary = serializers.SerializerMethodField()
     first_location = serializers.SerializerMethodField()
     last_location = serializers.SerializerMethodField()
+
+    # Model columns read by fields that are not columns themselves
+    column_sources = {
+        'inspector_name': ['inspector'],
+        'inspector_id': ['inspector'],
+        'location_summary': ['location_start_time', 'location_end_time', 'total_location_points'],
+        'location_points': [],
+        'first_location': [],
+        'last_location': [],
+    }
+    # Related rows read by fields, for QuerySet.select_related()
+    related_sources = {
+        'inspector_name': 'inspector',
+        'location_points': 'track',
+        'first_location': 'track',
+        'last_location': 'track',
+    }
     
     class Meta:
         model = Inspection
-        fields = '__all__'
-        read_only_fields = ('inspector', 'created_at', 'updated_at')
+        # search_vector is the database's own index document; archived a storage detail (accounts.archive)
+        exclude = ('search_vector', 'archived', *KEY_FIELDS)
+        list_serializer_class = MediaRefsListSerializer
+        read_only_fields = ('inspector', 'total_location_points', 'created_at', 'updated_at')
+
+    def model_columns(self):
+        """Columns the selected fields need, for QuerySet.only()"""
+        concrete = {f.name for f in Inspection._meta.concrete_fields}
+        columns = {'id'}
+        if section_accessors(fields=self.fields):
+            # Whether the sections are in their tables or in the archive
+            columns.add('archived')
+        for name in self.fields:
+            columns.update(c for c in self.column_sources.get(name, [name]) if c in concrete)
+        return columns
+
+    def related_objects(self):
+        """Relations the selected fields read (section tables included), for QuerySet.select_related()"""
+        related = {self.related_sources[name] for name in self.fields if name in self.related_sources}
+        return related | set(section_accessors(fields=self.fields))
     
     def get_location_summary(self, obj):
         return obj.get_location_summary()
@@ -51,10 +191,29 @@ class InspectionSerializer(serializers.ModelSerializer):
     def get_last_location(self, obj):
         return obj.get_last_location()
 
-class InspectionCreateSerializer(serializers.ModelSerializer):
+class InspectionListSerializer(InspectionSerializer):
+    """Compact row for list screens; other columns only via ?expand= or ?fields="""
+    photo_count = serializers.IntegerField(read_only=True)
+    thumbnail_url = serializers.SerializerMethodField()
+
+    default_fields = [
+        'id', 'inspector', 'inspector_id', 'inspector_name', 'branch_name',
+        'client_name', 'industry_name', 'phone_number', 'investment_category', 'legal_status',
+        'status', 'total_location_points', 'location_start_time', 'location_end_time',
+        'photo_count', 'thumbnail_url', 'created_at', 'updated_at',
+    ]
+
+    def get_thumbnail_url(self, obj):
+        path = getattr(obj, 'thumbnail_path', None)
+        return variant_url(path, self.context.get('request')) if path else None
+
+class InspectionCreateSerializer(MediaRefsMixin, SectionFieldsMixin, serializers.ModelSerializer):
+    location_points = LocationPointsField(required=False)
+
     class Meta:
         model = Inspection
-        exclude = ('inspector',)
+        exclude = ('inspector', 'search_vector', 'archived', *KEY_FIELDS)
+        read_only_fields = ('total_location_points',)
         
     def create(self, validated_data):
         # Automatically set the inspector from request user
@@ -85,4 +244,48 @@ class PasswordResetSerializer(serializers.Serializer):
 class PasswordResetConfirmSerializer(serializers.Serializer):
     uid = serializers.CharField()
     token = serializers.CharField()
-    new_password = serializers.CharField()
+    new_password = serializers.CharField()
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'kind', 'file_name', 'mime_type', 'total_size',
+            'received', 'status', 'attachment', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['id', 'received', 'status', 'attachment', 'created_at', 'updated_at']
+
+    def validate_total_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("File size must be positive.")
+        if value > settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"File is larger than {settings.UPLOAD_MAX_SIZE} bytes.")
+        return value
+
+class InspectionSearchResultSerializer(serializers.Serializer):
+    """A row of search.search(), rendered like the other inspection endpoints (local time)"""
+    id = serializers.IntegerField()
+    client_name = serializers.CharField()
+    owner_name = serializers.CharField()
+    group_name = serializers.CharField()
+    industry_name = serializers.CharField()
+    phone_number = serializers.CharField()
+    branch_name = serializers.CharField()
+    status = serializers.CharField()
+    inspector_id = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+    rank = serializers.FloatField()
+
+class DuplicateInspectionSerializer(serializers.Serializer):
+    """A row of clients.find_duplicates(), rendered like the other inspection endpoints (local time)"""
+    id = serializers.IntegerField()
+    client_name = serializers.CharField()
+    tin_number = serializers.CharField()
+    account_number = serializers.CharField()
+    phone_number = serializers.CharField()
+    branch_name = serializers.CharField()
+    status = serializers.CharField()
+    inspector_id = serializers.IntegerField()
+    created_at = serializers.DateTimeField()
+    matched = serializers.ListField(child=serializers.CharField())
+    score = serializers.IntegerField()
@@ -0,0 +1,153 @@
+# stats.py
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Inspection, InspectionStatusCounter
+
+# Inspection.status value -> key used in the dashboard responses
+STATUS_KEYS = {
+    'Pending': 'pending',
+    'In Progress': 'in_progress',
+    'Completed': 'completed',
+    'Approved': 'approved',
+    'Rejected': 'rejected',
+}
+
+# group_by parameter -> columns returned for each group
+GROUP_FIELDS = {
+    'branch': ['branch_name'],
+    'inspector': ['inspector', 'inspector__user_name'],
+}
+
+
+def day_start(day):
+    """Aware midnight (in TIME_ZONE) starting `day`; keeps created_at filters index-friendly"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def status_counts(inspector=None, branch_name=None, date_from=None, date_to=None, group_by=None):
+    """
+    Count inspections per status in one query.
+
+    Scope with `inspector` and/or `branch_name` (neither = all inspections) and
+    an inclusive created_at date range. Returns a dict with `total` and one key
+    per status, or with `group_by` ('branch' or 'inspector') a list of such dicts
+    that also carry the group columns.
+
+    Without a date range the answer comes from the status counter table, which
+    has a handful of rows per branch and inspector whatever the number of
+    inspections; a date range needs the inspections themselves.
+    """
+    queryset, aggregates, fields, from_counters = _status_query(inspector, branch_name, date_from, date_to, group_by)
+    if fields is None:
+        return queryset.aggregate(**aggregates)
+    return _groups(list(queryset.values(*fields).annotate(**aggregates).order_by(*fields)), from_counters)
+
+
+async def astatus_counts(inspector=None, branch_name=None, date_from=None, date_to=None, group_by=None):
+    """status_counts() for async views, on Django's async ORM"""
+    queryset, aggregates, fields, from_counters = _status_query(inspector, branch_name, date_from, date_to, group_by)
+    if fields is None:
+        return await queryset.aaggregate(**aggregates)
+    rows = [row async for row in queryset.values(*fields).annotate(**aggregates).order_by(*fields)]
+    return _groups(rows, from_counters)
+
+
+def _status_query(inspector, branch_name, date_from, date_to, group_by):
+    """(queryset, aggregates, group columns or None, whether it reads the counter table)"""
+    fields = GROUP_FIELDS[group_by] if group_by is not None else None
+    if date_from is None and date_to is None:
+        return (*_counter_query(inspector, branch_name), fields, True)
+
+    queryset = Inspection.objects.all()
+    if inspector is not None:
+        queryset = queryset.filter(inspector=inspector)
+    if branch_name is not None:
+        queryset = queryset.filter(branch_name=branch_name)
+    if date_from is not None:
+        queryset = queryset.filter(created_at__gte=day_start(date_from))
+    if date_to is not None:
+        queryset = queryset.filter(created_at__lt=day_start(date_to + timedelta(days=1)))
+
+    aggregates = {'total': Count('id')}
+    for value, key in STATUS_KEYS.items():
+        aggregates[key] = Count('id', filter=Q(status=value))
+    return queryset.order_by(), aggregates, fields, False
+
+
+def _counter_query(inspector, branch_name):
+    queryset = InspectionStatusCounter.objects.all()
+    if inspector is not None:
+        queryset = queryset.filter(inspector=inspector)
+    if branch_name is not None:
+        queryset = queryset.filter(branch_name=branch_name or '')
+
+    aggregates = {'total': Coalesce(Sum('count'), 0)}
+    for value, key in STATUS_KEYS.items():
+        aggregates[key] = Coalesce(Sum('count', filter=Q(status=value)), 0)
+    return queryset.order_by(), aggregates
+
+
+def _groups(rows, from_counters):
+    if not from_counters:
+        return rows
+    for row in rows:
+        # Counters store "no branch" as ''; report it as the inspections do
+        if 'branch_name' in row and row['branch_name'] == '':
+            row['branch_name'] = None
+    # Groups whose inspections were all deleted keep zeroed counter rows
+    return [row for row in rows if row['total']]
+
+
+def totals(groups):
+    """Overall counts summed from grouped rows, so a grouped response needs no second query"""
+    keys = ['total', *STATUS_KEYS.values()]
+    return {key: sum(row[key] for row in groups) for key in keys}
+
+
+def dashboard_stats(key_for_total='total', **scope):
+    """
+    Response body for the stats endpoints: counts for the scope and, when
+    grouped, a `groups` list. The admin dashboards call the total `all`.
+    """
+    return _dashboard_body(status_counts(**scope), key_for_total, scope.get('group_by'))
+
+
+async def adashboard_stats(key_for_total='total', **scope):
+    return _dashboard_body(await astatus_counts(**scope), key_for_total, scope.get('group_by'))
+
+
+def _dashboard_body(result, key_for_total, group_by):
+    if group_by is None:
+        data = dict(result)
+    else:
+        data = totals(result)
+        data['groups'] = result
+    data[key_for_total] = data.pop('total')
+    return data
+
+
+def parse_stats_params(params):
+    """
+    Read date_from, date_to (YYYY-MM-DD) and group_by from query parameters.
+    Raises ValueError with a message suitable for a 400 response.
+    """
+    options = {}
+    for name in ('date_from', 'date_to'):
+        value = params.get(name)
+        if value:
+            parsed = parse_date(value)
+            if parsed is None:
+                raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+            options[name] = parsed
+
+    group_by = params.get('group_by')
+    if group_by:
+        if group_by not in GROUP_FIELDS:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUP_FIELDS)}")
+        options['group_by'] = group_by
+    return options
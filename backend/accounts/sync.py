@@ -0,0 +1,108 @@
+# sync.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Inspection, NewInspection, SyncTombstone
+
+TOKEN_SALT = 'accounts.sync'
+
+
+class SyncTokenError(Exception):
+    """Raised for tokens that cannot be used; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def make_token(user, moment):
+    return signing.dumps({'u': user.pk, 't': moment.isoformat()}, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(user, token):
+    """Moment the token was issued to `user`"""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+        moment = parse_datetime(data['t'])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise SyncTokenError('Invalid sync token')
+    if moment is None or data.get('u') != user.pk:
+        raise SyncTokenError('Invalid sync token')
+    if moment < timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+        # Deletions that old may already be pruned
+        raise SyncTokenError('Sync token expired; sync again without a token', 410)
+    return moment
+
+
+def changes(user, token=None):
+    """
+    What changed in `user`'s assigned work since `token` was issued.
+
+    Returns (new_inspections, inspections, deleted, new_token): two querysets of
+    rows created or updated since then, ids removed from the user's scope per
+    model, and the token for the next call. Without a token everything in scope
+    is returned. Tokens overlap by SYNC_OVERLAP_SECONDS, so a row may come back
+    twice; clients upsert by id.
+    """
+    now = timezone.now()
+    new_inspections = NewInspection.objects.filter(assigned_inspector=user)
+    inspections = Inspection.objects.filter(inspector=user)
+    deleted = {SyncTombstone.MODEL_NEW_INSPECTION: set(), SyncTombstone.MODEL_INSPECTION: set()}
+
+    if token:
+        since = read_token(user, token) - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+        new_inspections = new_inspections.filter(updated_at__gte=since)
+        inspections = inspections.filter(updated_at__gte=since)
+        tombstones = SyncTombstone.objects.filter(inspector=user, created_at__gte=since)
+        for model, object_id in tombstones.values_list('model', 'object_id'):
+            deleted[model].add(object_id)
+
+    return new_inspections, inspections, deleted, make_token(user, now)
+
+
+def record_removal(model, object_id, inspector_id):
+    if inspector_id is not None:
+        SyncTombstone.objects.create(model=model, object_id=object_id, inspector_id=inspector_id)
+
+
+@receiver(pre_save, sender=NewInspection)
+def remember_previous_inspector(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._previous_inspector_id = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and not {'assigned_inspector', 'assigned_inspector_id'} & set(update_fields):
+        return
+    instance._previous_inspector_id = (
+        NewInspection.objects.filter(pk=instance.pk).values_list('assigned_inspector_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=NewInspection)
+def record_new_inspection_reassignment(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_inspector_id', None)
+    if previous is not None and previous != instance.assigned_inspector_id:
+        record_removal(SyncTombstone.MODEL_NEW_INSPECTION, instance.pk, previous)
+
+
+@receiver(post_save, sender=Inspection)
+def record_inspection_reassignment(sender, instance, created, raw=False, **kwargs):
+    # The counters' pre_save handler has already read the stored row
+    previous_key = getattr(instance, '_previous_counter_key', None)
+    if previous_key is not None and previous_key[1] != instance.inspector_id:
+        record_removal(SyncTombstone.MODEL_INSPECTION, instance.pk, previous_key[1])
+
+
+@receiver(post_delete, sender=NewInspection)
+def record_new_inspection_delete(sender, instance, **kwargs):
+    record_removal(SyncTombstone.MODEL_NEW_INSPECTION, instance.pk, instance.assigned_inspector_id)
+
+
+@receiver(post_delete, sender=Inspection)
+def record_inspection_delete(sender, instance, **kwargs):
+    record_removal(SyncTombstone.MODEL_INSPECTION, instance.pk, instance.inspector_id)
@@ -1,3 +1,1837 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
 
-# Create your tests here.
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.management import call_command
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .amounts import backfill as backfill_amounts, parse_amount
+from .archive import archive
+from .bulk import export_rows, import_inspections
+from .clients import KEY_FIELDS, backfill as backfill_client_keys, name_key, phone_key
+from .counters import rebuild as rebuild_status_counters
+from .geo import cover_ranges, point_cell
+from .jobs import TASKS, claim, enqueue, execute, run_worker
+from .pagination import KeysetPagination
+from .models import (
+    CustomUser, ImageVariant, Inspection, InspectionArchive, InspectionAssetSection, InspectionAttachment,
+    InspectionDailyRollup, InspectionLocation, InspectionOwnerSection, InspectionStatusCounter, Job, LocationTrack,
+    MediaBlob, NewInspection, RollupPendingDay, UploadSession,
+)
+from .rollups import refresh as refresh_rollups, schedule_refresh
+from .search import parse_search_params, tsquery
+from .serializers import InspectionListSerializer, InspectionSerializer
+from .sections import section_accessors
+from .polyline import DEFAULT_ZOOM, MAX_POINTS, PRECOMPUTED_ZOOMS, decode_polyline, encode_polyline
+from .sync import make_token
+from .throttling import TokenBucket
+
+
+def make_user(email, role='inspector', branch_name='Dhaka'):
+    return CustomUser.objects.create(
+        user_name=email.split('@')[0], email=email, role=role, branch_name=branch_name
+    )
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class MediaTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_undecodable_payload_is_refused(self):
+        response = self.client.post('/api/inspections/', {
+            'client_name': 'Rahim Textiles', 'site_photos': [{'name': 'x.jpg', 'base64_data': 'abc'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('site_photos', response.data)
+        self.assertFalse(Inspection.objects.exists())
+
+        # Saved from elsewhere (admin, shell) the entry stays inline rather than failing the save
+        with self.assertLogs('accounts.media', 'WARNING'):
+            inspection = Inspection.objects.create(
+                inspector=self.inspector, site_photos=[{'name': 'x.jpg', 'base64_data': 'abc'}],
+            )
+        self.assertEqual(inspection.site_photos, [{'name': 'x.jpg', 'base64_data': 'abc'}])
+        self.assertFalse(MediaBlob.objects.exists())
+
+    def test_inline_payloads_are_stored_once(self):
+        photo = base64.b64encode(b'\xff\xd8 shop front').decode()
+        response = self.client.post('/api/inspections/', {
+            'client_name': 'Rahim Textiles',
+            'site_photos': [{'name': 'front.jpg', 'base64_data': photo}, {'name': 'copy.jpg', 'base64_data': photo}],
+            'site_video': {'name': 'walk', 'base64_data': 'data:video/mp4;base64,' + base64.b64encode(b'walk').decode()},
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        inspection = Inspection.objects.get()
+        photos, video = inspection.site_photos, inspection.site_video
+        self.assertEqual([p['name'] for p in photos], ['front.jpg', 'copy.jpg'])
+        self.assertFalse(any('base64_data' in entry for entry in [*photos, video]))
+        # Same bytes, one blob; still one attachment per entry
+        self.assertEqual(photos[0]['sha256'], photos[1]['sha256'])
+        self.assertNotEqual(photos[0]['id'], photos[1]['id'])
+        self.assertEqual((photos[0]['mime_type'], video['mime_type']), ('image/jpeg', 'video/mp4'))
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        self.assertEqual(InspectionAttachment.objects.filter(inspection=inspection).count(), 3)
+        with default_storage.open(MediaBlob.objects.get(sha256=photos[0]['sha256']).file.name) as fh:
+            self.assertEqual(fh.read(), b'\xff\xd8 shop front')
+
+        # Another report with the same photo reuses the blob
+        Inspection.objects.create(inspector=self.inspector, site_photos=[{'name': 'again.jpg', 'base64_data': photo}])
+        self.assertEqual(MediaBlob.objects.count(), 2)
+        # Dropping a reference drops its attachment, not the shared blob
+        inspection.site_photos = photos[:1]
+        inspection.save()
+        self.assertEqual(
+            set(InspectionAttachment.objects.filter(inspection=inspection).values_list('kind', flat=True)),
+            {InspectionAttachment.KIND_PHOTO, InspectionAttachment.KIND_VIDEO},
+        )
+        self.assertEqual(InspectionAttachment.objects.filter(inspection=inspection).count(), 2)
+        self.assertEqual(MediaBlob.objects.count(), 2)
+
+    def test_files_are_served_to_allowed_users_only(self):
+        payload = base64.b64encode(b'%PDF-1.4 trade licence').decode()
+        inspection = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', uploaded_documents=[
+            {'name': 'licence.pdf', 'base64_data': payload},
+        ])
+        url = self.client.get(f'/api/inspections/{inspection.id}/').data['uploaded_documents'][0]['url']
+        path = url.replace('http://testserver', '')
+        self.assertTrue(path.startswith('/api/media/blobs/'))
+
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4 trade licence')
+
+        branch_admin = make_user('branch@example.com', role='branch_admin')
+        other_branch = make_user('other@example.com', role='branch_admin', branch_name='Sylhet')
+        for user, expected in ((branch_admin, 200), (other_branch, 404), (make_user('x@example.com'), 404)):
+            client = APIClient()
+            client.force_authenticate(user)
+            self.assertEqual(client.get(path).status_code, expected, user.email)
+        self.assertEqual(APIClient().get(path).status_code, 401)
+        # Nothing but blob and variant paths, e.g. no upload parts or traversal
+        self.assertEqual(self.client.get('/api/media/uploads/1/part').status_code, 404)
+        self.assertEqual(self.client.get('/api/media/blobs/../../settings.py').status_code, 404)
+
+        with override_settings(MEDIA_ACCEL_REDIRECT='/protected-media/'):
+            response = self.client.get(path)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + path[len('/api/media/'):])
+
+
+class DataMigrationTests(TransactionTestCase):
+    """Data migrations, run forwards and backwards on historical models"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.addCleanup(self.migrate, None)
+
+    def migrate(self, name):
+        """Migrate accounts to `name` (None: the latest) and return the apps of that state"""
+        executor = MigrationExecutor(connection)
+        targets = [('accounts', name)] if name else executor.loader.graph.leaf_nodes()
+        executor.migrate(targets)
+        return MigrationExecutor(connection).loader.project_state(targets).apps
+
+    def test_inline_media_extract_and_restore(self):
+        apps = self.migrate('0005_media_blobs')
+        inspector = apps.get_model('accounts', 'CustomUser').objects.create(email='inspector@example.com')
+        photo = base64.b64encode(b'\xff\xd8 shop front').decode()
+        site_photos = [
+            {'name': 'front.jpg', 'base64_data': photo},
+            {'name': 'copy.jpg', 'base64_data': photo},
+            {'name': 'broken.jpg', 'base64_data': 'abc'},
+        ]
+        site_video = {'name': 'walk.mp4', 'base64_data': base64.b64encode(b'walk').decode()}
+        pk = apps.get_model('accounts', 'Inspection').objects.create(
+            inspector=inspector, site_photos=site_photos, site_video=site_video, uploaded_documents=[],
+        ).pk
+
+        apps = self.migrate('0006_extract_inline_media')
+        inspection = apps.get_model('accounts', 'Inspection').objects.get(pk=pk)
+        front, copy, broken = inspection.site_photos
+        self.assertEqual(front['sha256'], copy['sha256'])
+        self.assertNotIn('base64_data', front)
+        # Undecodable payloads are left as they were
+        self.assertEqual(broken, site_photos[2])
+        self.assertEqual((inspection.site_video['name'], inspection.site_video['mime_type']), ('walk.mp4', 'video/mp4'))
+        self.assertEqual(apps.get_model('accounts', 'MediaBlob').objects.count(), 2)
+        self.assertEqual(apps.get_model('accounts', 'InspectionAttachment').objects.count(), 3)
+
+        apps = self.migrate('0005_media_blobs')
+        inspection = apps.get_model('accounts', 'Inspection').objects.get(pk=pk)
+        self.assertEqual(inspection.site_photos, site_photos)
+        self.assertEqual(inspection.site_video, site_video)
+
+
+    def test_tracks_are_packed_with_losses_logged(self):
+        apps = self.migrate('0010_sync_tombstones')
+        inspector = apps.get_model('accounts', 'CustomUser').objects.create(email='inspector@example.com')
+        pk = apps.get_model('accounts', 'Inspection').objects.create(inspector=inspector, location_points=[
+            {'latitude': 23.7925, 'longitude': 90.4078, 'timestamp': '2026-01-01T04:00:00.000Z', 'speed': 1.5,
+             'provider': 'gps'},
+            {'longitude': 90.4078},
+            {'latitude': 23.7940, 'longitude': 90.4150, 'timestamp': None},
+        ]).pk
+
+        with self.assertLogs('accounts.migrations.0011_location_tracks', 'WARNING') as logs:
+            apps = self.migrate('0011_location_tracks')
+        self.assertIn(f'inspection {pk}: skipped unusable track points 1 (latitude and longitude are required)', logs.output[0])
+        self.assertIn(f'inspection {pk}: dropped track point keys provider', logs.output[1])
+        track = apps.get_model('accounts', 'LocationTrack').objects.get(inspection_id=pk)
+        self.assertEqual(track.point_count, 2)
+
+        apps = self.migrate('0010_sync_tombstones')
+        self.assertEqual(apps.get_model('accounts', 'Inspection').objects.get(pk=pk).location_points, [
+            {'latitude': 23.7925, 'longitude': 90.4078, 'timestamp': '2026-01-01T04:00:00.000Z', 'speed': 1.5},
+            {'latitude': 23.794, 'longitude': 90.415, 'timestamp': None},
+        ])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class UploadTests(TestCase):
+
+    def setUp(self):
+        self.media_root, self.upload_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+        for path in (self.media_root, self.upload_dir):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        dirs = override_settings(MEDIA_ROOT=self.media_root, UPLOAD_SESSION_DIR=self.upload_dir)
+        dirs.enable()
+        self.addCleanup(dirs.disable)
+        self.inspector = make_user('inspector@example.com')
+        self.inspection = Inspection.objects.create(inspector=self.inspector)
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def open(self, total_size):
+        return self.client.post('/api/uploads/', {
+            'kind': 'document', 'file_name': 'licence.pdf', 'mime_type': 'application/pdf', 'total_size': total_size,
+        }, format='json')
+
+    def put(self, session_id, data, start=None, total=None, **params):
+        headers = {}
+        if start is not None:
+            headers['HTTP_CONTENT_RANGE'] = f'bytes {start}-{start + len(data) - 1}/{total}'
+        query = f"?offset={params['offset']}" if 'offset' in params else ''
+        return self.client.put(
+            f'/api/uploads/{session_id}/{query}', data, content_type='application/octet-stream', **headers
+        )
+
+    def complete(self, session_id, **data):
+        return self.client.post(f'/api/uploads/{session_id}/complete/', {
+            'inspection': self.inspection.id, **data,
+        }, format='json')
+
+    def test_chunks_resume_and_complete(self):
+        content = b'%PDF-1.4 ' + bytes(range(256)) * 4
+        session_id = self.open(len(content)).data['id']
+
+        self.assertEqual(self.put(session_id, content[:400], 0, len(content)).data['received'], 400)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').data['received'], 400)
+        # A retry overlapping what was stored only appends the new bytes
+        self.assertEqual(self.put(session_id, content[300:700], 300, len(content)).data['received'], 700)
+        self.assertEqual(self.put(session_id, content[700:], offset=700).data['received'], len(content))
+        # Part files are kept apart from the media being served
+        part = os.path.join(self.upload_dir, f'{session_id}.part')
+        with open(part, 'rb') as fh:
+            self.assertEqual(fh.read(), content)
+
+        response = self.complete(session_id, sha256=hashlib.sha256(content).hexdigest())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'complete')
+        self.assertFalse(os.path.exists(part))
+        self.inspection.refresh_from_db()
+        ref = self.inspection.uploaded_documents[-1]
+        self.assertEqual((ref['name'], ref['size']), ('licence.pdf', len(content)))
+        with default_storage.open(MediaBlob.objects.get(sha256=ref['sha256']).file.name) as fh:
+            self.assertEqual(fh.read(), content)
+
+        self.assertEqual(self.put(session_id, b'x', offset=len(content)).status_code, 409)
+        self.assertEqual(self.complete(session_id).status_code, 409)
+
+    def test_sessions_completing_together_keep_both_references(self):
+        contents = [b'%PDF-1.4 first', b'%PDF-1.4 second']
+        session_ids = []
+        for content in contents:
+            session_ids.append(self.open(len(content)).data['id'])
+            self.put(session_ids[-1], content, offset=0)
+
+        locked = []
+        select_for_update = QuerySet.select_for_update
+
+        def record(queryset, *args, **kwargs):
+            locked.append(queryset.model)
+            return select_for_update(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True, side_effect=record):
+            for session_id in session_ids:
+                self.assertEqual(self.complete(session_id).status_code, 200)
+        # The session, then the inspection whose media field is appended to
+        self.assertEqual(locked, [UploadSession, Inspection] * 2)
+
+        self.inspection.refresh_from_db()
+        self.assertEqual([ref['size'] for ref in self.inspection.uploaded_documents], [len(c) for c in contents])
+        self.assertEqual(InspectionAttachment.objects.filter(inspection=self.inspection).count(), 2)
+
+    def test_rejected_chunks(self):
+        self.assertEqual(self.open(settings.UPLOAD_MAX_SIZE + 1).status_code, 400)
+        self.assertEqual(self.open(0).status_code, 400)
+
+        session_id = self.open(10).data['id']
+        response = self.put(session_id, b'56789', 5, 10)
+        self.assertEqual((response.status_code, response.data['offset']), (409, 0))
+        self.assertEqual(self.put(session_id, b'01234', 0, 11).status_code, 400)
+        self.assertEqual(self.put(session_id, b'0123456789ab', offset=0).status_code, 400)
+        self.assertEqual(self.put(session_id, b'01234', offset=0).data['received'], 5)
+        self.assertEqual(self.complete(session_id).status_code, 409)
+
+        self.put(session_id, b'56789', 5, 10)
+        response = self.complete(session_id, sha256='0' * 64)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.client.get(f'/api/uploads/{session_id}/').data['status'], 'open')
+        self.assertFalse(InspectionAttachment.objects.exists())
+
+        # Other users see neither the session nor the inspection
+        other = APIClient()
+        other.force_authenticate(make_user('other@example.com'))
+        self.assertEqual(other.get(f'/api/uploads/{session_id}/').status_code, 404)
+        self.assertEqual(self.complete(session_id, sha256=hashlib.sha256(b'0123456789').hexdigest()).status_code, 200)
+        other_session = other.post('/api/uploads/', {
+            'kind': 'document', 'file_name': 'x.pdf', 'total_size': 1,
+        }, format='json').data['id']
+        other.put(f'/api/uploads/{other_session}/', b'x', content_type='application/octet-stream')
+        response = other.post(f'/api/uploads/{other_session}/complete/', {'inspection': self.inspection.id}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SparseFieldsetTests(TestCase):
+
+    def setUp(self):
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def add(self, count):
+        for n in range(count):
+            Inspection.objects.create(
+                inspector=self.inspector, client_name=f'Rahim Textiles {n}', father_name='Karim',
+                location_points=[{'latitude': 23.79, 'longitude': 90.41}],
+            )
+
+    def keys(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        rows = response.data['results'] if 'results' in response.data else [response.data]
+        return {frozenset(row) for row in rows}
+
+    def test_fields_and_expand(self):
+        self.add(2)
+        inspection_id = Inspection.objects.first().id
+        default = set(InspectionListSerializer.default_fields)
+        self.assertEqual(self.keys('/api/inspections/'), {frozenset(default)})
+        self.assertEqual(self.keys('/api/inspections/?expand=father_name,first_location'),
+                         {frozenset(default | {'father_name', 'first_location'})})
+        self.assertEqual(self.keys('/api/inspections/?fields=id,status'), {frozenset({'id', 'status'})})
+        self.assertEqual(self.keys(f'/api/inspections/{inspection_id}/?fields=id,inspector_name,father_name'),
+                         {frozenset({'id', 'inspector_name', 'father_name'})})
+        # Without a selection retrieve returns the whole report
+        self.assertEqual(self.keys(f'/api/inspections/{inspection_id}/'), {frozenset(InspectionSerializer().fields)})
+        # Unknown names select nothing and are not an error
+        self.assertEqual(self.keys('/api/inspections/?fields=id,nonsense'), {frozenset({'id'})})
+        self.assertEqual(self.keys('/api/inspections/?expand=nonsense'), {frozenset(default)})
+
+    def test_columns_and_relations_follow_the_selection(self):
+        serializer = InspectionSerializer(fields=['id', 'status'])
+        self.assertEqual(serializer.model_columns(), {'id', 'status'})
+        self.assertEqual(serializer.related_objects(), set())
+
+        serializer = InspectionSerializer(fields=['inspector_name', 'location_summary', 'first_location', 'father_name'])
+        self.assertEqual(serializer.model_columns(), {
+            'id', 'inspector', 'archived', 'location_start_time', 'location_end_time', 'total_location_points',
+        })
+        self.assertEqual(serializer.related_objects(), {'inspector', 'track', *section_accessors(fields=['father_name'])})
+
+        self.add(1)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/inspections/?fields=id,status')
+        select = next(q['sql'] for q in queries if 'LIMIT' in q['sql'])
+        self.assertNotIn('client_name', select)
+        self.assertNotIn('JOIN', select)
+
+    def test_no_queries_per_row(self):
+        url = '/api/inspections/?fields=id,inspector_name,first_location,father_name,photo_count'
+        self.add(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        # The ETag aggregate, then one SELECT joining the user, the track and the section
+        self.assertEqual(len(few), 2)
+        self.add(8)
+        with self.assertNumQueries(len(few)):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['first_location']['latitude'], 23.79)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+        for n in range(7):
+            Inspection.objects.create(inspector=self.inspector, client_name=f'Client {n}')
+        # Five rows share one created_at, so only the id orders them
+        now = timezone.now()
+        ids = list(Inspection.objects.order_by('id').values_list('id', flat=True))
+        Inspection.objects.filter(id__in=ids[:5]).update(created_at=now)
+        Inspection.objects.filter(id__in=ids[5:]).update(created_at=now - timedelta(days=1))
+        self.expected = sorted(ids[:5], reverse=True) + sorted(ids[5:], reverse=True)
+
+    def page(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.data
+
+    def test_walk_forwards_and_back(self):
+        pages, url = [], '/api/inspections/?fields=id&page_size=2'
+        while url:
+            data = self.page(url)
+            pages.append([row['id'] for row in data['results']])
+            url = data['next']
+        self.assertEqual(pages, [self.expected[i:i + 2] for i in range(0, 7, 2)])
+        self.assertIsNone(self.page('/api/inspections/?fields=id&page_size=2')['previous'])
+
+        # Back from the last page: the same pages, newest last
+        back, url = [], data['previous']
+        while url:
+            data = self.page(url)
+            back.append([row['id'] for row in data['results']])
+            url = data['previous']
+        self.assertEqual(back, pages[-2::-1])
+        self.assertIsNotNone(data['next'])
+
+    def test_page_size(self):
+        self.assertEqual(len(self.page('/api/inspections/?page_size=3')['results']), 3)
+        with mock.patch.object(KeysetPagination, 'max_page_size', 4):
+            self.assertEqual(len(self.page('/api/inspections/?page_size=1000')['results']), 4)
+        self.assertEqual(len(self.page('/api/inspections/?page_size=0')['results']), 1)
+        # Not a number: the default size, which holds them all
+        self.assertEqual(len(self.page('/api/inspections/?page_size=abc')['results']), 7)
+
+    def test_invalid_cursor(self):
+        def token(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+        for cursor in (
+            'not-a-cursor!', token('[1, 2]'), token('{"c": "yesterday", "i": 1}'),
+            token('{"c": "2026-01-01T00:00:00", "i": 1}'), token('{"c": "2026-01-01T00:00:00+06:00", "i": "x"}'),
+            token('{"i": 1}'),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(f'/api/inspections/?cursor={cursor}').status_code, 404)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class QueryIndexTests(TestCase):
+    """Every hot endpoint query must be answered from an index, never a full table scan"""
+
+    tables = (
+        'inspections', 'accounts_newinspection', 'accounts_customuser', 'inspection_status_counters',
+        'sync_tombstones',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin@example.com', role='admin', branch_name=None)
+        cls.branch_admin = make_user('branch@example.com', role='branch_admin')
+        cls.inspector = make_user('inspector@example.com')
+        other = make_user('other@example.com', branch_name='Khulna')
+        for user in (cls.inspector, other):
+            for status in ('Pending', 'Approved', 'Rejected'):
+                Inspection.objects.create(inspector=user, branch_name=user.branch_name, status=status)
+            NewInspection.objects.create(
+                project='P', client_name='C', industry_name='I', phone_number='1',
+                assigned_inspector=user, branch_name=user.branch_name,
+            )
+
+    def setUp(self):
+        # Cached responses would hide the queries under test
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                # Tiny test tables would otherwise always be read sequentially
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+            else:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+
+    def assert_index_scans(self, user, url, allow_full_scan=()):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(f'"{t}"' in sql for t in self.tables):
+                continue
+            plan = self.explain(sql)
+            checked += 1
+            for table in set(self.tables) - set(allow_full_scan):
+                if connection.vendor == 'postgresql':
+                    full_scan = rf'\bSeq Scan on {table}\b'
+                else:
+                    full_scan = rf'\bSCAN {table}$'
+                self.assertIsNone(re.search(full_scan, plan, re.MULTILINE), f"{url}\n{sql}\n{plan}")
+        self.assertTrue(checked, f"no queries captured for {url}")
+
+    def test_inspector_endpoints(self):
+        self.assert_index_scans(self.inspector, '/api/inspections/')
+        self.assert_index_scans(self.inspector, '/api/inspections/stats/')
+        self.assert_index_scans(self.inspector, '/api/inspections/by_status/?status=Pending')
+        self.assert_index_scans(self.inspector, '/api/new-inspections/list/')
+        self.assert_index_scans(self.inspector, '/api/new-inspections/list/?status=pending')
+        token = make_token(self.inspector, timezone.now())
+        self.assert_index_scans(self.inspector, f'/api/sync/?token={token}')
+
+    def test_branch_admin_endpoints(self):
+        self.assert_index_scans(self.branch_admin, '/api/branch/inspection-stats/?branch_name=Dhaka')
+        self.assert_index_scans(self.branch_admin, '/api/new-inspections/list/')
+        self.assert_index_scans(self.branch_admin, '/api/inspector/list/')
+
+    def test_admin_endpoints(self):
+        # All-branch totals read the whole (small) counter table by design
+        self.assert_index_scans(self.admin, '/api/inspection/stats/', allow_full_scan=['inspection_status_counters'])
+        self.assert_index_scans(self.admin, '/api/branch-admin/list/')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class StatusStatsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inspector = make_user('inspector@example.com')
+        other = make_user('other@example.com', branch_name='Khulna')
+        for status in ('Pending', 'Pending', 'Approved', 'In Progress'):
+            Inspection.objects.create(inspector=cls.inspector, branch_name='Dhaka', status=status)
+        Inspection.objects.create(inspector=other, branch_name='Khulna', status='Rejected')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_inspector_stats_single_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/inspections/stats/')
+        self.assertEqual(response.data, {
+            'total': 4, 'pending': 2, 'in_progress': 1, 'completed': 0, 'approved': 1, 'rejected': 0,
+        })
+
+    def test_branch_stats_grouped_by_inspector(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/branch/inspection-stats/?branch_name=Dhaka&group_by=inspector')
+        self.assertEqual(response.data['all'], 4)
+        self.assertEqual([g['inspector'] for g in response.data['groups']], [self.inspector.id])
+
+    def test_global_stats_and_bad_date(self):
+        response = self.client.get('/api/inspection/stats/?group_by=branch')
+        self.assertEqual(response.json()['all'], 5)
+        self.assertEqual(len(response.json()['groups']), 2)
+        response = self.client.get('/api/inspection/stats/?date_from=yesterday')
+        self.assertEqual(response.status_code, 400)
+
+
+class StatusCounterTests(TestCase):
+
+    def setUp(self):
+        self.inspector = make_user('inspector@example.com')
+
+    def counters(self):
+        return {
+            (c.branch_name, c.inspector_id, c.status): c.count
+            for c in InspectionStatusCounter.objects.all() if c.count
+        }
+
+    def test_counters_follow_create_update_delete(self):
+        first = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka')
+        second = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka')
+        self.assertEqual(self.counters(), {('Dhaka', self.inspector.id, 'Pending'): 2})
+
+        first.status = 'Approved'
+        first.save()
+        second.branch_name = None
+        second.save(update_fields=['branch_name', 'updated_at'])
+        self.assertEqual(self.counters(), {
+            ('Dhaka', self.inspector.id, 'Approved'): 1,
+            ('', self.inspector.id, 'Pending'): 1,
+        })
+
+        # Saves that do not touch counted fields leave the counters alone
+        first.client_name = 'Renamed'
+        first.save(update_fields=['client_name'])
+        second.delete()
+        self.assertEqual(self.counters(), {('Dhaka', self.inspector.id, 'Approved'): 1})
+
+        expected = self.counters()
+        rebuild_status_counters()
+        self.assertEqual(self.counters(), expected)
+
+    def test_rebuild_repairs_bulk_writes(self):
+        Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka')
+        Inspection.objects.update(status='Rejected')
+        rebuild_status_counters()
+        self.assertEqual(self.counters(), {('Dhaka', self.inspector.id, 'Rejected'): 1})
+
+    def test_deleting_inspector_cascades(self):
+        Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka')
+        self.inspector.delete()
+        self.assertFalse(InspectionStatusCounter.objects.exists())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ResponseCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin@example.com', role='admin', branch_name=None)
+        cls.inspector = make_user('inspector@example.com')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, url, user=None):
+        if user is not None:
+            self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response
+
+    def test_repeat_reads_are_served_from_cache(self):
+        url = '/api/branch/inspection-stats/?branch_name=Dhaka'
+        self.assertEqual(self.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get(url)['X-Cache'], 'HIT')
+        # Different query string, different entry
+        self.assertEqual(self.get(url + '&group_by=inspector')['X-Cache'], 'MISS')
+        stats = self.get('/api/cache/stats/').data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_inspection_writes_invalidate_stats(self):
+        self.assertEqual(self.get('/api/inspection/stats/').json()['all'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            inspection = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka')
+        self.assertEqual(self.get('/api/inspection/stats/').json()['all'], 1)
+
+        url = '/api/branch/inspection-stats/?branch_name=Dhaka'
+        self.assertEqual(self.get(url).data['pending'], 1)
+        inspection.status = 'Approved'
+        inspection.save()
+        self.assertEqual(self.get(url).data['approved'], 1)
+        inspection.delete()
+        self.assertEqual(self.get(url).data['all'], 0)
+        self.assertEqual(self.get('/api/inspections/inspector_wise/').data, [])
+
+    def test_user_writes_invalidate_lists(self):
+        branch_admin = make_user('branch@example.com', role='branch_admin')
+        self.assertEqual(len(self.get('/api/branch-admin/list/').data), 1)
+        self.assertEqual(len(self.get('/api/inspector/list/', branch_admin).data), 1)
+
+        make_user('second@example.com', role='branch_admin')
+        make_user('new@example.com')
+        self.assertEqual(len(self.get('/api/inspector/list/', self.admin).data), 0)
+        self.assertEqual(len(self.get('/api/inspector/list/', branch_admin).data), 2)
+        self.assertEqual(len(self.get('/api/branch-admin/list/', self.admin).data), 2)
+
+    def test_scope_separates_branches(self):
+        make_user('khulna@example.com', branch_name='Khulna')
+        dhaka = make_user('dhaka-admin@example.com', role='branch_admin')
+        khulna = make_user('khulna-admin@example.com', role='branch_admin', branch_name='Khulna')
+        self.assertEqual(self.get('/api/inspector/list/', dhaka).data[0]['email'], 'inspector@example.com')
+        self.assertEqual(self.get('/api/inspector/list/', khulna).data[0]['email'], 'khulna@example.com')
+
+    def test_cache_stats_admin_only(self):
+        self.client.force_authenticate(self.inspector)
+        self.assertEqual(self.client.get('/api/cache/stats/').status_code, 403)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inspector = make_user('inspector@example.com')
+        cls.inspection = Inspection.objects.create(inspector=cls.inspector, branch_name='Dhaka')
+        NewInspection.objects.create(
+            project='P', client_name='C', industry_name='I', phone_number='1',
+            assigned_inspector=cls.inspector, branch_name='Dhaka',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def assert_revalidates(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200, url)
+        self.assertIn('Last-Modified' if 'stats' not in url else 'ETag', first)
+        etag = first['ETag']
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304, url)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200, url)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_inspection_list_and_detail(self):
+        def update():
+            self.inspection.client_name = 'Renamed'
+            self.inspection.save()
+
+        self.assert_revalidates('/api/inspections/', update)
+        self.assert_revalidates(f'/api/inspections/{self.inspection.id}/', update)
+
+        def delete():
+            Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka').delete()
+            self.inspection.delete()
+
+        self.assert_revalidates('/api/inspections/?fields=id,status', delete)
+
+    def test_new_inspection_list(self):
+        def complete():
+            assignment = NewInspection.objects.get()
+            assignment.status = 'completed'
+            assignment.save()
+
+        self.assert_revalidates('/api/new-inspections/list/', complete)
+
+    def test_renamed_inspector(self):
+        def rename():
+            # The names come from the users table; the inspection rows do not change
+            user = CustomUser.objects.get(pk=self.inspector.pk)
+            user.user_name = f'{user.user_name} Renamed'
+            user.save()
+
+        self.assert_revalidates('/api/new-inspections/list/', rename)
+        self.assert_revalidates('/api/inspections/', rename)
+        self.assert_revalidates(f'/api/inspections/{self.inspection.id}/', rename)
+        detail = self.client.get(f'/api/inspections/{self.inspection.id}/').data
+        self.assertEqual(detail['inspector_name'], CustomUser.objects.get(pk=self.inspector.pk).username)
+
+    def test_stats(self):
+        def approve():
+            self.inspection.status = 'Approved'
+            self.inspection.save()
+
+        self.assert_revalidates('/api/inspections/stats/', approve)
+        self.assert_revalidates('/api/inspection/stats/', lambda: self.inspection.delete())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], SYNC_OVERLAP_SECONDS=0)
+class SyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inspector = make_user('inspector@example.com')
+        cls.other = make_user('other@example.com')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def assign(self, inspector):
+        return NewInspection.objects.create(
+            project='P', client_name='C', industry_name='I', phone_number='1',
+            assigned_inspector=inspector, branch_name='Dhaka',
+        )
+
+    def sync(self, token=None):
+        response = self.client.get('/api/sync/', {'token': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_only_changes_since_token(self):
+        kept = self.assign(self.inspector)
+        moved = self.assign(self.inspector)
+        deleted = self.assign(self.inspector)
+        self.assign(self.other)
+        inspection = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka')
+
+        data = self.sync()
+        self.assertEqual({r['id'] for r in data['new_inspections']}, {kept.id, moved.id, deleted.id})
+        self.assertEqual([r['id'] for r in data['inspections']], [inspection.id])
+
+        data = self.sync(data['token'])
+        self.assertEqual((data['new_inspections'], data['inspections']), ([], []))
+
+        kept.status = 'in_progress'
+        kept.save()
+        moved.assigned_inspector = self.other
+        moved.save()
+        deleted_id, inspection_id = deleted.id, inspection.id
+        deleted.delete()
+        inspection.delete()
+        data = self.sync(data['token'])
+        self.assertEqual([r['id'] for r in data['new_inspections']], [kept.id])
+        self.assertEqual(data['deleted'], {
+            'new_inspections': sorted([moved.id, deleted_id]), 'inspections': [inspection_id],
+        })
+
+        # Reassigned back: an upsert, not a deletion
+        token = data['token']
+        moved.assigned_inspector = self.inspector
+        moved.save()
+        data = self.sync(token)
+        self.assertEqual([r['id'] for r in data['new_inspections']], [moved.id])
+        self.assertEqual(data['deleted']['new_inspections'], [])
+
+    def test_token_checks(self):
+        token = self.sync()['token']
+        self.assertEqual(self.client.get('/api/sync/', {'token': token + 'x'}).status_code, 400)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get('/api/sync/', {'token': token}).status_code, 400)
+        with override_settings(SYNC_TOMBSTONE_DAYS=-1):
+            self.assertEqual(self.client.get('/api/sync/', {'token': self.sync()['token']}).status_code, 410)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class LocationTrackTests(TestCase):
+
+    points = [
+        {'latitude': 23.8103, 'longitude': 90.4125, 'accuracy': 12.5, 'speed': None,
+         'timestamp': '2024-05-01T04:00:00.000Z'},
+        {'latitude': 23.8109, 'longitude': 90.4131, 'accuracy': 8.0, 'speed': 1.25,
+         'timestamp': '2024-05-01T04:05:00.123Z'},
+    ]
+
+    def setUp(self):
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_round_trip_and_server_side_count(self):
+        response = self.client.post('/api/inspections/', {
+            'branch_name': 'Dhaka', 'location_points': self.points, 'total_location_points': 99,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        inspection = Inspection.objects.get()
+        self.assertEqual(inspection.total_location_points, 2)
+        self.assertLess(len(inspection.track.data), 40)
+
+        detail = self.client.get(f'/api/inspections/{inspection.id}/').data
+        self.assertEqual(detail['location_points'], [
+            {'latitude': 23.8103, 'longitude': 90.4125, 'timestamp': '2024-05-01T04:00:00.000Z', 'accuracy': 12.5},
+            {'latitude': 23.8109, 'longitude': 90.4131, 'timestamp': '2024-05-01T04:05:00.123Z',
+             'accuracy': 8.0, 'speed': 1.25},
+        ])
+        self.assertEqual(detail['last_location']['timestamp'], '2024-05-01T04:05:00.123Z')
+
+        bad = self.client.post('/api/inspections/', {'location_points': [{'latitude': 'x'}]}, format='json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_append_reads_only_summaries(self):
+        inspection = Inspection.objects.create(inspector=self.inspector, location_points=self.points[:1])
+        url = f'/api/inspections/{inspection.id}/track/'
+        response = self.client.post(url, {'points': self.points[1:]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['point_count'], 2)
+        self.assertEqual(response.data['bbox'], [90.4125, 23.8103, 90.4131, 23.8109])
+
+        inspection = Inspection.objects.select_related('track').get()
+        self.assertEqual(inspection.total_location_points, 2)
+        self.assertEqual([p['timestamp'] for p in inspection.location_points],
+                         [p['timestamp'] for p in self.points])
+        with self.assertNumQueries(0):
+            self.assertEqual(inspection.get_first_location()['latitude'], 23.8103)
+            self.assertEqual(inspection.get_last_location()['longitude'], 90.4131)
+
+        self.assertEqual(self.client.post(url, {'points': [{'longitude': 1}]}, format='json').status_code, 400)
+
+    def test_list_does_not_load_tracks(self):
+        Inspection.objects.create(inspector=self.inspector, location_points=self.points)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/inspections/')
+        self.assertEqual(response.data['results'][0]['total_location_points'], 2)
+        self.assertFalse([q for q in ctx.captured_queries if 'location_tracks' in q['sql']])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TrackPolylineTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_encoding_matches_reference(self):
+        # Example from Google's polyline algorithm documentation
+        coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual(encode_polyline(coords), '_p~iF~ps|U_ulLnnqC_mqNvxq`@')
+        self.assertEqual(decode_polyline('_p~iF~ps|U_ulLnnqC_mqNvxq`@'), coords)
+
+    def test_simplification_is_bounded_and_cached(self):
+        # A long zig-zag walk: ~3 km east with 5 m of sideways jitter
+        points = [
+            {'latitude': 23.8 + (0.00005 if i % 2 else 0), 'longitude': 90.4 + i * 0.00001}
+            for i in range(3000)
+        ]
+        inspection = Inspection.objects.create(inspector=self.inspector, location_points=points)
+        url = f'/api/inspections/{inspection.id}/track/polyline/'
+
+        fine = self.client.get(url, {'tolerance': 1}).data
+        self.assertLessEqual(fine['point_count'], MAX_POINTS)
+        self.assertEqual(fine['original_point_count'], 3000)
+
+        coarse = self.client.get(url, {'zoom': 12}).data
+        self.assertEqual(coarse['point_count'], 2)
+        self.assertEqual(decode_polyline(coarse['polyline']), [(23.8, 90.4), (23.80005, 90.42999)])
+        with self.assertNumQueries(1):  # the inspection and its track; nothing decoded or written
+            self.assertEqual(self.client.get(url, {'zoom': 12}).data, coarse)
+
+        # New points drop the cache
+        self.client.post(f'/api/inspections/{inspection.id}/track/', {'points': [
+            {'latitude': 23.81, 'longitude': 90.43},
+        ]}, format='json')
+        self.assertEqual(self.client.get(url, {'zoom': 12}).data['point_count'], 3)
+        self.assertEqual(self.client.get(url, {'zoom': 30}).status_code, 400)
+
+
+    @override_settings(JOBS_EAGER=True)
+    def test_polylines_are_precomputed_when_points_change(self):
+        points = [{'latitude': 23.8 + i * 0.0001, 'longitude': 90.4 + (i % 2) * 0.0001} for i in range(50)]
+        with self.captureOnCommitCallbacks(execute=True):
+            inspection = Inspection.objects.create(inspector=self.inspector, location_points=points)
+        track = LocationTrack.objects.get(inspection=inspection)
+        self.assertEqual(sorted(track.polylines), sorted(str(zoom) for zoom in PRECOMPUTED_ZOOMS))
+        url = f'/api/inspections/{inspection.id}/track/polyline/'
+        with self.assertNumQueries(1):
+            data = self.client.get(url, {'zoom': DEFAULT_ZOOM}).data
+        self.assertEqual(data['original_point_count'], 50)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/inspections/{inspection.id}/track/', {'points': [
+                {'latitude': 23.81, 'longitude': 90.41},
+            ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, {'zoom': DEFAULT_ZOOM}).data['original_point_count'], 51)
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class GeoQueryTests(TestCase):
+
+    def setUp(self):
+        self.admin = make_user('admin@example.com', role='admin')
+        self.inspector = make_user('inspector@example.com')
+        other = make_user('other@example.com', branch_name='Chattogram')
+        # Gulshan, Motijheel (~8 km south) and Chattogram (~215 km south-east)
+        self.gulshan = Inspection.objects.create(inspector=self.inspector, location_points=[
+            {'latitude': 23.7925, 'longitude': 90.4078}, {'latitude': 23.7940, 'longitude': 90.4150},
+        ])
+        self.motijheel = Inspection.objects.create(inspector=self.inspector, location_points=[
+            {'latitude': 23.7330, 'longitude': 90.4172},
+        ])
+        self.chattogram = Inspection.objects.create(inspector=other, branch_name='Chattogram', location_points=[
+            {'latitude': 22.3569, 'longitude': 91.7832},
+        ])
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_cells_cover_their_box(self):
+        cell = point_cell(23.7925, 90.4078)
+        self.assertTrue(any(start <= cell < end for start, end in cover_ranges(23.79, 90.40, 23.80, 90.41)))
+        self.assertFalse(any(start <= cell < end for start, end in cover_ranges(22.3, 91.7, 22.4, 91.8)))
+
+    def test_index_follows_track_writes(self):
+        self.assertEqual(InspectionLocation.objects.filter(inspection=self.gulshan).count(), 2)
+        self.client.force_authenticate(self.inspector)
+        response = self.client.post(f'/api/inspections/{self.gulshan.id}/track/', {'points': [
+            {'latitude': 23.7950, 'longitude': 90.4160},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(InspectionLocation.objects.filter(inspection=self.gulshan).count(), 3)
+        self.gulshan.location_points = []
+        self.gulshan.save()
+        self.assertFalse(InspectionLocation.objects.filter(inspection=self.gulshan).exists())
+
+    def test_radius(self):
+        response = self.client.get('/api/geo/radius/', {'lat': 23.7925, 'lng': 90.4078, 'radius_km': 10})
+        self.assertEqual([r['id'] for r in response.data], [self.gulshan.id, self.motijheel.id])
+        self.assertEqual(response.data[0]['distance_km'], 0)
+        self.assertAlmostEqual(response.data[1]['distance_km'], 6.6, delta=0.3)
+
+        response = self.client.get('/api/geo/radius/', {'lat': 23.7925, 'lng': 90.4078, 'radius_km': 1})
+        self.assertEqual([r['id'] for r in response.data], [self.gulshan.id])
+        # The closest point of each inspection, not its first
+        response = self.client.get('/api/geo/radius/', {'lat': 23.7941, 'lng': 90.4151, 'radius_km': 10, 'limit': 1})
+        self.assertEqual([(r['id'], r['latitude'], r['longitude']) for r in response.data],
+                         [(self.gulshan.id, 23.7940, 90.4150)])
+        for params in ({'lat': 23.79}, {'lat': 23.79, 'lng': 90.4, 'radius_km': 1000},
+                       {'lat': 23.79, 'lng': 90.4, 'radius_km': 1, 'limit': 0}):
+            self.assertEqual(self.client.get('/api/geo/radius/', params).status_code, 400, params)
+
+    def test_bbox_and_scope(self):
+        box = {'min_lat': 22, 'min_lng': 90, 'max_lat': 24, 'max_lng': 92}
+        # Counted in the database, then one query for the inspections
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/geo/bbox/', box)
+        self.assertEqual({r['id']: r['points_inside'] for r in response.data},
+                         {self.gulshan.id: 2, self.motijheel.id: 1, self.chattogram.id: 1})
+        response = self.client.get('/api/geo/bbox/', {**box, 'limit': 2})
+        self.assertEqual([r['id'] for r in response.data], sorted([self.gulshan.id, self.motijheel.id]))
+        self.assertEqual(self.client.get('/api/geo/bbox/', {**box, 'max_lng': 100}).status_code, 400)
+
+        self.client.force_authenticate(self.inspector)
+        response = self.client.get('/api/geo/bbox/', box)
+        self.assertEqual(sorted(r['id'] for r in response.data), sorted([self.gulshan.id, self.motijheel.id]))
+
+    def test_deleted_inspections_are_skipped(self):
+        found = [(self.gulshan.id, 2), (self.gulshan.id + 1000, 1)]
+        with mock.patch('accounts.views.within_bbox', return_value=found):
+            response = self.client.get('/api/geo/bbox/', {'min_lat': 23, 'min_lng': 90, 'max_lat': 24, 'max_lng': 91})
+        self.assertEqual([r['id'] for r in response.data], [self.gulshan.id])
+
+    def test_nearest(self):
+        response = self.client.get('/api/geo/nearest/', {'lat': 22.5, 'lng': 91.5, 'k': 2})
+        self.assertEqual([r['id'] for r in response.data], [self.chattogram.id, self.motijheel.id])
+        self.assertEqual(self.client.get('/api/geo/nearest/', {'lat': 22.5, 'lng': 91.5, 'k': 0}).status_code, 400)
+
+
+def jpeg_payload(width, height, orientation=None):
+    image = Image.new('RGB', (width, height), (200, 30, 30))
+    exif = Image.Exif()
+    exif[0x0112] = orientation or 1  # Orientation
+    exif[0x010F] = 'Test Camera'  # Make
+    out = io.BytesIO()
+    image.save(out, 'JPEG', exif=exif.tobytes())
+    return base64.b64encode(out.getvalue()).decode()
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], JOBS_EAGER=True)
+class ImageVariantTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_variants_are_bounded_upright_and_stripped(self):
+        # Orientation 6: stored landscape, displayed portrait
+        with self.captureOnCommitCallbacks(execute=True):
+            inspection = Inspection.objects.create(inspector=self.inspector, site_photos=[
+                {'name': 'front.jpg', 'base64_data': jpeg_payload(2000, 1000, orientation=6)},
+            ])
+
+        variants = {v.name: v for v in ImageVariant.objects.all()}
+        self.assertEqual(set(variants), {'thumb', 'medium', 'original'})
+        self.assertEqual((variants['original'].width, variants['original'].height), (1000, 2000))
+        self.assertEqual((variants['medium'].width, variants['medium'].height), (640, 1280))
+        self.assertEqual((variants['thumb'].width, variants['thumb'].height), (160, 320))
+        self.assertEqual(variants['thumb'].mime_type, 'image/webp')
+        with variants['original'].file.open('rb') as fh:
+            original = Image.open(fh)
+            self.assertNotIn(0x010F, original.getexif())
+            self.assertTrue(original.info.get('progressive'))
+
+        detail = self.client.get(f'/api/inspections/{inspection.id}/').data
+        photo = detail['site_photos'][0]
+        self.assertEqual((photo['width'], photo['height']), (1000, 2000))
+        self.assertTrue(photo['thumbnail_url'].endswith('/thumb.webp'))
+        self.assertEqual(set(photo['variants']), {'thumb', 'medium', 'original'})
+
+        rows = self.client.get('/api/inspections/').data['results']
+        self.assertEqual(rows[0]['thumbnail_url'], photo['thumbnail_url'])
+
+    def test_undecodable_photo_is_left_alone(self):
+        with self.assertLogs('accounts.images', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            inspection = Inspection.objects.create(inspector=self.inspector, site_photos=[
+                {'name': 'broken.jpg', 'base64_data': base64.b64encode(b'not an image').decode()},
+            ])
+        self.assertFalse(ImageVariant.objects.exists())
+        photo = self.client.get(f'/api/inspections/{inspection.id}/').data['site_photos'][0]
+        self.assertNotIn('thumbnail_url', photo)
+        self.assertIn('url', photo)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def flaky(value):
+            self.calls.append(value)
+            raise RuntimeError('SMTP is down')
+
+        TASKS['test_flaky'] = flaky
+        self.addCleanup(TASKS.pop, 'test_flaky')
+
+    def test_password_reset_mail_is_sent_by_the_worker(self):
+        make_user('inspector@example.com')
+        response = APIClient().post('/api/password_reset/', {'email': 'inspector@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+
+        [job] = claim('test-worker', 10)
+        self.assertEqual((job.task, job.attempts), ('send_email', 1))
+        self.assertTrue(execute(job))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/reset-password?uid=', mail.outbox[0].body)
+        self.assertEqual(Job.objects.get().status, Job.STATUS_DONE)
+
+    def test_failures_back_off_then_fail(self):
+        job = enqueue('test_flaky', {'value': 1}, max_attempts=2)
+        [claimed] = claim('test-worker', 10)
+        with self.assertLogs('accounts.jobs', 'WARNING'):
+            self.assertFalse(execute(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.STATUS_QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(claim('test-worker', 10), [])  # not due yet
+
+        Job.objects.update(run_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('accounts.jobs', 'ERROR'):
+            self.assertFalse(execute(claim('test-worker', 10)[0]))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertIn('SMTP is down', job.last_error)
+        self.assertEqual(self.calls, [1, 1])
+
+    def test_eager_mode_runs_after_commit(self):
+        with override_settings(JOBS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            enqueue('send_email', {'subject': 'Hi', 'message': 'Body', 'recipient_list': ['a@example.com']})
+            self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(mail.outbox), 1)
+
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode_keeps_run_at_and_does_not_retry(self):
+        later = enqueue('test_flaky', {'value': 'later'}, run_at=timezone.now() + timedelta(minutes=1))
+        with self.captureOnCommitCallbacks(execute=True):
+            # Debounced work such as the rollup refresh is not run by every commit
+            schedule_refresh()
+            schedule_refresh()
+        self.assertEqual(Job.objects.get(task='refresh_rollups').status, Job.STATUS_QUEUED)
+
+        with self.assertLogs('accounts.jobs', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            now = enqueue('test_flaky', {'value': 'now'})
+        now.refresh_from_db()
+        # No worker would pick up a retry
+        self.assertEqual((now.status, now.attempts), (Job.STATUS_FAILED, 1))
+        self.assertEqual(self.calls, ['now'])
+
+        # A delayed job runs with the first commit after it is due
+        Job.objects.filter(pk=later.pk).update(run_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('accounts.jobs', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            enqueue('send_email', {'subject': 'Hi', 'message': 'Body', 'recipient_list': ['a@example.com']})
+        later.refresh_from_db()
+        self.assertEqual(later.status, Job.STATUS_FAILED)
+        self.assertEqual((self.calls, len(mail.outbox)), (['now', 'later'], 1))
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class JobWorkerTests(TransactionTestCase):
+
+    def test_worker_runs_due_jobs(self):
+        for i in range(5):
+            enqueue('send_email', {'subject': f'Mail {i}', 'message': 'Body', 'recipient_list': ['a@example.com']})
+        # One thread: SQLite's in-memory test database locks whole tables
+        self.assertEqual(run_worker(concurrency=1, poll_interval=0, once=True), (5, 0))
+        self.assertEqual(sorted(m.subject for m in mail.outbox), [f'Mail {i}' for i in range(5)])
+        self.assertFalse(Job.objects.exclude(status=Job.STATUS_DONE).exists())
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+    })
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ThrottleTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user('inspector@example.com')
+        self.user.set_password('right-password')
+        self.user.save()
+        self.client = APIClient()
+
+    def login(self, password, ip='10.0.0.1'):
+        return self.client.post('/api/token/', {
+            'email': 'inspector@example.com', 'password': password, 'role': 'inspector',
+        }, format='json', REMOTE_ADDR=ip)
+
+    def test_bucket_refills(self):
+        bucket = TokenBucket('test', capacity=2, period=10)
+        self.assertEqual(bucket.consume(now=1000), (True, 0.0))
+        self.assertEqual(bucket.consume(now=1000), (True, 0.0))
+        self.assertEqual(bucket.consume(now=1000), (False, 5.0))
+        self.assertEqual(bucket.consume(now=1005), (True, 0.0))
+
+    @throttle_rates(login='3/min', login_failure=None)
+    def test_login_is_limited_per_ip(self):
+        for _ in range(3):
+            self.assertEqual(self.login('wrong').status_code, 400)
+        response = self.login('right-password')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        # Somebody else's address is unaffected
+        self.assertEqual(self.login('right-password', ip='10.0.0.2').status_code, 200)
+
+    @throttle_rates(login_failure='2/hour')
+    def test_only_failed_logins_use_the_account_budget(self):
+        for _ in range(5):
+            self.assertEqual(self.login('right-password').status_code, 200)
+        self.assertEqual(self.login('wrong', ip='10.0.0.2').status_code, 400)
+        self.assertEqual(self.login('wrong', ip='10.0.0.2').status_code, 400)
+        self.assertEqual(self.login('right-password', ip='10.0.0.2').status_code, 429)
+
+    @throttle_rates(login_failure='2/hour')
+    def test_failures_elsewhere_do_not_lock_the_owner_out(self):
+        for ip in ('10.0.0.2', '10.0.0.3'):
+            for _ in range(5):
+                self.login('wrong', ip=ip)
+        self.assertEqual(self.login('wrong', ip='10.0.0.2').status_code, 429)
+        self.assertEqual(self.login('right-password').status_code, 200)
+
+    @throttle_rates(write='2/min')
+    def test_writes_are_limited_per_user(self):
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            self.assertEqual(self.client.post('/api/inspections/', {}, format='json').status_code, 201)
+        self.assertEqual(self.client.post('/api/inspections/', {}, format='json').status_code, 429)
+        self.assertEqual(self.client.get('/api/inspections/').status_code, 200)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AsyncViewTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_user('inspector@example.com')
+        self.auth = {'AUTHORIZATION': f'Bearer {RefreshToken.for_user(self.inspector).access_token}'}
+
+    async def test_served_on_the_event_loop_with_drf_checks(self):
+        response = await self.async_client.get('/api/current-user/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['email'], 'inspector@example.com')
+        self.assertEqual((await self.async_client.get('/api/current-user/')).status_code, 401)
+
+        response = await self.async_client.get('/api/new-inspections/list/', headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        revalidated = await self.async_client.get(
+            '/api/new-inspections/list/', headers={**self.auth, 'If-None-Match': response['ETag']}
+        )
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_only_reads_are_accepted(self):
+        client = APIClient()
+        client.force_authenticate(self.inspector)
+        self.assertEqual(client.post('/api/current-user/').status_code, 405)
+        self.assertEqual(client.get('/api/branch/inspection-stats/').status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class BulkTransferTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_user('inspector@example.com')
+        self.admin = make_user('admin@example.com', role='admin')
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp, name)
+        with open(path, 'w', newline='') as fh:
+            fh.write(text)
+        return path
+
+    def test_import_batches_rebuilds_counters_and_invalidates_cache(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.get('/api/inspection/stats/').json()['all'], 0)
+
+        path = self.write('legacy.csv', (
+            'inspector_email,client_name,status,created_at,godown_guard,competitors\n'
+            'inspector@example.com,Rahman Traders,Approved,2019-03-02,yes,"[""Karim & Sons""]"\n'
+            'inspector@example.com,Molla Steel,Pending,,no,\n'
+            'nobody@example.com,Ghost Ltd,Pending,,,\n'
+            'inspector@example.com,Bad Status,Lost,,,\n'
+            'inspector@example.com,Third,Approved,2019-05-01,,\n'
+        ))
+        out, err = io.StringIO(), io.StringIO()
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            call_command('import_inspections', path, '--batch-size', '2', stdout=out, stderr=err)
+        # Three valid rows in batches of two; one lookup per distinct email
+        inserts = [q for q in queries if q['sql'].startswith('INSERT INTO "inspections"')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(sum('accounts_customuser' in q['sql'] for q in queries), 2)
+        self.assertIn('Imported 3 inspections (2 records skipped)', out.getvalue())
+        self.assertIn('record 3: unknown inspector', err.getvalue())
+        self.assertIn('record 4: status:', err.getvalue())
+
+        rahman = Inspection.objects.get(client_name='Rahman Traders')
+        self.assertEqual(timezone.localtime(rahman.created_at).date().isoformat(), '2019-03-02')
+        self.assertTrue(rahman.godown_guard)
+        self.assertEqual(rahman.competitors, ['Karim & Sons'])
+        self.assertEqual(
+            InspectionStatusCounter.objects.get(inspector=self.inspector, status='Approved').count, 2
+        )
+        self.assertEqual(client.get('/api/inspection/stats/').json()['all'], 3)
+
+    def test_dry_run_writes_nothing(self):
+        path = self.write('legacy.ndjson', '{"inspector_id": %d, "client_name": "A"}\nnot json\n' % self.inspector.pk)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_inspections', path, '--dry-run', stdout=out, stderr=err)
+        self.assertIn('Would import 1 inspections (1 records skipped)', out.getvalue())
+        self.assertFalse(Inspection.objects.exists())
+
+    def test_export_streams_selected_columns_in_scope(self):
+        other = make_user('other@example.com', branch_name='Khulna')
+        first = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', client_name='Alpha, Ltd')
+        Inspection.objects.create(inspector=other, branch_name='Khulna', client_name='Beta')
+        Inspection.objects.filter(pk=first.pk).update(created_at=timezone.now() - timedelta(days=400))
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/inspections/export/?columns=id,client_name,inspector_email')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'id,client_name,inspector_email',
+            f'{first.pk},"Alpha, Ltd",inspector@example.com',
+            f'{first.pk + 1},Beta,other@example.com',
+        ])
+
+        response = client.get('/api/inspections/export/?output=ndjson&columns=client_name&created_from='
+                              + (timezone.now() - timedelta(days=30)).date().isoformat())
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'client_name': 'Beta'}])
+
+        client.force_authenticate(self.inspector)
+        response = client.get('/api/inspections/export/?output=ndjson&columns=client_name')
+        self.assertEqual(b''.join(response.streaming_content).count(b'\n'), 1)
+        self.assertEqual(client.get('/api/inspections/export/?columns=password').status_code, 400)
+        self.assertEqual(client.get('/api/inspections/export/?quarter=2024Q5').status_code, 400)
+
+    async def test_export_streams_under_asgi(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.admin).access_token))()
+        await Inspection.objects.acreate(inspector=self.inspector, client_name='Alpha')
+        response = await self.async_client.get(
+            '/api/inspections/export/?output=ndjson&columns=client_name',
+            headers={'AUTHORIZATION': f'Bearer {token}'},
+        )
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(json.loads(body), {'client_name': 'Alpha'})
+
+    def test_export_command_quarter(self):
+        inspection = Inspection.objects.create(inspector=self.inspector, client_name='Q3')
+        Inspection.objects.filter(pk=inspection.pk).update(
+            created_at=timezone.make_aware(timezone.datetime(2024, 9, 30, 23, 0))
+        )
+        Inspection.objects.create(inspector=self.inspector, client_name='Now')
+        path = os.path.join(self.tmp, 'q3.ndjson')
+        call_command('export_inspections', '--quarter', '2024Q3', '--columns', 'client_name', '-o', path,
+                     stdout=io.StringIO())
+        with open(path) as fh:
+            self.assertEqual(fh.read(), '{"client_name": "Q3"}\n')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class AmountTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_user('inspector@example.com')
+
+    def test_parse_amount(self):
+        cases = {
+            '1,20,000': '120000.00', '5 lac': '500000.00', 'Tk. 2.5 crore': '25000000.00',
+            '১২ লাখ': '1200000.00', '50,000/-': '50000.00', '1 crore 20 lac': '12000000.00',
+            '(3,500)': '-3500.00', 'BDT 10k': '10000.00', 'n/a': None, '10%': None, '': None, None: None,
+        }
+        for text, expected in cases.items():
+            self.assertEqual(parse_amount(text), Decimal(expected) if expected else None, text)
+
+    def test_saved_and_backfilled(self):
+        inspection = Inspection.objects.create(
+            inspector=self.inspector, applied_limit='5 lac', cash_balance='1,20,000'
+        )
+        self.assertEqual(inspection.applied_limit_value, Decimal('500000'))
+        inspection.applied_limit = '2 crore'
+        inspection.save(update_fields=['applied_limit'])
+        inspection.refresh_from_db()
+        self.assertEqual(inspection.applied_limit_value, Decimal('20000000'))
+        self.assertEqual(inspection.cash_balance_value, Decimal('120000'))
+
+        # Rows written before the columns existed
+        Inspection.objects.update(applied_limit_value=None, cash_balance_value=None)
+        self.assertEqual(backfill_amounts(Inspection), 1)
+        inspection.refresh_from_db()
+        self.assertEqual(inspection.cash_balance_value, Decimal('120000'))
+        self.assertEqual(backfill_amounts(Inspection), 0)
+
+    def test_portfolio_aggregates_in_sql(self):
+        khulna = make_user('khulna@example.com', branch_name='Khulna')
+        for limit in ('1 lac', '2 lac', '3 lac', 'to be decided'):
+            Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', applied_limit=limit)
+        Inspection.objects.create(inspector=khulna, branch_name='Khulna', applied_limit='1 crore')
+
+        client = APIClient()
+        client.force_authenticate(make_user('admin@example.com', role='admin'))
+        with self.assertNumQueries(2):
+            response = client.get('/api/portfolio/?group_by=branch&fields=applied_limit&percentiles=50,90')
+        self.assertEqual(response.status_code, 200)
+        dhaka = response.data['groups'][0]
+        self.assertEqual(dhaka['branch_name'], 'Dhaka')
+        self.assertEqual(dhaka['inspections'], 4)
+        self.assertEqual(dhaka['applied_limit'], {
+            'count': 3, 'sum': '600000.00', 'avg': '200000.00', 'p50': '200000.00', 'p90': '280000.00',
+        })
+        self.assertEqual(response.data['total']['applied_limit']['sum'], '10600000.00')
+
+        branch_admin = make_user('branch@example.com', role='branch_admin', branch_name='Khulna')
+        client.force_authenticate(branch_admin)
+        response = client.get('/api/portfolio/?fields=applied_limit')
+        self.assertEqual(response.data['total']['applied_limit']['sum'], '10000000.00')
+        self.assertEqual(client.get('/api/portfolio/?fields=client_name').status_code, 400)
+        client.force_authenticate(self.inspector)
+        self.assertEqual(client.get('/api/portfolio/').status_code, 403)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class RollupTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_user('inspector@example.com')
+        self.today = timezone.localdate()
+
+    def test_writes_queue_days_for_one_debounced_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            inspection = Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', applied_limit='5 lac')
+        with self.captureOnCommitCallbacks(execute=True):
+            Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', male_worker='12', female_worker='১০')
+        self.assertEqual(list(RollupPendingDay.objects.values_list('day', flat=True)), [self.today])
+        job = Job.objects.get(task='refresh_rollups')
+        self.assertGreater(job.run_at, timezone.now())
+
+        self.assertEqual(refresh_rollups(), 1)
+        self.assertFalse(RollupPendingDay.objects.exists())
+        rollup = InspectionDailyRollup.objects.get()
+        self.assertEqual((rollup.day, rollup.branch_name, rollup.inspections), (self.today, 'Dhaka', 2))
+        self.assertEqual(rollup.applied_limit, Decimal('500000'))
+        self.assertEqual((rollup.male_workers, rollup.female_workers), (12, 10))
+
+        # Fields the rollups do not read leave them alone
+        inspection.client_name = 'Renamed'
+        inspection.save(update_fields=['client_name'])
+        self.assertFalse(RollupPendingDay.objects.exists())
+        inspection.delete()
+        self.assertEqual(refresh_rollups(), 1)
+        self.assertEqual(InspectionDailyRollup.objects.get().inspections, 1)
+
+    def test_analytics_reads_rollups(self):
+        khulna = make_user('khulna@example.com', branch_name='Khulna')
+        Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', status='Approved', applied_limit='1 lac')
+        Inspection.objects.create(inspector=self.inspector, branch_name='Dhaka', status='Pending', applied_limit='2 lac')
+        Inspection.objects.create(inspector=khulna, branch_name='Khulna', status='Pending', applied_limit='1 crore')
+        call_command('refresh_rollups', stdout=io.StringIO())
+
+        client = APIClient()
+        client.force_authenticate(make_user('admin@example.com', role='admin'))
+        with self.assertNumQueries(2):
+            response = client.get('/api/analytics/?group_by=branch,status&interval=total')
+        self.assertEqual(response.status_code, 200)
+        rows = [(r['branch_name'], r['status'], r['inspections'], r['applied_limit']) for r in response.data['rows']]
+        self.assertEqual(rows, [
+            ('Dhaka', 'Approved', 1, '100000.00'), ('Dhaka', 'Pending', 1, '200000.00'),
+            ('Khulna', 'Pending', 1, '10000000.00'),
+        ])
+        self.assertEqual(response.data['total']['inspections'], 3)
+        self.assertEqual(response.data['total']['pending'], 2)
+
+        response = client.get('/api/analytics/?interval=month')
+        self.assertEqual(len(response.data['rows']), 1)
+        self.assertEqual(response.data['rows'][0]['period'], self.today.replace(day=1))
+        self.assertEqual(client.get('/api/analytics/?interval=year').status_code, 400)
+        self.assertEqual(client.get('/api/analytics/?group_by=inspector').status_code, 400)
+
+        client.force_authenticate(make_user('branch@example.com', role='branch_admin', branch_name='Khulna'))
+        response = client.get('/api/analytics/?interval=total')
+        self.assertEqual(response.data['total']['applied_limit'], '10000000.00')
+        client.force_authenticate(self.inspector)
+        self.assertEqual(client.get('/api/analytics/').status_code, 403)
+
+    def test_import_queues_its_days(self):
+        records = [
+            {'inspector_email': self.inspector.email, 'branch_name': 'Dhaka', 'created_at': '2023-01-05T10:00:00'},
+            {'inspector_email': self.inspector.email, 'branch_name': 'Dhaka', 'created_at': '2023-01-06T10:00:00'},
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(import_inspections(records)[0], 2)
+        days = sorted(RollupPendingDay.objects.values_list('day', flat=True))
+        self.assertEqual([d.isoformat() for d in days], ['2023-01-05', '2023-01-06'])
+        self.assertEqual(Job.objects.filter(task='refresh_rollups').count(), 1)
+        refresh_rollups()
+        self.assertEqual(InspectionDailyRollup.objects.count(), 2)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.inspector = make_user('inspector@example.com')
+        other = make_user('other@example.com', branch_name='Khulna')
+        Inspection.objects.create(
+            inspector=cls.inspector, branch_name='Dhaka', client_name='Rahim Textiles',
+            owner_name='Abdur Rahim', phone_number='01711-234567',
+        )
+        Inspection.objects.create(
+            inspector=cls.inspector, branch_name='Dhaka', client_name='Karim Agro', group_name='Meghna Group',
+        )
+        Inspection.objects.create(
+            inspector=other, branch_name='Khulna', client_name='Rahimafrooz Traders', industry_name='Batteries',
+        )
+
+    def names(self, user, query):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/inspections/search/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(row['client_name'] for row in response.data['results'])
+
+    def test_scoped_by_role(self):
+        self.assertEqual(self.names(self.inspector, 'rahim'), ['Rahim Textiles'])
+        admin = make_user('admin@example.com', role='admin')
+        self.assertEqual(self.names(admin, 'rahim'), ['Rahim Textiles', 'Rahimafrooz Traders'])
+        branch_admin = make_user('branch@example.com', role='branch_admin', branch_name='Khulna')
+        self.assertEqual(self.names(branch_admin, 'rahim'), ['Rahimafrooz Traders'])
+
+    def test_matches_words_fragments_and_phone_numbers(self):
+        admin = make_user('admin@example.com', role='admin')
+        self.assertEqual(self.names(admin, 'meghna karim'), ['Karim Agro'])
+        self.assertEqual(self.names(admin, 'afroo'), ['Rahimafrooz Traders'])
+        self.assertEqual(self.names(admin, '234567'), ['Rahim Textiles'])
+        self.assertEqual(self.names(admin, 'batteries rahim'), ['Rahimafrooz Traders'])
+        self.assertEqual(self.names(admin, 'nobody'), [])
+
+    def test_query_validation(self):
+        self.assertEqual(tsquery(['abdur', 'rah']), 'abdur & rah:*')
+        self.assertEqual(parse_search_params({'q': 'রহিম টেক্সটাইল'})['words'], ['রহিম', 'টেক্সটাইল'])
+        client = APIClient()
+        client.force_authenticate(self.inspector)
+        self.assertEqual(client.get('/api/inspections/search/', {'q': ' - '}).status_code, 400)
+        self.assertEqual(client.get('/api/inspections/search/', {'q': 'rahim', 'limit': '500'}).status_code, 400)
+        response = client.get('/api/inspections/search/', {'q': 'rahim', 'limit': '1'})
+        self.assertEqual(len(response.data['results']), 1)
+        # The index document stays out of the API
+        detail = client.get(f"/api/inspections/{response.data['results'][0]['id']}/")
+        self.assertNotIn('search_vector', detail.data)
+        # Times as every other endpoint writes them, in the local time zone
+        self.assertEqual(response.data['results'][0]['created_at'], detail.data['created_at'])
+        self.assertTrue(detail.data['created_at'].endswith('+06:00'))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ClientKeyTests(TestCase):
+
+    def setUp(self):
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_keys_normalize_spellings(self):
+        self.assertEqual(name_key('M/S Rahim Textiles Ltd.'), name_key('Raheem Textile'))
+        self.assertEqual(name_key('Md. Islam Traders'), name_key('Eslam Trader'))
+        self.assertNotEqual(name_key('Rahim Textiles'), name_key('Karim Textiles'))
+        self.assertEqual(phone_key('+880 1711-234567'), phone_key('01711234567'))
+        self.assertIsNone(phone_key('12-34'))
+
+        inspection = Inspection.objects.create(inspector=self.inspector, tin_number='1234 5678 9012')
+        self.assertEqual(inspection.tin_key, '123456789012')
+        inspection.account_number = '00-2050-1234'
+        inspection.save(update_fields=['account_number'])
+        inspection.refresh_from_db()
+        self.assertEqual(inspection.account_key, '20501234')
+
+        Inspection.objects.update(tin_key=None)
+        self.assertEqual(backfill_client_keys(Inspection), 1)
+
+    def test_duplicates_endpoint(self):
+        by_tin = Inspection.objects.create(inspector=self.inspector, client_name='Rahim Textiles', tin_number='123456789012')
+        by_name = Inspection.objects.create(inspector=self.inspector, client_name='Raheem Textile Ltd')
+        Inspection.objects.create(inspector=self.inspector, client_name='Karim Agro', phone_number='01811000000')
+        other = make_user('other@example.com')
+        Inspection.objects.create(inspector=other, client_name='Rahim Textiles', tin_number='123456789012')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/inspections/duplicates/', {'client_name': 'rohim textiles', 'tin_number': '1234-5678-9012'}
+            )
+        self.assertEqual(response.status_code, 200)
+        rows = [(row['id'], row['matched'], row['score']) for row in response.data['results']]
+        self.assertEqual(rows, [(by_tin.id, ['tin_key', 'name_key'], 6), (by_name.id, ['name_key'], 2)])
+        # Times as every other endpoint writes them, in the local time zone
+        self.assertEqual(response.data['results'][0]['created_at'],
+                         self.client.get(f'/api/inspections/{by_tin.id}/').data['created_at'])
+
+        response = self.client.get('/api/inspections/duplicates/', {'client_name': 'Rahim Textiles', 'exclude': by_tin.id})
+        self.assertEqual([row['id'] for row in response.data['results']], [by_name.id])
+        self.assertEqual(self.client.get('/api/inspections/duplicates/', {'phone_number': '12'}).status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SectionTests(TestCase):
+
+    def setUp(self):
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+
+    def test_sections_load_and_save_separately(self):
+        inspection = Inspection.objects.create(
+            inspector=self.inspector, client_name='Rahim Textiles', father_name='Karim', cash_balance='5 lac'
+        )
+        # Only the sections given a value get a row
+        self.assertEqual(InspectionOwnerSection.objects.get().father_name, 'Karim')
+        self.assertEqual(InspectionAssetSection.objects.count(), 1)
+        self.assertEqual(Inspection.SECTION_MODELS['godown'].objects.count(), 0)
+
+        with self.assertNumQueries(1):
+            inspection = Inspection.objects.get()
+            self.assertEqual(inspection.client_name, 'Rahim Textiles')
+        with self.assertNumQueries(1):
+            self.assertEqual(inspection.cash_balance, '5 lac')
+            self.assertEqual(inspection.cash_balance_value, Decimal('500000.00'))
+        with self.assertNumQueries(1):
+            joined = list(Inspection.objects.select_related(*section_accessors()))
+        with self.assertNumQueries(0):
+            self.assertEqual(joined[0].father_name, 'Karim')
+            self.assertIsNone(joined[0].godown_location)
+
+        inspection.cash_balance = '1 crore'
+        inspection.godown_location = 'Tongi'
+        with CaptureQueriesContext(connection) as queries:
+            inspection.save()
+        statements = [query['sql'] for query in queries]
+        self.assertTrue(any('UPDATE "inspection_assets"' in sql for sql in statements))
+        self.assertTrue(any('INSERT INTO "inspection_godown"' in sql for sql in statements))
+        self.assertFalse(any('inspection_owner' in sql for sql in statements))
+        inspection.refresh_from_db()
+        self.assertEqual(inspection.cash_balance_value, Decimal('10000000.00'))
+        self.assertEqual(inspection.godown_location, 'Tongi')
+
+    def test_api_shape_unchanged(self):
+        response = self.client.post('/api/inspections/', {
+            'client_name': 'Rahim Textiles', 'owner_name': 'Rahim', 'existing_limit': '2 lac',
+            'partners_directors': [{'name': 'Karim'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        created = response.data
+        inspection_id = created['id']
+        self.assertEqual(Inspection.objects.get().partners_directors, [{'name': 'Karim'}])
+
+        response = self.client.patch(f'/api/inspections/{inspection_id}/', {'existing_limit': '3 lac'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['existing_limit'], '3 lac')
+        self.assertEqual(response.data['partners_directors'], [{'name': 'Karim'}])
+        self.assertEqual(Inspection.objects.get().existing_limit_value, Decimal('300000.00'))
+
+        detail = self.client.get(f'/api/inspections/{inspection_id}/').data
+        self.assertIn('godown_location', detail)
+        self.assertIsNone(detail['godown_location'])
+        # The client lookup keys are internal columns
+        for body in (created, response.data, detail):
+            self.assertFalse(set(KEY_FIELDS) & set(body))
+
+    def test_admin_edits_section_fields(self):
+        admin_user = make_user('root@example.com', role='admin')
+        CustomUser.objects.filter(pk=admin_user.pk).update(is_staff=True, is_superuser=True)
+        inspection = Inspection.objects.create(inspector=self.inspector, father_name='Karim')
+        self.client.force_login(admin_user)
+        response = self.client.get(f'/admin/accounts/inspection/{inspection.id}/change/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['adminform'].form.initial['father_name'], 'Karim')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ArchiveTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.inspector = make_user('inspector@example.com')
+        self.client = APIClient()
+        self.client.force_authenticate(self.inspector)
+        self.old = Inspection.objects.create(
+            inspector=self.inspector, client_name='Rahim Textiles', status='Approved',
+            father_name='Karim', cash_balance='5 lac', checklist_items={'trade_license': True},
+        )
+        Inspection.objects.create(inspector=self.inspector, status='Approved', father_name='Jamal')
+        pending = Inspection.objects.create(inspector=self.inspector, status='Pending', father_name='Kamal')
+        long_ago = timezone.now() - timedelta(days=1000)
+        Inspection.objects.filter(pk__in=[self.old.pk, pending.pk]).update(created_at=long_ago)
+
+    def test_archive_and_retrieve(self):
+        url = f'/api/inspections/{self.old.id}/'
+        before = self.client.get(url).data
+        updated_at = Inspection.objects.get(pk=self.old.pk).updated_at
+
+        self.assertEqual(archive(), 1)
+        self.assertEqual(archive(), 0)
+        self.assertEqual(InspectionArchive.objects.get().inspection_id, self.old.pk)
+        self.assertFalse(InspectionOwnerSection.objects.filter(inspection=self.old).exists())
+        self.assertEqual(InspectionOwnerSection.objects.count(), 2)
+        self.assertEqual(Inspection.objects.get(pk=self.old.pk).updated_at, updated_at)
+
+        cache.clear()
+        self.assertEqual(self.client.get(url).data, before)
+        rows = list(export_rows(Inspection.objects.filter(pk=self.old.pk), ['id', 'client_name', 'father_name', 'godown_location']))
+        self.assertEqual(rows, [(self.old.pk, 'Rahim Textiles', 'Karim', None)])
+
+    def test_edit_restores_sections(self):
+        archive()
+        response = self.client.patch(f'/api/inspections/{self.old.id}/', {'cash_balance': '6 lac'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['father_name'], 'Karim')
+
+        self.assertFalse(InspectionArchive.objects.exists())
+        inspection = Inspection.objects.get(pk=self.old.pk)
+        self.assertFalse(inspection.archived)
+        self.assertEqual(InspectionAssetSection.objects.get(inspection=inspection).cash_balance, '6 lac')
+        self.assertEqual(inspection.cash_balance_value, Decimal('600000.00'))
+        self.assertEqual(inspection.checklist_items, {'trade_license': True})
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class QueryCountTests(TestCase):
+    """Every list costs the same number of queries for a few rows as for many: no per-row lookups"""
+
+    SIZES = (2, 10)
+    ENDPOINTS = [
+        ('inspector', '/api/inspections/'),
+        ('inspector', '/api/inspections/?expand=site_photos,father_name,cash_balance'),
+        ('inspector', '/api/inspections/by_status/?status=Pending'),
+        ('inspector', '/api/new-inspections/list/'),
+        ('branch_admin', '/api/new-inspections/list/'),
+        ('inspector', '/api/sync/'),
+        ('admin', '/api/inspections/export/?columns=id,client_name,father_name,inspector_email'),
+        ('admin', '/api/inspections/search/?q=rahim'),
+        ('admin', '/api/inspections/duplicates/?client_name=Rahim+Textiles'),
+        ('admin', '/api/inspections/inspector_wise/'),
+        ('branch_admin', '/api/inspector/list/'),
+        ('admin', '/admin/accounts/inspection/'),
+        ('admin', '/admin/accounts/newinspection/'),
+    ]
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.users = {
+            'inspector': make_user('inspector@example.com'),
+            'branch_admin': make_user('branch@example.com', role='branch_admin'),
+            'admin': make_user('admin@example.com', role='admin'),
+        }
+        CustomUser.objects.filter(pk=self.users['admin'].pk).update(is_staff=True, is_superuser=True)
+        self.seeded = 0
+
+    def seed(self, total):
+        """Rows up to `total` each: the inspector's inspections, and assignments and inspections of other inspectors"""
+        inspector = self.users['inspector']
+        for n in range(self.seeded, total):
+            Inspection.objects.create(
+                inspector=inspector, client_name=f'Rahim Textiles {n}', father_name='Karim', cash_balance='5 lac',
+                site_photos=[{'name': f'{n}.jpg', 'base64_data': base64.b64encode(b'photo %d' % n).decode()}],
+            )
+            other = make_user(f'inspector{n}@example.com')
+            Inspection.objects.create(inspector=other, client_name=f'Rahim Textiles {n}')
+            for assignee in (inspector, other):
+                NewInspection.objects.create(
+                    project=f'Project {n}', client_name='Rahim Textiles', industry_name='Textiles',
+                    phone_number='01711000000', assigned_inspector=assignee, branch_name='Dhaka',
+                )
+        self.seeded = total
+
+    def count_queries(self, role, url):
+        cache.clear()
+        client = APIClient()
+        if url.startswith('/admin/'):
+            client.force_login(self.users[role])
+        else:
+            client.force_authenticate(self.users[role])
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def test_query_counts_do_not_grow_with_rows(self):
+        counts = {endpoint: [] for endpoint in self.ENDPOINTS}
+        for size in self.SIZES:
+            self.seed(size)
+            for endpoint in self.ENDPOINTS:
+                counts[endpoint].append(self.count_queries(*endpoint))
+        for endpoint, (few, many) in counts.items():
+            with self.subTest(endpoint=endpoint):
+                self.assertEqual(few, many)
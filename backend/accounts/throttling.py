@@ -0,0 +1,168 @@
+# throttling.py
+"""
+Token-bucket request throttles.
+
+Each bucket holds `capacity` tokens and refills at capacity per period; a
+request takes one token or gets 429 with Retry-After. Rates are set per
+scope in REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] in DRF's "N/period" form
+(None disables a scope). Buckets live in the default cache, which must be
+shared (CACHE_BACKEND=redis) for limits to hold across worker processes.
+
+A bucket is stored as a single number, its "theoretical arrival time"
+(GCRA): the moment it would be full again. Like DRF's own throttles the
+update is read-then-write, so concurrent requests on one key may let a
+couple of extra requests through; the limits are for admission control,
+not accounting.
+"""
+import math
+import time
+
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+KEY_PREFIX = 'throttle'
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60); None -> None"""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class TokenBucket:
+
+    def __init__(self, key, capacity, period):
+        self.key = f'{KEY_PREFIX}:{key}'
+        self.period = period
+        # One token per interval; up to `capacity` at once
+        self.interval = period / capacity
+        self.tolerance = period - self.interval
+
+    def _state(self, now):
+        return max(cache.get(self.key, now), now)
+
+    def wait(self, now=None):
+        """Seconds until a token is available (0 if one is now)"""
+        now = time.time() if now is None else now
+        return max(0.0, self._state(now) - now - self.tolerance)
+
+    def consume(self, now=None):
+        """Take a token; returns (allowed, seconds to wait if not)"""
+        now = time.time() if now is None else now
+        arrival = self._state(now)
+        if arrival - now > self.tolerance:
+            return False, arrival - now - self.tolerance
+        arrival += self.interval
+        # Once it has refilled, the bucket is as good as absent
+        cache.set(self.key, arrival, math.ceil(arrival - now) + 1)
+        return True, 0.0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Subclasses set `scope` and say what a bucket is keyed on"""
+    scope = None
+
+    def get_key(self, request, view):
+        """Bucket key for this request, or None to let it through unthrottled"""
+        raise NotImplementedError
+
+    def get_bucket(self, request, view):
+        rate = parse_rate(api_settings.DEFAULT_THROTTLE_RATES.get(self.scope))
+        key = self.get_key(request, view)
+        if rate is None or key is None:
+            return None
+        return TokenBucket(f'{self.scope}:{key}', *rate)
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(request, view)
+        if bucket is None:
+            return True
+        allowed, self._wait = bucket.consume()
+        return allowed
+
+    def wait(self):
+        return math.ceil(self._wait)
+
+
+class UserRateThrottle(TokenBucketThrottle):
+    """Every request, per user (per client IP when anonymous)"""
+    scope = 'user'
+
+    def get_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+
+class WriteRateThrottle(UserRateThrottle):
+    """Requests that change data, per user"""
+    scope = 'write'
+
+    def get_key(self, request, view):
+        if request.method in ('GET', 'HEAD', 'OPTIONS'):
+            return None
+        return super().get_key(request, view)
+
+
+class IPRateThrottle(TokenBucketThrottle):
+    """Per client IP; REST_FRAMEWORK['NUM_PROXIES'] says which X-Forwarded-For entry to trust"""
+
+    def get_key(self, request, view):
+        return self.get_ident(request)
+
+
+class AccountRateThrottle(TokenBucketThrottle):
+    """Per account named in the request body, whichever IPs the requests come from"""
+
+    def get_key(self, request, view):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return email.strip().lower()
+
+
+class LoginRateThrottle(IPRateThrottle):
+    scope = 'login'
+
+
+class LoginFailureThrottle(AccountRateThrottle):
+    """
+    Failed logins per account and client IP. Only failures take tokens (the
+    view calls record_failure()), so an account's owner is never limited by
+    their own successful logins; once the bucket is empty every attempt on
+    that account from that IP is refused, right password or not, until it
+    refills. Keyed on the account alone, anybody could lock a user out by
+    failing on purpose; the login scope still caps each IP over all accounts.
+    """
+    scope = 'login_failure'
+
+    def get_key(self, request, view):
+        account = super().get_key(request, view)
+        if account is None:
+            return None
+        return f'{account}:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        bucket = self.get_bucket(request, view)
+        if bucket is None:
+            return True
+        self._wait = bucket.wait()
+        return self._wait == 0
+
+    def record_failure(self, request, view=None):
+        bucket = self.get_bucket(request, view)
+        if bucket is not None:
+            bucket.consume()
+
+
+class PasswordResetRateThrottle(IPRateThrottle):
+    scope = 'password_reset'
+
+
+class PasswordResetAccountThrottle(AccountRateThrottle):
+    """Reset emails per account, so nobody can mail-bomb an address"""
+    scope = 'password_reset_account'
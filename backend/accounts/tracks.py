@@ -0,0 +1,309 @@
+# tracks.py
+"""
+Packed storage for inspection GPS tracks.
+
+A track is a byte string: a format version byte, then one record per point.
+Each record is a flags varint, the zigzag varint deltas of latitude and
+longitude (in 1e-7 degrees) from the previous point, the delta of the
+timestamp (milliseconds) from the previous timed point, and the optional
+readings present in the flags as absolute zigzag varints in hundredths.
+A point costs 6-10 bytes instead of ~200 as JSON, and appending only needs
+the last point, which LocationTrack keeps in its summary columns.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMAT_VERSION = 1
+COORD_SCALE = 10 ** 7
+HAS_TIMESTAMP = 1
+# Optional readings: (point key, flag bit), stored in hundredths
+OPTIONAL_READINGS = (
+    ('accuracy', 2),
+    ('altitude', 4),
+    ('speed', 8),
+    ('heading', 16),
+)
+
+
+# -------------------- Codec --------------------
+
+def _write_varint(out, value):
+    value = (value << 1) ^ (value >> 63)  # zigzag: small negatives stay small
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return (result >> 1) ^ -(result & 1), pos
+        shift += 7
+
+
+def parse_timestamp(value):
+    """Milliseconds since the epoch from an ISO string or a number of milliseconds"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    moment = parse_datetime(str(value))
+    if moment is None:
+        raise ValueError(f"invalid timestamp {value!r}")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, dt_timezone.utc)
+    return round(moment.timestamp() * 1000)
+
+
+def to_datetime(ms):
+    # Integer arithmetic: ms / 1000 as a float can land a microsecond early
+    return datetime.fromtimestamp(ms // 1000, tz=dt_timezone.utc) + timedelta(milliseconds=ms % 1000)
+
+
+def format_timestamp(ms):
+    """ISO 8601 in UTC with milliseconds, as the browser's toISOString() writes it"""
+    return to_datetime(ms).strftime('%Y-%m-%dT%H:%M:%S.') + f'{ms % 1000:03d}Z'
+
+
+def _number(point, key):
+    value = point.get(key)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(f"{key} must be a number")
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(f"{key} must be a finite number")
+    return value
+
+
+def parse_point(point):
+    """
+    (lat_e7, lng_e7, timestamp_ms, {reading: hundredths}) from a client point
+    dict; keys other than the coordinates, timestamp and OPTIONAL_READINGS are
+    not stored
+    """
+    if not isinstance(point, dict):
+        raise ValueError("point must be an object")
+    latitude = _number(point, 'latitude')
+    longitude = _number(point, 'longitude')
+    if latitude is None or longitude is None:
+        raise ValueError("latitude and longitude are required")
+    if not -90 <= latitude <= 90 or not -180 <= longitude <= 180:
+        raise ValueError("latitude/longitude out of range")
+    readings = {}
+    for key, _ in OPTIONAL_READINGS:
+        value = _number(point, key)
+        if value is not None:
+            readings[key] = round(value * 100)
+    return (
+        round(latitude * COORD_SCALE),
+        round(longitude * COORD_SCALE),
+        parse_timestamp(point.get('timestamp')),
+        readings,
+    )
+
+
+def parse_points(points):
+    """Parse a list of client points; the ValueError names the offending index"""
+    if not isinstance(points, (list, tuple)):
+        raise ValueError("points must be a list")
+    parsed = []
+    for index, point in enumerate(points):
+        try:
+            parsed.append(parse_point(point))
+        except ValueError as e:
+            raise ValueError(f"point {index}: {e}")
+    return parsed
+
+
+def encode(parsed, state=None):
+    """
+    Pack parsed points. `state` is the (lat_e7, lng_e7, timestamp_ms) the deltas
+    start from; None starts a new track (and writes the version byte).
+    Returns (bytes, state after the last point).
+    """
+    out = bytearray()
+    if state is None:
+        out.append(FORMAT_VERSION)
+        state = (0, 0, 0)
+    lat, lng, ts = state
+    for p_lat, p_lng, p_ts, readings in parsed:
+        flags = HAS_TIMESTAMP if p_ts is not None else 0
+        for key, bit in OPTIONAL_READINGS:
+            if key in readings:
+                flags |= bit
+        _write_varint(out, flags)
+        _write_varint(out, p_lat - lat)
+        _write_varint(out, p_lng - lng)
+        lat, lng = p_lat, p_lng
+        if p_ts is not None:
+            _write_varint(out, p_ts - ts)
+            ts = p_ts
+        for key, bit in OPTIONAL_READINGS:
+            if flags & bit:
+                _write_varint(out, readings[key])
+    return bytes(out), (lat, lng, ts)
+
+
+def decode(data):
+    """Points as the client sent them: latitude, longitude, timestamp and any readings"""
+    data = bytes(data or b'')
+    if not data:
+        return []
+    if data[0] != FORMAT_VERSION:
+        raise ValueError(f"unknown track format {data[0]}")
+    points = []
+    lat = lng = ts = 0
+    pos = 1
+    while pos < len(data):
+        flags, pos = _read_varint(data, pos)
+        d_lat, pos = _read_varint(data, pos)
+        d_lng, pos = _read_varint(data, pos)
+        lat += d_lat
+        lng += d_lng
+        point = {'latitude': lat / COORD_SCALE, 'longitude': lng / COORD_SCALE, 'timestamp': None}
+        if flags & HAS_TIMESTAMP:
+            d_ts, pos = _read_varint(data, pos)
+            ts += d_ts
+            point['timestamp'] = format_timestamp(ts)
+        for key, bit in OPTIONAL_READINGS:
+            if flags & bit:
+                value, pos = _read_varint(data, pos)
+                point[key] = value / 100
+        points.append(point)
+    return points
+
+
+# -------------------- Summaries --------------------
+
+def track_fields(parsed, current=None):
+    """
+    Column values for a track holding `current`'s points plus `parsed`
+    (a new track when `current` is None). Works on historical models too.
+    """
+    if current is not None and current.point_count:
+        state = (
+            round(current.last_latitude * COORD_SCALE),
+            round(current.last_longitude * COORD_SCALE),
+            round(current.last_timestamp.timestamp() * 1000) if current.last_timestamp else 0,
+        )
+        data, _ = encode(parsed, state)
+        fields = {
+            'data': bytes(current.data) + data,
+            'point_count': current.point_count,
+            'first_latitude': current.first_latitude,
+            'first_longitude': current.first_longitude,
+            'first_timestamp': current.first_timestamp,
+            'last_timestamp': current.last_timestamp,
+            'min_latitude': current.min_latitude,
+            'max_latitude': current.max_latitude,
+            'min_longitude': current.min_longitude,
+            'max_longitude': current.max_longitude,
+        }
+    else:
+        data, _ = encode(parsed)
+        fields = {
+            'data': data if parsed else b'', 'point_count': 0,
+            'first_latitude': None, 'first_longitude': None, 'first_timestamp': None, 'last_timestamp': None,
+            'min_latitude': None, 'max_latitude': None, 'min_longitude': None, 'max_longitude': None,
+        }
+
+    for lat_e7, lng_e7, ts, _ in parsed:
+        latitude, longitude = lat_e7 / COORD_SCALE, lng_e7 / COORD_SCALE
+        if not fields['point_count']:
+            fields.update(
+                first_latitude=latitude, first_longitude=longitude,
+                first_timestamp=to_datetime(ts) if ts is not None else None,
+                min_latitude=latitude, max_latitude=latitude, min_longitude=longitude, max_longitude=longitude,
+            )
+        fields['point_count'] += 1
+        fields['last_latitude'], fields['last_longitude'] = latitude, longitude
+        if ts is not None:
+            # The codec's timestamp deltas run from the last timed point
+            fields['last_timestamp'] = to_datetime(ts)
+        fields['min_latitude'] = min(fields['min_latitude'], latitude)
+        fields['max_latitude'] = max(fields['max_latitude'], latitude)
+        fields['min_longitude'] = min(fields['min_longitude'], longitude)
+        fields['max_longitude'] = max(fields['max_longitude'], longitude)
+    fields.setdefault('last_latitude', current.last_latitude if current is not None else None)
+    fields.setdefault('last_longitude', current.last_longitude if current is not None else None)
+    return fields
+
+
+def point_summary(latitude, longitude, moment):
+    if latitude is None:
+        return None
+    return {
+        'latitude': latitude,
+        'longitude': longitude,
+        'timestamp': format_timestamp(round(moment.timestamp() * 1000)) if moment else None,
+    }
+
+
+def track_summary(track):
+    """Count, ends and bounding box of a track, read from its summary columns"""
+    if track is None or not track.point_count:
+        return {'point_count': 0, 'first': None, 'last': None, 'bbox': None}
+    return {
+        'point_count': track.point_count,
+        'first': point_summary(track.first_latitude, track.first_longitude, track.first_timestamp),
+        'last': point_summary(track.last_latitude, track.last_longitude, track.last_timestamp),
+        'bbox': [track.min_longitude, track.min_latitude, track.max_longitude, track.max_latitude],
+    }
+
+
+# -------------------- Writes --------------------
+
+def write_track(inspection, parsed):
+    """Replace the inspection's track with `parsed` points"""
+    from .geo import index_points
+    from .models import LocationTrack
+    from .polyline import schedule_polylines
+
+    # Cached polylines describe the old points
+    fields = dict(track_fields(parsed), polylines={})
+    track, _ = LocationTrack.objects.update_or_create(inspection=inspection, defaults=fields)
+    index_points(inspection.pk, parsed, replace=True)
+    if track.point_count:
+        schedule_polylines(inspection.pk)
+    return track
+
+
+def append_points(inspection, parsed):
+    """
+    Add points to the end of the inspection's track. Only the track row and the
+    inspection's point count / updated_at are written, never the inspection's
+    other columns.
+    """
+    from .geo import index_points
+    from .models import Inspection, LocationTrack
+    from .polyline import schedule_polylines
+
+    with transaction.atomic():
+        track, _ = LocationTrack.objects.select_for_update().get_or_create(inspection=inspection)
+        for name, value in track_fields(parsed, track).items():
+            setattr(track, name, value)
+        track.polylines = {}
+        track.save()
+        index_points(inspection.pk, parsed)
+        # updated_at moves so ETags and /api/sync/ see the new points
+        Inspection.objects.filter(pk=inspection.pk).update(
+            total_location_points=track.point_count, updated_at=timezone.now()
+        )
+        schedule_polylines(inspection.pk)
+    inspection.total_location_points = track.point_count
+    return track
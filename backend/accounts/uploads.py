@@ -0,0 +1,112 @@
+# uploads.py
+import os
+
+from django.conf import settings
+
+from .media import attach_blob, file_sha256, store_blob_from_path
+from .models import UploadSession
+
+
+class UploadError(Exception):
+    """Raised for chunks that cannot be applied; carries the HTTP status to answer with"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def part_path(session):
+    return os.path.join(settings.UPLOAD_SESSION_DIR, f"{session.id}.part")
+
+
+def parse_content_range(header):
+    """
+    Parse "bytes <start>-<end>/<total>" into (start, end, total).
+    Returns None for a missing or malformed header.
+    """
+    if not header or not header.startswith('bytes '):
+        return None
+    try:
+        span, total = header[6:].split('/', 1)
+        start, end = span.split('-', 1)
+        return int(start), int(end), int(total)
+    except ValueError:
+        return None
+
+
+def write_chunk(session, stream, offset, length):
+    """
+    Stream `length` bytes from `stream` into the session's part file at `offset`.
+
+    Memory use is bounded by UPLOAD_READ_SIZE whatever the chunk size. Bytes
+    before `session.received` were already stored (a client retrying after a
+    dropped connection), so they are read and discarded. Returns the new offset.
+    """
+    if session.status != UploadSession.STATUS_OPEN:
+        raise UploadError('Upload session is already complete', 409)
+    if offset > session.received:
+        raise UploadError(f'Chunk starts at {offset} but only {session.received} bytes were received', 409)
+    if offset + length > session.total_size:
+        raise UploadError('Chunk extends past the declared file size', 400)
+
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    read_size = settings.UPLOAD_READ_SIZE
+    skip = session.received - offset
+    written = 0
+
+    with open(path, 'r+b' if os.path.exists(path) else 'wb') as fh:
+        fh.seek(session.received)
+        remaining = length
+        while remaining > 0:
+            data = stream.read(min(read_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            if skip:
+                drop = min(skip, len(data))
+                skip -= drop
+                data = data[drop:]
+            if data:
+                fh.write(data)
+                written += len(data)
+
+    # A client that went away mid-chunk keeps what arrived and resumes from there
+    new_offset = session.received + written
+    # Only advance if nobody else moved the offset meanwhile
+    updated = UploadSession.objects.filter(
+        pk=session.pk, received=session.received
+    ).update(received=new_offset)
+    if not updated:
+        session.refresh_from_db(fields=['received'])
+        raise UploadError('Upload session was modified concurrently', 409)
+    session.received = new_offset
+    return new_offset
+
+
+def complete_session(session, inspection, expected_sha256=None):
+    """Move the finished part file into the blob store and attach it to `inspection`"""
+    if session.status != UploadSession.STATUS_OPEN:
+        raise UploadError('Upload session is already complete', 409)
+    if session.received != session.total_size:
+        raise UploadError(f'Upload incomplete: {session.received}/{session.total_size} bytes received', 409)
+
+    path = part_path(session)
+    sha256 = file_sha256(path)
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        raise UploadError('Checksum mismatch', 422)
+
+    blob = store_blob_from_path(path, session.total_size, session.mime_type, sha256=sha256)
+    attachment = attach_blob(inspection, blob, session.kind, name=session.file_name)
+    session.status = UploadSession.STATUS_COMPLETE
+    session.attachment = attachment
+    session.save(update_fields=['status', 'attachment', 'updated_at'])
+    discard_part(session)
+    return attachment
+
+
+def discard_part(session):
+    try:
+        os.remove(part_path(session))
+    except FileNotFoundError:
+        pass
@@ -11,11 +11,13 @@ from .views import (
     update_user, delete_user,
     InspectionViewSet, branch_admin_stats,
     create_new_inspection, list_new_inspections,
-    get_current_user  # NEW IMPORT
+    get_current_user,  # NEW IMPORT
+    UploadSessionViewSet
 )
 
 router = DefaultRouter()
 router.register(r'inspections', InspectionViewSet, basename='inspection')
+router.register(r'uploads', UploadSessionViewSet, basename='upload')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -31,6 +33,10 @@ urlpatterns = [
     path('user/delete/<int:user_id>/', delete_user),
     path('inspection/stats/', views.inspection_stats, name='inspection_stats'),
     path('branch/inspection-stats/', branch_admin_stats, name='branch_admin_stats'),
+    path('cache/stats/', views.response_cache_stats, name='response-cache-stats'),
+    path('portfolio/', views.inspection_portfolio, name='inspection-portfolio'),
+    path('analytics/', views.inspection_analytics, name='inspection-analytics'),
+    path('media/<path:path>', views.media_file, name='media-file'),
 
     # NEW URLs ADDED for inspector dashboard
     path('inspections/stats/', views.InspectionViewSet.as_view({'get': 'stats'}), name='inspections-stats'),
@@ -42,4 +48,12 @@ urlpatterns = [
     
     # NEW URL for current user
     path('current-user/', get_current_user, name='current-user'),
-]
+
+    # Delta sync of an inspector's assigned work
+    path('sync/', views.sync_changes, name='sync'),
+
+    # Spatial queries over inspection track points
+    path('geo/radius/', views.inspections_within_radius, name='geo-radius'),
+    path('geo/bbox/', views.inspections_within_bbox, name='geo-bbox'),
+    path('geo/nearest/', views.nearest_inspections, name='geo-nearest'),
+]
@@ -1,6 +1,9 @@
 # views.py
+import mimetypes
+
 from rest_framework.views import APIView
-from django.http import JsonResponse
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, JsonResponse
 from .models import Inspection, NewInspection
 from django.contrib.auth.decorators import login_required
 
@@ -13,7 +16,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Inspection, NewInspection
-from .serializers import InspectionSerializer, InspectionCreateSerializer, NewInspectionSerializer
+from .serializers import InspectionSerializer, InspectionCreateSerializer, InspectionListSerializer, NewInspectionSerializer
 from rest_framework.response import Response
 from rest_framework import status, generics
 from .auth_serializers import CustomTokenObtainSerializer
@@ -22,21 +25,55 @@ from .models import CustomUser
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
 from django.utils.encoding import force_bytes, force_str
-from django.core.mail import send_mail
 from django.conf import settings
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
 from django.db.models import Count, Q
+from django.db import transaction
+from rest_framework import mixins
+from .models import InspectionDailyRollup, MediaBlob, UploadSession
+from .serializers import DuplicateInspectionSerializer, InspectionSearchResultSerializer, UploadSessionSerializer
+from rest_framework.exceptions import NotFound, ValidationError
+from asgiref.sync import sync_to_async
+from .asyncapi import async_api_view
+from .bulk import DEFAULT_COLUMNS, FORMATS, export_chunks, export_queryset, parse_export_params, streaming_export
+from .clients import find_duplicates, parse_duplicate_params
+from .conditional import aconditional_response, aqueryset_validators, body_etag, conditional_response, queryset_validators
+from .pagination import KeysetPagination
+from .portfolio import parse_portfolio_params, portfolio_summary
+from .response_cache import branch_scope, cache_stats, cached_response, user_scope
+from .rollups import analytics, parse_analytics_params
+from .search import parse_search_params, search as search_inspections
+from .sections import section_accessors
+from .stats import adashboard_stats, dashboard_stats, parse_stats_params
+from .sync import SyncTokenError, changes
+from .tracks import append_points, parse_points, track_summary
+from .polyline import DEFAULT_ZOOM, MAX_ZOOM, MIN_ZOOM, track_polyline
+from .geo import nearest, within_bbox, within_radius
+from .models import InspectionLocation
+from .models import SyncTombstone
+from .images import first_thumbnail_path
+from .jobs import enqueue
+from .media import served_sha256
+from .throttling import (
+    LoginFailureThrottle, LoginRateThrottle, PasswordResetAccountThrottle, PasswordResetRateThrottle,
+    UserRateThrottle,
+)
+from .uploads import UploadError, complete_session, discard_part, parse_content_range, write_chunk
 
 
 # JWT Login
 class CustomTokenObtainView(APIView):
     permission_classes = []
+    # Refused before the (deliberately slow) password hash is computed
+    throttle_classes = [LoginRateThrottle, LoginFailureThrottle]
     def post(self, request):
         ser = CustomTokenObtainSerializer(data=request.data)
-        ser.is_valid(raise_exception=True)
+        if not ser.is_valid():
+            LoginFailureThrottle().record_failure(request)
+            raise ValidationError(ser.errors)
         return Response(ser.validated_data)
 
 # List/Create users (super admin can create branch admins/inspectors)
@@ -48,6 +85,7 @@ class UserListCreateView(generics.ListCreateAPIView):
 # Forgot password
 class PasswordResetView(APIView):
     permission_classes = []
+    throttle_classes = [PasswordResetRateThrottle, PasswordResetAccountThrottle]
     def post(self, request):
         ser = PasswordResetSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
@@ -59,17 +97,18 @@ class PasswordResetView(APIView):
         uid = urlsafe_base64_encode(force_bytes(user.pk))
         token = default_token_generator.make_token(user)
         reset_url = f"{settings.FRONTEND_URL}/reset-password?uid={uid}&token={token}"
-        send_mail(
-            subject='InvestTracker Password Reset',
-            message=f'Click here to reset your password:\n\n{reset_url}',
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[user.email],
-        )
+        # Sent by the job worker: SMTP never holds up (or times) the request
+        enqueue('send_email', {
+            'subject': 'InvestTracker Password Reset',
+            'message': f'Click here to reset your password:\n\n{reset_url}',
+            'recipient_list': [user.email],
+        })
         return Response({'detail': 'If that email exists, a reset link was sent.'})
 
 # Confirm password reset
 class PasswordResetConfirmView(APIView):
     permission_classes = []
+    throttle_classes = [PasswordResetRateThrottle]
     def post(self, request):
         ser = PasswordResetConfirmSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
@@ -102,6 +141,7 @@ def create_branch_admin(request):
 
 # Admin lists Branch Admins
 @api_view(['GET'])
+@cached_response(['users'])
 def list_branch_admins(request):
     admins = CustomUser.objects.filter(role='branch_admin')
     serializer = UserSerializer(admins, many=True)
@@ -121,6 +161,7 @@ def create_inspector(request):
 # Branch Admin lists Inspectors in his branch
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@cached_response(['users'], scope=branch_scope)
 def list_inspectors(request):
     # logged-in user থেকে branch_name নাও
     branch_name = request.user.branch_name
@@ -197,9 +238,8 @@ def create_new_inspection(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def list_new_inspections(request):
+@async_api_view(permission_classes=[IsAuthenticated])
+async def list_new_inspections(request):
     """
     List all new inspections (for branch admin/admin and inspectors)
     """
@@ -220,12 +260,28 @@ def list_new_inspections(request):
         else:
             # For super admin, show all inspections
             inspections = NewInspection.objects.all()
+
+        # Optional status filter, e.g. an inspector's pending work queue
+        status_param = request.query_params.get('status')
+        if status_param:
+            inspections = inspections.filter(status=status_param)
         
-        inspections = inspections.order_by('-created_at')
-        serializer = NewInspectionSerializer(inspections, many=True)
-        
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        @sync_to_async
+        def render():
+            paginator = KeysetPagination()
+            # assigned_inspector_name: one joined query, not one per row
+            page = paginator.paginate_queryset(inspections.select_related('assigned_inspector'), request)
+            serializer = NewInspectionSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        # Unchanged lists cost one aggregate and an empty 304, all on the event loop;
+        # a changed page is rendered in one thread hop
+        # assigned_inspector_name comes from the users table
+        etag, last_modified = await aqueryset_validators(request, inspections, namespaces=('users',))
+        return await aconditional_response(request, etag, last_modified, render)
         
+    except NotFound as e:
+        return Response({"error": str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
     except Exception as e:
         print(f"🚨 Error in list_new_inspections: {str(e)}")
         return Response(
@@ -234,11 +290,10 @@ def list_new_inspections(request):
         )
 
 # NEW: Get current user information
-@api_view(['GET'])
-@permission_classes([IsAuthenticated])
-def get_current_user(request):
+@async_api_view(permission_classes=[IsAuthenticated])
+async def get_current_user(request):
     """
-    Get current user information
+    Get current user information (authentication already loaded the user: no query)
     """
     try:
         user = request.user
@@ -250,25 +305,99 @@ def get_current_user(request):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
+def role_inspections(user):
+    """Inspections across users: every branch for admins, their own branch for branch admins, else their own"""
+    if user.role == 'admin':
+        return Inspection.objects.all()
+    if user.role == 'branch_admin':
+        return Inspection.objects.filter(branch_name=user.branch_name)
+    return Inspection.objects.filter(inspector=user)
+
 # Inspection ViewSet - EXISTING CODE (NO CHANGES)
 class InspectionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['investment_category', 'status', 'legal_status']
+    pagination_class = KeysetPagination
     
+    # Read actions that honour ?fields= / ?expand=
+    sparse_actions = ('list', 'by_status', 'retrieve')
+    list_actions = ('list', 'by_status')
+
     def get_queryset(self):
         # Users can only see their own inspections
-        return Inspection.objects.filter(inspector=self.request.user)
+        queryset = Inspection.objects.filter(inspector=self.request.user)
+        if self.action in self.sparse_actions:
+            # Never SELECT columns the response will not contain
+            serializer = self.get_serializer()
+            queryset = queryset.only(*serializer.model_columns())
+            related = serializer.related_objects()
+            if related:
+                queryset = queryset.select_related(*related)
+            if 'photo_count' in serializer.fields:
+                # Meta.ordering is not applied to aggregate queries
+                queryset = queryset.annotate(
+                    photo_count=Count('attachments', filter=Q(attachments__kind='photo'))
+                ).order_by('-created_at')
+            if 'thumbnail_url' in serializer.fields:
+                # Thumbnail of the first photo, for list rows
+                queryset = queryset.annotate(thumbnail_path=first_thumbnail_path())
+        elif self.action in ('track', 'track_polyline'):
+            # The track endpoints never need the inspection's own columns
+            queryset = queryset.only('id', 'inspector', 'total_location_points').select_related('track')
+        elif self.action in ('update', 'partial_update', 'update_status'):
+            # The response carries inspector_name and every section; join them rather than load each on first use
+            queryset = queryset.select_related('inspector', *section_accessors())
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'create':
             return InspectionCreateSerializer
+        if self.action in self.list_actions:
+            return InspectionListSerializer
         return InspectionSerializer
+
+    def validator_queryset(self):
+        # Plain rows for ETags: the photo_count annotation would turn the
+        # max/count aggregate into a subquery
+        return Inspection.objects.filter(inspector=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.validator_queryset())
+        # inspector_name comes from the users table
+        etag, last_modified = queryset_validators(request, queryset, namespaces=('users',))
+        return conditional_response(
+            request, etag, last_modified, lambda: super(InspectionViewSet, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            queryset = self.validator_queryset().filter(pk=kwargs['pk'])
+        except ValueError:
+            return super().retrieve(request, *args, **kwargs)
+        etag, last_modified = queryset_validators(request, queryset, namespaces=('users',))
+        return conditional_response(
+            request, etag, last_modified, lambda: super(InspectionViewSet, self).retrieve(request, *args, **kwargs)
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in self.sparse_actions:
+            kwargs.setdefault('fields', self._query_list('fields'))
+            kwargs.setdefault('expand', self._query_list('expand'))
+        return super().get_serializer(*args, **kwargs)
+
+    def role_queryset(self):
+        return role_inspections(self.request.user)
+
+    def _query_list(self, param):
+        value = self.request.query_params.get(param, '')
+        return [name.strip() for name in value.split(',') if name.strip()]
     
     def perform_create(self, serializer):
         serializer.save(inspector=self.request.user)
     
     @action(detail=False, methods=['get'])
+    @cached_response(['inspections', 'users'])
     def inspector_wise(self, request):
         # Get inspections grouped by inspector
         inspectors = CustomUser.objects.filter(
@@ -277,55 +406,24 @@ class InspectionViewSet(viewsets.ModelViewSet):
             total_inspections=Count('inspections')
         ).values('id', 'user_name', 'email', 'total_inspections')
         
-        return Response(inspectors)
+        return Response(list(inspectors))
     
     # NEW METHOD ADDED: Get inspection statistics for current inspector
     @action(detail=False, methods=['get'])
+    @body_etag
     def stats(self, request):
         """
         Get inspection statistics for the logged-in inspector
+        (optional date_from / date_to / group_by)
         """
-        user = request.user
+        try:
+            options = parse_stats_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            # Get total inspections for this inspector
-            total = Inspection.objects.filter(inspector=user).count()
-            
-            # Get counts by status
-            pending = Inspection.objects.filter(
-                inspector=user, 
-                status='Pending'
-            ).count()
-            
-            in_progress = Inspection.objects.filter(
-                inspector=user, 
-                status='In Progress'
-            ).count()
-            
-            completed = Inspection.objects.filter(
-                inspector=user, 
-                status='Completed'
-            ).count()
-            
-            approved = Inspection.objects.filter(
-                inspector=user, 
-                status='Approved'
-            ).count()
-            
-            rejected = Inspection.objects.filter(
-                inspector=user, 
-                status='Rejected'
-            ).count()
-            
-            stats_data = {
-                'total': total,
-                'pending': pending,
-                'in_progress': in_progress,
-                'completed': completed,
-                'approved': approved,
-                'rejected': rejected,
-            }
-            
+            # All status buckets in a single aggregate query
+            stats_data = dashboard_stats(inspector=request.user, **options)
             return Response(stats_data, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -340,30 +438,83 @@ class InspectionViewSet(viewsets.ModelViewSet):
         """
         Get inspections filtered by status for the logged-in inspector
         """
-        user = request.user
         status_param = request.query_params.get('status', 'all')
         
         try:
-            queryset = Inspection.objects.filter(inspector=user)
+            queryset = self.get_queryset()
             
             # Filter by status if provided and not 'all'
             if status_param and status_param != 'all':
                 queryset = queryset.filter(status=status_param)
             
-            # Order by latest first
-            queryset = queryset.order_by('-created_at')
+            # Latest first, one keyset page at a time
+            page = self.paginate_queryset(queryset)
+            serializer = self.get_serializer(page, many=True)
             
-            # Serialize the data
-            serializer = InspectionSerializer(queryset, many=True)
-            
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self.get_paginated_response(serializer.data)
             
+        except NotFound as e:
+            return Response({'error': str(e.detail)}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Stream inspections as CSV or NDJSON (?output=csv|ndjson, ?columns=,
+        ?quarter= or ?created_from= / ?created_to=, ?status=, ?branch_name=).
+        Admins export every branch, branch admins their own, inspectors their own rows.
+        """
+        output = request.query_params.get('output', 'csv')
+        if output not in FORMATS:
+            return Response(
+                {'error': f"output must be one of: {', '.join(FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            options = parse_export_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = export_queryset(self.role_queryset(), **options)
+        columns = options.get('columns', DEFAULT_COLUMNS)
+        return streaming_export(request, export_chunks(queryset, columns, output), output, 'inspections')
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Inspections matching ?q= by name, owner, group, industry or phone
+        number, best match first (the last word matches as a prefix, for
+        autocomplete), up to ?limit=. Admins search every branch, branch
+        admins their own, inspectors their own rows.
+        """
+        try:
+            options = parse_search_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = search_inspections(self.role_queryset(), **options)
+        return Response({'results': InspectionSearchResultSerializer(results, many=True).data})
+
+    @action(detail=False, methods=['get'])
+    def duplicates(self, request):
+        """
+        Earlier inspections of the same client, matched on the normalized
+        ?tin_number=, ?account_number=, ?phone_number= and ?client_name=
+        (any of them), strongest match first; ?exclude= leaves out the
+        inspection being edited. Scoped by role like search.
+        """
+        try:
+            options = parse_duplicate_params(request.query_params)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = find_duplicates(self.role_queryset(), **options)
+        return Response({'results': DuplicateInspectionSerializer(results, many=True).data})
+
     # NEW METHOD ADDED: Update inspection status
     @action(detail=True, methods=['patch', 'put'])
     def update_status(self, request, pk=None):
@@ -405,31 +556,386 @@ class InspectionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=True, methods=['get', 'post'])
+    def track(self, request, pk=None):
+        """
+        GET: point count, first/last point and bounding box of the GPS track.
+        POST {"points": [...]}: append points without rewriting the inspection.
+        """
+        inspection = self.get_object()
+        if request.method == 'POST':
+            try:
+                parsed = parse_points(request.data.get('points'))
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            track = append_points(inspection, parsed)
+        else:
+            track = inspection.get_track()
+        return Response(track_summary(track), status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['get'], url_path='track/polyline')
+    def track_polyline(self, request, pk=None):
+        """
+        The GPS track simplified for a map at ?zoom= (0-21, cached per zoom) or
+        to ?tolerance= meters, as an encoded polyline of at most a few hundred points
+        """
+        try:
+            tolerance = request.query_params.get('tolerance')
+            tolerance = float(tolerance) if tolerance else None
+            zoom = int(request.query_params.get('zoom', DEFAULT_ZOOM))
+        except ValueError:
+            return Response({'error': 'zoom must be an integer and tolerance a number'}, status=status.HTTP_400_BAD_REQUEST)
+        if not MIN_ZOOM <= zoom <= MAX_ZOOM or (tolerance is not None and tolerance <= 0):
+            return Response(
+                {'error': f'zoom must be between {MIN_ZOOM} and {MAX_ZOOM} and tolerance positive'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        inspection = self.get_object()
+        data = track_polyline(inspection.get_track(), zoom=zoom, tolerance=tolerance)
+        return Response(dict(data, zoom=None if tolerance is not None else zoom), status=status.HTTP_200_OK)
+
+# -------------------- Chunked Upload Views --------------------
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable uploads for inspection media.
+
+    POST   /uploads/                 open a session (kind, file_name, mime_type, total_size)
+    PUT    /uploads/{id}/            send raw bytes; position from Content-Range or ?offset=
+    GET    /uploads/{id}/            current offset, to resume after a dropped connection
+    POST   /uploads/{id}/complete/   attach the finished file to an inspection
+    DELETE /uploads/{id}/            abort and discard the partial file
+    """
+    permission_classes = [IsAuthenticated]
+    # Chunk PUTs are many and cheap; only the overall per-user limit applies
+    throttle_classes = [UserRateThrottle]
+    serializer_class = UploadSessionSerializer
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(owner=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(owner=self.request.user)
+
+    def perform_destroy(self, instance):
+        discard_part(instance)
+        instance.delete()
+
+    def update(self, request, pk=None):
+        session = self.get_object()
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        content_range = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'))
+
+        if content_range:
+            offset, end, total = content_range
+            if end - offset + 1 != length or total != session.total_size:
+                return Response(
+                    {'error': 'Content-Range does not match the request body', 'offset': session.received},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            try:
+                offset = int(request.query_params.get('offset', session.received))
+            except ValueError:
+                return Response({'error': 'Invalid offset'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Read straight from the request stream so the chunk is never held in memory
+            write_chunk(session, request.stream, offset, length)
+        except UploadError as e:
+            return Response({'error': str(e), 'offset': session.received}, status=e.status_code)
+
+        return Response(self.get_serializer(session).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        inspection_id = request.data.get('inspection')
+        if not inspection_id:
+            return Response({'error': 'Inspection is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            session = self.get_queryset().select_for_update().get(pk=self.get_object().pk)
+            # attach_blob() appends to the inspection's media field: locked so that
+            # sessions finishing together, or a PATCH, cannot drop each other's reference
+            try:
+                inspection = Inspection.objects.select_for_update().get(pk=inspection_id, inspector=request.user)
+            except (Inspection.DoesNotExist, ValueError):
+                return Response({'error': 'Inspection not found'}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                complete_session(session, inspection, expected_sha256=request.data.get('sha256'))
+            except UploadError as e:
+                return Response({'error': str(e), 'offset': session.received}, status=e.status_code)
+
+        return Response(self.get_serializer(session).data, status=status.HTTP_200_OK)
+
+# -------------------- Sync Views --------------------
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_changes(request):
+    """
+    Inspector's assigned work changed since ?token= (everything without one):
+    upserted new inspections and inspections, deleted ids, and the next token
+    """
+    if request.user.role != 'inspector':
+        return Response({"error": "Only inspectors can sync."}, status=status.HTTP_403_FORBIDDEN)
+
+    try:
+        new_inspections, inspections, deleted, token = changes(request.user, request.query_params.get('token'))
+    except SyncTokenError as e:
+        return Response({"error": str(e)}, status=e.status_code)
+
+    new_inspections = list(new_inspections.select_related('assigned_inspector'))
+    columns = InspectionListSerializer().model_columns()
+    inspections = list(
+        inspections.select_related('inspector')
+        .only(*columns, 'inspector__username')
+        .annotate(
+            photo_count=Count('attachments', filter=Q(attachments__kind='photo')),
+            thumbnail_path=first_thumbnail_path(),
+        )
+        .order_by('-updated_at')
+    )
+
+    # A row reassigned away and back again is still ours
+    deleted[SyncTombstone.MODEL_NEW_INSPECTION] -= {row.id for row in new_inspections}
+    deleted[SyncTombstone.MODEL_INSPECTION] -= {row.id for row in inspections}
+
+    return Response({
+        'token': token,
+        'new_inspections': NewInspectionSerializer(new_inspections, many=True).data,
+        'inspections': InspectionListSerializer(inspections, many=True, context={'request': request}).data,
+        'deleted': {
+            'new_inspections': sorted(deleted[SyncTombstone.MODEL_NEW_INSPECTION]),
+            'inspections': sorted(deleted[SyncTombstone.MODEL_INSPECTION]),
+        },
+    })
+
+# -------------------- Geo Views --------------------
+
+# A circle or box bigger than a region of the country scans most of the index
+MAX_GEO_RADIUS_KM = 250
+MAX_GEO_BBOX_DEGREES = 5
+DEFAULT_GEO_RESULTS = 100
+MAX_GEO_RESULTS = 500
+MAX_NEAREST = 100
+
+
+def _location_scope(user):
+    """Indexed track points of the inspections `user` may see"""
+    locations = InspectionLocation.objects.all()
+    if user.role == 'branch_admin':
+        locations = locations.filter(inspection__branch_name=user.branch_name)
+    elif user.role == 'inspector':
+        locations = locations.filter(inspection__inspector=user)
+    return locations
+
+
+def _float_params(params, *names):
+    try:
+        return [float(params[name]) for name in names]
+    except (KeyError, ValueError):
+        raise ValueError(f"{', '.join(names)} are required numbers")
+
+
+def _geo_limit(params):
+    try:
+        limit = int(params.get('limit', DEFAULT_GEO_RESULTS))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= MAX_GEO_RESULTS:
+        raise ValueError(f"limit must be a whole number from 1 to {MAX_GEO_RESULTS}")
+    return limit
+
+
+def _geo_results(matches):
+    """Inspection rows for (inspection_id, extra fields) pairs, in match order"""
+    inspections = Inspection.objects.filter(id__in=[m[0] for m in matches]).only(
+        'id', 'client_name', 'industry_name', 'branch_name', 'status'
+    ).in_bulk()
+    results = []
+    for inspection_id, extra in matches:
+        inspection = inspections.get(inspection_id)
+        if inspection is None:
+            # Deleted since its points were read
+            continue
+        results.append({
+            'id': inspection.id,
+            'client_name': inspection.client_name,
+            'industry_name': inspection.industry_name,
+            'branch_name': inspection.branch_name,
+            'status': inspection.status,
+            **extra,
+        })
+    return results
+
+
+def _nearest_fields(distance, latitude, longitude):
+    return {'distance_km': round(distance, 3), 'latitude': latitude, 'longitude': longitude}
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def inspections_within_radius(request):
+    """Inspections with a track point within ?radius_km= of ?lat=&lng=, nearest first (at most ?limit=)"""
+    try:
+        lat, lng, radius_km = _float_params(request.query_params, 'lat', 'lng', 'radius_km')
+        if not 0 < radius_km <= MAX_GEO_RADIUS_KM:
+            raise ValueError(f"radius_km must be between 0 and {MAX_GEO_RADIUS_KM}")
+        limit = _geo_limit(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    found = within_radius(_location_scope(request.user), lat, lng, radius_km, limit=limit)
+    return Response(_geo_results([(i, _nearest_fields(d, plat, plng)) for i, d, plat, plng in found]))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def inspections_within_bbox(request):
+    """Inspections with a track point inside ?min_lat=&min_lng=&max_lat=&max_lng=, by id (at most ?limit=)"""
+    try:
+        box = _float_params(request.query_params, 'min_lat', 'min_lng', 'max_lat', 'max_lng')
+        if box[0] > box[2] or box[1] > box[3]:
+            raise ValueError("min_lat/min_lng must not exceed max_lat/max_lng")
+        if box[2] - box[0] > MAX_GEO_BBOX_DEGREES or box[3] - box[1] > MAX_GEO_BBOX_DEGREES:
+            raise ValueError(f"the box may span at most {MAX_GEO_BBOX_DEGREES} degrees each way")
+        limit = _geo_limit(request.query_params)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    found = within_bbox(_location_scope(request.user), *box, limit=limit)
+    return Response(_geo_results([(i, {'points_inside': count}) for i, count in found]))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def nearest_inspections(request):
+    """The ?k= inspections whose tracks come closest to ?lat=&lng="""
+    try:
+        lat, lng = _float_params(request.query_params, 'lat', 'lng')
+        k = int(request.query_params.get('k', 10))
+        if not 0 < k <= MAX_NEAREST:
+            raise ValueError(f"k must be between 1 and {MAX_NEAREST}")
+    except ValueError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    found = nearest(_location_scope(request.user), lat, lng, k)
+    return Response(_geo_results([(i, _nearest_fields(d, plat, plng)) for i, d, plat, plng in found]))
+
 ############get number in admin dashboard
 
-def inspection_stats(request):
-    """Return inspection statistics for dashboard"""
-    data = {
-        "all": Inspection.objects.count(),
-        "pending": Inspection.objects.filter(status="Pending").count(),
-        "approved": Inspection.objects.filter(status="Approved").count(),
-        "rejected": Inspection.objects.filter(status="Rejected").count(),
-    }
+@async_api_view(permission_classes=[])
+@body_etag
+@cached_response(['inspections'])
+async def inspection_stats(request):
+    """Return inspection statistics for dashboard (optional date_from / date_to / group_by)"""
+    try:
+        options = parse_stats_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    data = await adashboard_stats(key_for_total='all', **options)
     return JsonResponse(data)
 
 
-@api_view(['GET'])
-def branch_admin_stats(request):
+@async_api_view()
+@body_etag
+@cached_response(['inspections'])
+async def branch_admin_stats(request):
     branch_name = request.GET.get('branch_name', '')  # read branch_name from query param
     if not branch_name:
         return Response({"error": "Branch name is required"}, status=400)
+    try:
+        options = parse_stats_params(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
     
-    inspections = Inspection.objects.filter(branch_name=branch_name)
-    
-    stats = {
-        "all": inspections.count(),
-        "pending": inspections.filter(status="Pending").count(),
-        "approved": inspections.filter(status="Approved").count(),
-        "rejected": inspections.filter(status="Rejected").count(),
-    }
-    return Response(stats)
+    stats = await adashboard_stats(key_for_total='all', branch_name=branch_name, **options)
+    return Response(stats)
+
+
+@api_view(['GET'])
+@cached_response(['inspections'], scope=user_scope)
+def inspection_portfolio(request):
+    """
+    Count, sum, average and percentiles of the parsed amount fields
+    (?fields=, ?percentiles=50,90), optionally per ?group_by=branch,
+    sector_code or investment_category; ?status= and ?date_from= / ?date_to=
+    narrow the inspections. Admins see every branch, branch admins their own.
+    """
+    if request.user.role not in ['admin', 'branch_admin']:
+        return Response({"error": "Permission denied"}, status=403)
+    try:
+        options = parse_portfolio_params(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    inspections = Inspection.objects.all()
+    if request.user.role == 'branch_admin':
+        inspections = inspections.filter(branch_name=request.user.branch_name)
+    return Response(portfolio_summary(inspections, **options))
+
+
+@api_view(['GET'])
+@cached_response(['analytics'], scope=user_scope)
+def inspection_analytics(request):
+    """
+    Inspection counts (per status), facility amounts and labour-force totals
+    per ?interval=day|week|month|total between ?date_from= and ?date_to=
+    (the last 30 days by default), optionally split by ?group_by=branch,
+    facility_type, investment_category and/or status. Read from the daily
+    rollups, which trail the inspections by ROLLUP_REFRESH_DELAY seconds.
+    Admins see every branch, branch admins their own.
+    """
+    if request.user.role not in ['admin', 'branch_admin']:
+        return Response({"error": "Permission denied"}, status=403)
+    try:
+        options = parse_analytics_params(request.GET)
+    except ValueError as e:
+        return Response({"error": str(e)}, status=400)
+
+    rollups = InspectionDailyRollup.objects.all()
+    if request.user.role == 'branch_admin':
+        rollups = rollups.filter(branch_name=request.user.branch_name)
+    return Response(analytics(rollups, **options))
+
+
+@api_view(['GET'])
+def response_cache_stats(request):
+    """Hit/miss counters of the dashboard response cache (admins only)"""
+    if request.user.role != 'admin':
+        return Response({"error": "Permission denied"}, status=403)
+    return Response(cache_stats())
+
+
+@api_view(['GET'])
+def media_file(request, path):
+    """
+    A blob store file (photo, video, document or image variant), for users who
+    can see an inspection it is attached to; anyone else gets a 404. With
+    MEDIA_ACCEL_REDIRECT set the web server sends the file after this check.
+    """
+    sha256 = served_sha256(path)
+    if sha256 is None or not role_inspections(request.user).filter(attachments__blob__sha256=sha256).exists():
+        return Response({"error": "Not found"}, status=404)
+    if path.startswith('variants/'):
+        content_type = mimetypes.guess_type(path)[0]
+    else:
+        content_type = MediaBlob.objects.filter(sha256=sha256).values_list('mime_type', flat=True).first()
+    content_type = content_type or 'application/octet-stream'
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT + path
+    else:
+        try:
+            response = FileResponse(default_storage.open(path), content_type=content_type)
+        except FileNotFoundError:
+            return Response({"error": "Not found"}, status=404)
+    # Content-addressed: a path never changes content, but access can be revoked
+    response['Cache-Control'] = 'private, max-age=86400'
+    return response
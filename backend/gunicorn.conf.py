@@ -0,0 +1,33 @@
+# gunicorn.conf.py
+"""
+Production server settings: `gunicorn invest_backend.asgi:application -c gunicorn.conf.py`.
+
+SERVER_MODE=asgi (the default) runs uvicorn workers, one per CPU: the async
+read views (current user, new-inspection list, stats) wait on the database
+without holding a thread, and the sync views run in each worker's thread
+pool. SERVER_MODE=wsgi runs the classic threaded workers instead; start it
+with invest_backend.wsgi:application.
+"""
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+mode = os.environ.get('SERVER_MODE', 'asgi')
+
+bind = os.environ.get('BIND', '0.0.0.0:8000')
+if mode == 'asgi':
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.environ.get('WEB_CONCURRENCY', cpus))
+else:
+    worker_class = 'gthread'
+    workers = int(os.environ.get('WEB_CONCURRENCY', 2 * cpus + 1))
+    threads = int(os.environ.get('THREADS', 4))
+
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers now and then so a slow leak cannot grow without bound
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = '-'
+errorlog = '-'
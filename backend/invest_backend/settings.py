@@ -101,8 +101,53 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    # Token buckets (accounts.throttling), kept in the default cache
+    'DEFAULT_THROTTLE_CLASSES': (
+        'accounts.throttling.UserRateThrottle',
+        'accounts.throttling.WriteRateThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'user': '600/min',  # any request, per user (per IP when anonymous)
+        'write': '120/min',  # POST/PUT/PATCH/DELETE, per user
+        'login': '30/min',  # login attempts, per IP
+        'login_failure': '10/hour',  # failed logins, per account and IP
+        'password_reset': '5/min',  # reset requests and confirmations, per IP
+        'password_reset_account': '3/hour',  # reset emails, per account
+    },
+    # Reverse proxies in front of Django; 0 trusts REMOTE_ADDR only, so clients
+    # cannot pick their own throttle bucket with X-Forwarded-For
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
+# Cache: local memory by default. With several worker processes the cache must
+# be shared for invalidations to reach every worker: set CACHE_BACKEND=redis
+# (CACHE_LOCATION=redis://host:6379/1, needs the redis package) or file.
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379/1'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'invest-backend',
+        }
+    }
+
+# Seconds a cached dashboard/list response may live (writes invalidate it sooner)
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
 # Email settings
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
@@ -145,6 +190,46 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# MEDIA_ROOT is never served as is: /api/media/ checks access first (accounts.views.media_file).
+# Behind nginx set this to an `internal` location aliased to MEDIA_ROOT, e.g. /protected-media/,
+# and nginx sends the file (X-Accel-Redirect) instead of a Django worker.
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+
+# Chunked uploads: part files live here until the session is completed
+# Outside MEDIA_ROOT: unverified partial files must never be reachable as media
+UPLOAD_SESSION_DIR = os.environ.get('UPLOAD_SESSION_DIR', os.path.join(BASE_DIR, 'upload_sessions'))
+UPLOAD_MAX_SIZE = 200 * 1024 * 1024  # 200 MB per file
+UPLOAD_READ_SIZE = 64 * 1024  # bytes read from the request body at a time
+
+# Photo variants (accounts.images): the largest image that will be decoded
+IMAGE_MAX_PIXELS = 50_000_000
+
+# Background jobs (accounts.jobs), run by `manage.py run_worker`. JOBS_EAGER runs
+# the due jobs in the requesting process right after commit, for setups without a
+# worker: delayed jobs (the rollup refresh) wait for a commit after their run_at,
+# and failures are marked failed instead of being retried.
+JOBS_EAGER = os.environ.get('JOBS_EAGER', 'False') == 'True'
+JOB_CONCURRENCY = int(os.environ.get('JOB_CONCURRENCY', 4))  # jobs one worker runs at once
+JOB_POLL_INTERVAL = 1.0  # seconds an idle worker waits before looking again
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BASE_DELAY = 10  # seconds before the first retry; doubles per attempt
+JOB_RETRY_MAX_DELAY = 3600
+JOB_LOCK_TIMEOUT = 15 * 60  # a job running longer is assumed orphaned by a dead worker
+JOB_KEEP_DAYS = 7  # finished jobs are deleted after this
+
+# Seconds between the first write to an inspection and the rollup refresh it
+# schedules (accounts.rollups); later writes in that window share the refresh
+ROLLUP_REFRESH_DELAY = int(os.environ.get('ROLLUP_REFRESH_DELAY', 60))
+
+# Approved and rejected inspections older than this have their sections packed
+# into compressed archive storage by `manage.py archive_inspections` (accounts.archive)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 730))
+
+# /api/sync/: tokens re-read this many seconds before their issue time, so rows
+# committed by transactions still open at that moment are not missed
+SYNC_OVERLAP_SECONDS = 10
+# Deletions are remembered this long; older tokens must resync from scratch
+SYNC_TOMBSTONE_DAYS = 30
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
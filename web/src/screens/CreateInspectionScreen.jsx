@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
-import { inspectionsAPI } from '../services/api';
+import { inspectionsAPI, uploadsAPI } from '../services/api';
 import './CreateInspectionScreen.css';
 
 // Helper Classes
@@ -715,12 +715,11 @@ const CreateInspectionScreen = () => {
         // Section K
         checklist_items: checklistItems,
         
-        // Section L
-        site_photos: sitePhotos,
-        site_video: siteVideo,
-        
-        // Section M
-        uploaded_documents: uploadedDocuments,
+        // Section L & M: files are sent separately through chunked uploads;
+        // only references to media that is already stored go in the JSON body
+        site_photos: sitePhotos.filter(photo => !(photo instanceof Blob)),
+        site_video: siteVideo instanceof Blob ? {} : (siteVideo || {}),
+        uploaded_documents: uploadedDocuments.filter(doc => !(doc.file instanceof Blob)),
         
         // Status
         status: selectedStatus,
@@ -737,6 +736,16 @@ const CreateInspectionScreen = () => {
       }
 
       if (success) {
+        const inspectionId = success.id || inspectionData.id;
+        const pendingUploads = [
+          ...sitePhotos.filter(photo => photo instanceof Blob).map(file => [file, 'photo']),
+          ...(siteVideo instanceof Blob ? [[siteVideo, 'video']] : []),
+          ...uploadedDocuments.filter(doc => doc.file instanceof Blob).map(doc => [doc.file, 'document']),
+        ];
+        for (const [file, kind] of pendingUploads) {
+          await uploadsAPI.uploadFile(file, kind, inspectionId);
+        }
+
         alert(isEditMode ? 'Inspection updated successfully! ✅' : 'Inspection submitted successfully! ✅');
         navigate(-1);
       } else {
@@ -297,7 +297,7 @@ const InspectionDetailScreen = () => {
             </React.Fragment>
           ),
           
-          siteVideo?.base64_data && (
+          (siteVideo?.url || siteVideo?.base64_data) && (
             <React.Fragment key="video">
               {buildInfoRow('Site Video', '1 video uploaded')}
               {buildVideoPreview(siteVideo)}
@@ -327,11 +327,13 @@ const InspectionDetailScreen = () => {
 
   const buildPhotoThumbnail = (photo, index) => {
     const base64Data = photo?.base64_data;
+    // Server-generated thumbnail when ready, the full photo otherwise
+    const src = photo?.thumbnail_url || photo?.url || (base64Data && `data:image/jpeg;base64,${base64Data}`);
     
-    if (base64Data) {
+    if (src) {
       return (
         <img
-          src={`data:image/jpeg;base64,${base64Data}`}
+          src={src}
           alt={`Photo ${index + 1}`}
           className="thumbnail-image"
           onError={(e) => {
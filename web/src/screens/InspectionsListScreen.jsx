@@ -198,15 +198,15 @@ const InspectionsListScreen = () => {
               {statusIcon} {inspection.status?.charAt(0).toUpperCase() + inspection.status?.slice(1).replace('_', ' ') || 'Unknown'}
             </span>
             
-            {inspection.location_points && inspection.location_points.length > 0 && (
+            {inspection.total_location_points > 0 && (
               <span className="inline-flex items-center px-2 py-1 rounded text-xs bg-blue-50 text-blue-700">
-                📍 {inspection.location_points.length} locations
+                📍 {inspection.total_location_points} locations
               </span>
             )}
             
-            {inspection.site_photos && inspection.site_photos.length > 0 && (
+            {inspection.photo_count > 0 && (
               <span className="inline-flex items-center px-2 py-1 rounded text-xs bg-purple-50 text-purple-700">
-                📷 {inspection.site_photos.length} photos
+                📷 {inspection.photo_count} photos
               </span>
             )}
           </div>
@@ -289,7 +289,15 @@ export const inspectionsAPI = {
   },
 
   getNewInspections: async () => {
-    return await apiCall('/new-inspections/list/');
+    // The list is keyset-paginated ({ next, results }); follow the cursors to the end
+    const inspections = [];
+    let endpoint = '/new-inspections/list/';
+    while (endpoint) {
+      const page = await apiCall(endpoint);
+      inspections.push(...(page.results || []));
+      endpoint = page.next ? page.next.slice(page.next.indexOf('/api/') + 4) : null;
+    }
+    return inspections;
   },
 
   assignInspector: async (inspectionId, inspectorId) => {
@@ -347,9 +355,81 @@ export const inspectionsAPI = {
 
   getLocationData: async (inspectionId) => {
     return await apiCall(`/inspections/${inspectionId}/location-data/`);
+  },
+
+  // Track summary: point_count, first, last, bbox
+  getTrack: async (inspectionId) => {
+    return await apiCall(`/inspections/${inspectionId}/track/`);
+  },
+
+  // Track simplified for a map zoom level, as a Google encoded polyline
+  getTrackPolyline: async (inspectionId, zoom = 16) => {
+    return await apiCall(`/inspections/${inspectionId}/track/polyline/?zoom=${zoom}`);
+  },
+
+  // Append points to a saved inspection's track without resending the inspection
+  appendTrackPoints: async (inspectionId, points) => {
+    return await apiCall(`/inspections/${inspectionId}/track/`, {
+      method: 'POST',
+      body: { points },
+    });
   }
 };
 
+// Chunked, resumable media uploads
+const UPLOAD_CHUNK_SIZE = 1024 * 1024; // 1 MB per request
+
+export const uploadsAPI = {
+  // Upload a File/Blob in chunks and attach it to an inspection.
+  // On a dropped connection the session offset is re-read and the upload resumes from there.
+  uploadFile: async (file, kind, inspectionId, onProgress = null, maxRetries = 5) => {
+    const session = await apiCall('/uploads/', {
+      method: 'POST',
+      body: {
+        kind,
+        file_name: file.name || 'upload',
+        mime_type: file.type || '',
+        total_size: file.size,
+      },
+    });
+
+    let offset = session.received;
+    let retries = 0;
+
+    while (offset < file.size) {
+      const end = Math.min(offset + UPLOAD_CHUNK_SIZE, file.size);
+      try {
+        const response = await fetch(`${BASE_URL}/uploads/${session.id}/`, {
+          method: 'PUT',
+          headers: {
+            'Content-Type': 'application/octet-stream',
+            'Content-Range': `bytes ${offset}-${end - 1}/${file.size}`,
+            Authorization: `Bearer ${localStorage.getItem('access')}`,
+          },
+          body: file.slice(offset, end),
+        });
+        const data = await response.json();
+        if (!response.ok && response.status !== 409) {
+          throw new Error(data.error || `HTTP error! status: ${response.status}`);
+        }
+        offset = response.ok ? data.received : data.offset;
+        retries = 0;
+        if (onProgress) onProgress(offset / file.size);
+      } catch (error) {
+        if (++retries > maxRetries) throw error;
+        // Ask the server how much it already has, then continue from there
+        const state = await apiCall(`/uploads/${session.id}/`);
+        offset = state.received;
+      }
+    }
+
+    return await apiCall(`/uploads/${session.id}/complete/`, {
+      method: 'POST',
+      body: { inspection: inspectionId },
+    });
+  },
+};
+
 // Direct exports for commonly used functions (যদি direct import করা হয়)
 export const getBranchInspectionStats = inspectionsAPI.getBranchInspectionStats;
 export const getDashboardStats = inspectionsAPI.getDashboardStats;
@@ -430,5 +510,6 @@ export default {
   branchesAPI,
   reportsAPI,
   notificationsAPI,
+  uploadsAPI,
   apiCall
 };
\ No newline at end of file